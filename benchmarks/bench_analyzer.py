@@ -0,0 +1,97 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+"""Tree-walking evaluator vs. analyzing evaluator on recursive code.
+
+Run with serval importable (bin/buildout or pip install -e .):
+
+    $ python benchmarks/bench_analyzer.py
+"""
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import time
+
+from serval.lexer import Lexer
+from serval.parser import Parser
+from serval.interpreter import Interpreter
+
+DEFINITIONS = """
+(define (fib n)
+  (if (< n 2)
+    n
+    (+ (fib (- n 1)) (fib (- n 2)))))
+
+(define (tak x y z)
+  (if (not (< y x))
+    z
+    (tak (tak (- x 1) y z)
+         (tak (- y 1) z x)
+         (tak (- z 1) x y))))
+
+(define (count-down n)
+  (cond
+    ((zero? n) 'done)
+    (else (count-down (- n 1)))))
+"""
+
+WORKLOADS = [
+    ('fib 16', '(fib 16)'),
+    ('tak 12 8 4', '(tak 12 8 4)'),
+    ('count-down 100', '(count-down 100)'),
+    ]
+
+
+def run(text, interpreter):
+    for expr in Parser(Lexer(text)).parse():
+        result = interpreter.interpret(expr)
+    return result
+
+
+def measure(options, text, repeat=3):
+    interpreter = Interpreter(**options)
+    run(DEFINITIONS, interpreter)
+
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        run(text, interpreter)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def main():
+    print '%-16s %12s %12s %8s' % ('workload', 'eval (s)', 'analyze (s)',
+                                   'speedup')
+    for name, text in WORKLOADS:
+        plain = measure({}, text)
+        analyzed = measure(dict(analyze=True), text)
+        print '%-16s %12.4f %12.4f %7.2fx' % (
+            name, plain, analyzed, plain / analyzed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+"""Native equal? vs. the same comparison written in Scheme, on two
+equal trees built separately.
+
+Run with serval importable (bin/buildout or pip install -e .):
+
+    $ python benchmarks/bench_equal.py
+"""
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import time
+
+from serval.lexer import Lexer
+from serval.parser import Parser
+from serval.interpreter import Interpreter
+
+DEFINITIONS = """
+(define (scheme-equal? a b)
+  (cond ((and (pair? a) (pair? b))
+         (and (scheme-equal? (car a) (car b))
+              (scheme-equal? (cdr a) (cdr b))))
+        ((or (pair? a) (pair? b)) #f)
+        (else (eq? a b))))
+
+(define (make-tree depth)
+  (if (= depth 0)
+    '(leaf 1 2)
+    (list (make-tree (- depth 1)) depth (make-tree (- depth 1)))))
+
+(define (make-list n acc)
+  (if (= n 0) acc (make-list (- n 1) (cons n acc))))
+
+(define tree-a (make-tree 10))
+(define tree-b (make-tree 10))
+(define list-a (make-list 20000 '()))
+(define list-b (make-list 20000 '()))
+"""
+
+WORKLOADS = [
+    ('tree, depth 10', 'tree-a tree-b'),
+    ('list, 20000', 'list-a list-b'),
+    ]
+
+ENGINES = [
+    ('eval', {}),
+    ('analyze', dict(analyze=True)),
+    ]
+
+
+def run(text, interpreter):
+    for expr in Parser(Lexer(text)).parse():
+        result = interpreter.interpret(expr)
+    return result
+
+
+def measure(interpreter, text, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.clock()
+        run(text, interpreter)
+        elapsed = time.clock() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def main():
+    print '%-16s %-8s %12s %12s %8s' % ('workload', 'engine', 'scheme (s)',
+                                        'native (s)', 'speedup')
+    for name, operands in WORKLOADS:
+        for engine, options in ENGINES:
+            interpreter = Interpreter(**options)
+            run(DEFINITIONS, interpreter)
+            scheme = measure(interpreter, '(scheme-equal? %s)' % operands)
+            native = measure(interpreter, '(equal? %s)' % operands)
+            print '%-16s %-8s %12.4f %12.4f %7.1fx' % (
+                name, engine, scheme, native, scheme / native)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+"""Environment allocations and run time of The Little Schemer evaluator
+with and without inlining (Interpreter(optimize=True)).
+
+Run with serval importable (bin/buildout or pip install -e .):
+
+    $ python benchmarks/bench_inline.py
+"""
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import time
+
+from serval import scope
+from serval.lexer import Lexer
+from serval.parser import Parser
+from serval.interpreter import Interpreter
+from serval.tests.test_the_little_schemer import (
+    LittleSchemerEvaluatorTestCase)
+
+PROGRAM = """
+(value '((lambda (x y)
+           (cond
+             ((null? x) (cons y (quote ())))
+             (else (cons (car x) (cons y (cdr x))))))
+         (quote (a b c))
+         (quote z)))
+"""
+
+REPEAT = 20
+
+
+class AllocationCounter(object):
+    """Counts Environment objects created while it is installed."""
+
+    def __init__(self):
+        self.count = 0
+        self._init = scope.Environment.__init__
+
+    def __enter__(self):
+        init = self._init
+
+        def counting_init(env, *args, **kwargs):
+            self.count += 1
+            init(env, *args, **kwargs)
+
+        scope.Environment.__init__ = counting_init
+        return self
+
+    def __exit__(self, *exc_info):
+        scope.Environment.__init__ = self._init
+
+
+def run(text, interpreter):
+    for expr in Parser(Lexer(text)).parse():
+        result = interpreter.interpret(expr)
+    return result
+
+
+def measure(options):
+    interpreter = Interpreter(**options)
+    run(LittleSchemerEvaluatorTestCase.TEXT, interpreter)
+
+    with AllocationCounter() as counter:
+        start = time.clock()
+        for _ in range(REPEAT):
+            result = run(PROGRAM, interpreter)
+        elapsed = time.clock() - start
+
+    return result, counter.count, elapsed
+
+
+def main():
+    print '%-12s %14s %10s  %s' % ('mode', 'environments', 'time (s)',
+                                   'result')
+    for name, options in [('eval', {}), ('eval+inline', dict(optimize=True))]:
+        result, count, elapsed = measure(options)
+        print '%-12s %14d %10.4f  %s' % (name, count, elapsed, result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+"""Bytes taken by a cons cell and by an environment frame.
+
+tracemalloc does not exist on Python 2, so the sizes are added up
+with sys.getsizeof (which counts the GC header) over each object and
+its instance __dict__; the peak RSS growth while building a long list
+is printed as a cross-check.
+
+Run with serval importable (bin/buildout or pip install -e .):
+
+    $ python benchmarks/bench_memory.py
+"""
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import sys
+import resource
+
+from serval.model import Number, Symbol, Pair, EmptyList
+from serval.scope import Environment
+
+LENGTH = 1000000
+
+
+def instance_size(obj):
+    size = sys.getsizeof(obj)
+    attributes = getattr(obj, '__dict__', None)
+    if attributes is not None:
+        size += sys.getsizeof(attributes)
+    return size
+
+
+def cons_cell_size():
+    pair = Pair(Number(1), EmptyList)
+    return instance_size(pair), instance_size(pair) + instance_size(pair.head)
+
+
+def frame_size():
+    frame = Environment(parent=Environment(), bindings={Symbol('x'): None})
+    return instance_size(frame) + sys.getsizeof(frame.bindings)
+
+
+def list_rss_growth(length=LENGTH):
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    alist = EmptyList
+    for index in xrange(length):
+        alist = Pair(Number(index), alist)
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux
+    return (after - before) * 1024.0 / length
+
+
+def main():
+    pair, pair_and_number = cons_cell_size()
+    print '%-36s %8d' % ('cons cell (bytes)', pair)
+    print '%-36s %8d' % ('cons cell with a Number (bytes)', pair_and_number)
+    print '%-36s %8d' % ('environment frame, 1 binding (bytes)',
+                         frame_size())
+    print '%-36s %8.1f' % ('peak RSS per element, %d list' % LENGTH,
+                           list_rss_growth())
+
+
+if __name__ == '__main__':
+    main()
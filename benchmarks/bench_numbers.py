@@ -0,0 +1,102 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+"""Numeric loops with boxed numbers (Number objects) vs. unboxed ones
+(plain Python ints, Interpreter(unboxed=True)) for each engine.
+
+Run with serval importable (bin/buildout or pip install -e .):
+
+    $ python benchmarks/bench_numbers.py
+"""
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import time
+
+from serval.lexer import Lexer
+from serval.parser import Parser
+from serval.interpreter import Interpreter
+
+DEFINITIONS = """
+(define (sum-to n acc)
+  (if (= n 0)
+    acc
+    (sum-to (- n 1) (+ acc n))))
+
+(define (sum-squares n acc)
+  (if (zero? n)
+    acc
+    (sum-squares (- n 1) (+ acc (* n n)))))
+
+(define (fib n)
+  (if (< n 2)
+    n
+    (+ (fib (- n 1)) (fib (- n 2)))))
+"""
+
+WORKLOADS = [
+    ('sum-to 20000', '(sum-to 20000 0)'),
+    ('sum-squares 20000', '(sum-squares 20000 0)'),
+    ('fib 16', '(fib 16)'),
+    ]
+
+ENGINES = [
+    ('eval', {}),
+    ('analyze', dict(analyze=True)),
+    ('jit', dict(jit=True)),
+    ]
+
+
+def run(text, interpreter):
+    for expr in Parser(Lexer(text)).parse():
+        result = interpreter.interpret(expr)
+    return result
+
+
+def measure(options, text, repeat=3):
+    interpreter = Interpreter(**options)
+    run(DEFINITIONS, interpreter)
+
+    best = None
+    for _ in range(repeat):
+        start = time.clock()
+        run(text, interpreter)
+        elapsed = time.clock() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def main():
+    print '%-18s %-8s %12s %12s %8s' % ('workload', 'engine', 'boxed (s)',
+                                        'unboxed (s)', 'speedup')
+    for name, text in WORKLOADS:
+        for engine, options in ENGINES:
+            boxed = measure(options, text)
+            unboxed = measure(dict(options, unboxed=True), text)
+            print '%-18s %-8s %12.4f %12.4f %7.2fx' % (
+                name, engine, boxed, unboxed, boxed / unboxed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+"""Vectorized numeric vector primitives vs. the same loops written in
+Scheme over lists of numbers.
+
+Run with serval importable (bin/buildout or pip install -e .):
+
+    $ python benchmarks/bench_numeric.py
+"""
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import time
+
+from serval import numeric
+from serval.lexer import Lexer
+from serval.parser import Parser
+from serval.interpreter import Interpreter
+
+DEFINITIONS = """
+(define (make-list n acc)
+  (if (= n 0) acc (make-list (- n 1) (cons n acc))))
+
+(define (list-sum xs acc)
+  (if (null? xs) acc (list-sum (cdr xs) (+ acc (car xs)))))
+
+(define (list-dot xs ys acc)
+  (if (null? xs)
+    acc
+    (list-dot (cdr xs) (cdr ys) (+ acc (* (car xs) (car ys))))))
+
+(define (list-add xs ys acc)
+  (if (null? xs)
+    acc
+    (list-add (cdr xs) (cdr ys) (cons (+ (car xs) (car ys)) acc))))
+
+(define xs (make-list 100000 '()))
+(define ys (make-list 100000 '()))
+(define vx (list->s64vector xs))
+(define vy (list->s64vector ys))
+"""
+
+WORKLOADS = [
+    ('sum', "(list-sum xs 0)", "(vector-sum vx)"),
+    ('dot', "(list-dot xs ys 0)", "(vector-dot vx vy)"),
+    ('add', "(list-add xs ys '())", "(vector-add vx vy)"),
+    ]
+
+ENGINES = [
+    ('eval', {}),
+    ('analyze', dict(analyze=True)),
+    ]
+
+
+def run(text, interpreter):
+    for expr in Parser(Lexer(text)).parse():
+        result = interpreter.interpret(expr)
+    return result
+
+
+def measure(interpreter, text, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.clock()
+        run(text, interpreter)
+        elapsed = time.clock() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def main():
+    print 'storage: %s, 100000 elements' % (
+        'numpy' if numeric.numpy is not None else 'array.array')
+    print '%-8s %-8s %12s %12s %9s' % ('workload', 'engine', 'lists (s)',
+                                       'vector (s)', 'speedup')
+    for name, scheme, vectorized in WORKLOADS:
+        for engine, options in ENGINES:
+            interpreter = Interpreter(**options)
+            run(DEFINITIONS, interpreter)
+            lists = measure(interpreter, scheme)
+            vector = measure(interpreter, vectorized)
+            print '%-8s %-8s %12.4f %12.4f %8.0fx' % (
+                name, engine, lists, vector, lists / vector)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+"""Persistent maps and vectors vs. the copying baselines: an association
+list updated functionally (copy up to the key, share the rest) and a
+Python list copied to replace one element.
+
+Run with serval importable (bin/buildout or pip install -e .):
+
+    $ python benchmarks/bench_persistent.py
+"""
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import random
+import time
+
+from serval.model import EmptyList, Number, Pair
+from serval.builtin import (
+    builtin_persistent_map_ref,
+    builtin_persistent_map_set,
+    builtin_persistent_vector_ref,
+    builtin_persistent_vector_set,
+    _persistent_map,
+    )
+from serval.persistent import PersistentVector
+
+SIZES = [10 ** 5, 10 ** 6]
+
+# Copying baselines are O(n) per operation, so they get fewer of them.
+PERSISTENT_OPERATIONS = 10000
+COPYING_OPERATIONS = 20
+
+
+def make_alist(keys):
+    alist = EmptyList
+    for key in reversed(keys):
+        alist = Pair(Pair(key, key), alist)
+    return alist
+
+
+def alist_ref(alist, key):
+    while alist is not EmptyList:
+        if alist.head.head == key:
+            return alist.head.tail
+        alist = alist.tail
+    return None
+
+
+def alist_set(alist, key, value):
+    prefix = []
+    while alist is not EmptyList and alist.head.head != key:
+        prefix.append(alist.head)
+        alist = alist.tail
+    if alist is not EmptyList:
+        alist = alist.tail
+    result = Pair(Pair(key, value), alist)
+    for entry in reversed(prefix):
+        result = Pair(entry, result)
+    return result
+
+
+def list_set(items, index, value):
+    items = list(items)
+    items[index] = value
+    return items
+
+
+def measure(func, collection, keys, repeat=3):
+    """Return the best time per operation in microseconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.clock()
+        for key in keys:
+            func(collection, key)
+        elapsed = (time.clock() - start) / len(keys) * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def main():
+    generator = random.Random(0)
+    value = Number(-1)
+    print '%-10s %-10s %16s %18s %10s' % (
+        'n', 'operation', 'copying (us/op)', 'persistent (us/op)', 'speedup')
+    for size in SIZES:
+        keys = [Number(index) for index in xrange(size)]
+        persistent_keys = [generator.choice(keys)
+                           for _ in xrange(PERSISTENT_OPERATIONS)]
+        copying_keys = persistent_keys[:COPYING_OPERATIONS]
+
+        alist = make_alist(keys)
+        pmap = _persistent_map((key, key) for key in keys)
+        items = list(keys)
+        pvector = PersistentVector.from_items(keys)
+
+        rows = [
+            ('map ref',
+             measure(alist_ref, alist, copying_keys),
+             measure(builtin_persistent_map_ref, pmap, persistent_keys)),
+            ('map set',
+             measure(lambda alist, key: alist_set(alist, key, value),
+                     alist, copying_keys),
+             measure(lambda pmap, key:
+                     builtin_persistent_map_set(pmap, key, value),
+                     pmap, persistent_keys)),
+            ('vector ref',
+             measure(lambda items, key: items[key.val],
+                     items, copying_keys),
+             measure(builtin_persistent_vector_ref, pvector,
+                     persistent_keys)),
+            ('vector set',
+             measure(lambda items, key: list_set(items, key.val, value),
+                     items, copying_keys),
+             measure(lambda pvector, key:
+                     builtin_persistent_vector_set(pvector, key, value),
+                     pvector, persistent_keys)),
+            ]
+        for name, copying, persistent in rows:
+            print '%-10d %-10s %16.2f %18.2f %9.1fx' % (
+                size, name, copying, persistent, copying / persistent)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+"""Records made by define-record-type vs. records encoded as lists:
+the bytes one three-field record takes and the time to build, read
+and update records in a loop.
+
+Run with serval importable (bin/buildout or pip install -e .):
+
+    $ python benchmarks/bench_records.py
+"""
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import sys
+import time
+
+from serval.lexer import Lexer
+from serval.parser import Parser
+from serval.interpreter import Interpreter
+
+COUNT = 20000
+
+DEFINITIONS = """
+(define-record-type point (make-point x y z) point?
+  (x point-x)
+  (y point-y)
+  (z point-z set-point-z!))
+
+(define (make-list-point x y z) (list x y z))
+(define (list-point-z p) (car (cdr (cdr p))))
+
+(define record (make-point 1 2 3))
+(define alist (make-list-point 1 2 3))
+
+(define (build-records n)
+  (if (= n 0) 'done (begin (make-point n n n) (build-records (- n 1)))))
+(define (build-lists n)
+  (if (= n 0) 'done (begin (make-list-point n n n) (build-lists (- n 1)))))
+
+(define (read-records n acc)
+  (if (= n 0) acc (read-records (- n 1) (point-z record))))
+(define (read-lists n acc)
+  (if (= n 0) acc (read-lists (- n 1) (list-point-z alist))))
+
+(define (update-records n)
+  (if (= n 0) record (begin (set-point-z! record n) (update-records (- n 1)))))
+(define (update-lists n p)
+  (if (= n 0)
+    p
+    (update-lists (- n 1) (make-list-point (car p) (car (cdr p)) n))))
+"""
+
+WORKLOADS = [
+    ('build', '(build-lists %d)', '(build-records %d)'),
+    ('read', '(read-lists %d 0)', '(read-records %d 0)'),
+    ('update', '(update-lists %d alist)', '(update-records %d)'),
+    ]
+
+ENGINES = [
+    ('eval', {}),
+    ('analyze', dict(analyze=True)),
+    ]
+
+
+def run(text, interpreter):
+    for expr in Parser(Lexer(text)).parse():
+        result = interpreter.interpret(expr)
+    return result
+
+
+def measure(interpreter, text, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.clock()
+        run(text, interpreter)
+        elapsed = time.clock() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def list_size(alist):
+    # the spine of cons cells, the elements are shared with the record
+    size = 0
+    while hasattr(alist, 'tail'):
+        size += sys.getsizeof(alist)
+        alist = alist.tail
+    return size
+
+
+def main():
+    interpreter = Interpreter()
+    run(DEFINITIONS, interpreter)
+    print '%-34s %8d' % ('list-encoded record (bytes)',
+                         list_size(run('alist', interpreter)))
+    print '%-34s %8d' % ('define-record-type record (bytes)',
+                         sys.getsizeof(run('record', interpreter)))
+    print
+    print '%-8s %-8s %12s %12s %9s' % ('workload', 'engine', 'lists (s)',
+                                       'records (s)', 'speedup')
+    for name, lists, records in WORKLOADS:
+        for engine, options in ENGINES:
+            interpreter = Interpreter(**options)
+            run(DEFINITIONS, interpreter)
+            list_time = measure(interpreter, lists % COUNT)
+            record_time = measure(interpreter, records % COUNT)
+            print '%-8s %-8s %12.4f %12.4f %8.2fx' % (
+                name, engine, list_time, record_time,
+                list_time / record_time)
+
+
+if __name__ == '__main__':
+    main()
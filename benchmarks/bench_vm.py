@@ -0,0 +1,93 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+"""Tree-walking Interpreter vs. bytecode compiler and virtual machine.
+
+Run with serval importable (bin/buildout or pip install -e .):
+
+    $ python benchmarks/bench_vm.py
+"""
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import time
+
+from serval.lexer import Lexer
+from serval.parser import Parser
+from serval.interpreter import Interpreter
+from serval.vm import VirtualMachine
+
+DEFINITIONS = """
+(define (fib n)
+  (if (< n 2)
+    n
+    (+ (fib (- n 1)) (fib (- n 2)))))
+
+(define (tak x y z)
+  (if (not (< y x))
+    z
+    (tak (tak (- x 1) y z)
+         (tak (- y 1) z x)
+         (tak (- z 1) x y))))
+"""
+
+WORKLOADS = [
+    ('fib 18', '(fib 18)'),
+    ('tak 14 10 6', '(tak 14 10 6)'),
+    ]
+
+
+def run(text, interpreter):
+    for expr in Parser(Lexer(text)).parse():
+        result = interpreter.interpret(expr)
+    return result
+
+
+def measure(factory, text, repeat=5):
+    interpreter = factory()
+    run(DEFINITIONS, interpreter)
+
+    best = None
+    for _ in range(repeat):
+        # CPU time, the wall clock is too noisy on shared machines
+        start = time.clock()
+        run(text, interpreter)
+        elapsed = time.clock() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def main():
+    print '%-16s %12s %12s %8s' % ('workload', 'eval (s)', 'vm (s)',
+                                   'speedup')
+    for name, text in WORKLOADS:
+        plain = measure(Interpreter, text)
+        compiled = measure(VirtualMachine, text)
+        print '%-16s %12.4f %12.4f %7.2fx' % (
+            name, plain, compiled, plain / compiled)
+
+
+if __name__ == '__main__':
+    main()
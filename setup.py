@@ -49,6 +49,7 @@ setup(
     entry_points="""\
     [console_scripts]
     serval = serval.interpreter:main
+    serval-compile = serval.aot:main
     """,
     classifiers=filter(None, classifiers.split('\n')),
     long_description=long_description
@@ -0,0 +1,402 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+from serval.model import (
+    Symbol, CompoundProcedure, PrimitiveProcedure, TRUE, FALSE, UNSPECIFIED
+    )
+from serval.scope import (
+    define_variable, lookup_variable_value, CompileTimeEnvironment,
+    scan_out_defines, lexical_address_lookup, lexical_address_set)
+from serval.expression import (
+    selfeval, quote, definition, variable,
+    assignment, conditional, lambdaexpr,
+    procedure, sequence, binding, record
+    )
+from serval.expression.util import cons, tolist, pair_to_list
+
+
+class TailCall(object):
+    """A procedure application left in tail position.
+
+    Execution procedures of tail applications return it instead of
+    applying the procedure, and `Analyzer.execute_application`
+    keeps applying until it gets a value (proper tail calls).
+    """
+
+    __slots__ = ('proc', 'args')
+
+    def __init__(self, proc, args):
+        self.proc = proc
+        self.args = args
+
+
+class Analyzer(object):
+    """Analyzing evaluator.
+
+    Closely follows the syntactic analysis from SICP Ch. 4.1.7:
+    an expression is classified only once and turned into an
+    execution procedure that takes an environment. Compound
+    procedures keep the execution procedure for their body, so
+    applying them does no syntax dispatch at all.
+
+    Procedure bodies run in list frames (see serval.scope): local
+    variables are resolved to lexical addresses during the analysis,
+    `scope` being the compile-time environment of the expression
+    being analyzed (None at the top level). Free variables of
+    procedure bodies are linked to the cells of the global
+    environment `env`.
+    """
+
+    def __init__(self, env):
+        self.env = env
+        self.scope = None
+
+    @classmethod
+    def define_special_form(cls, name, analyzer):
+        """Make `analyzer` handle expressions that start with `name`.
+
+        `analyzer` is called with the Analyzer instance, the
+        expression and a flag telling whether the expression is in
+        tail position, and returns the execution procedure for it.
+        Subexpressions are analyzed with `Analyzer.analyze`, passing
+        the flag on only for subexpressions in tail position.
+        """
+        if 'special_forms' not in cls.__dict__:
+            cls.special_forms = dict(cls.special_forms)
+        cls.special_forms[intern(name)] = analyzer
+
+    def analyze(self, expr, tail=False):
+        if selfeval.is_self_evaluating(expr):
+            return self._analyze_self_evaluating(expr)
+
+        if variable.is_variable(expr):
+            return self._analyze_variable(expr)
+
+        if procedure.is_application(expr):
+            head = procedure.operator(expr)
+            if variable.is_variable(head):
+                analyzer = self.special_forms.get(head.name)
+                if analyzer is not None:
+                    return analyzer(self, expr, tail)
+
+            return self._analyze_application(expr, tail)
+
+        raise ValueError('Unknown expression type - ANALYZE %s' % expr)
+
+    def _analyze_self_evaluating(self, expr):
+        return lambda env: expr
+
+    def _analyze_quoted(self, expr, tail):
+        qval = quote.text_of_quotation(expr)
+        return lambda env: qval
+
+    def _analyze_variable(self, expr):
+        address = self.scope and self.scope.find_variable(expr.name)
+        if address is None:
+            return self._analyze_global_variable(expr)
+
+        depth, index = address
+        if depth == 0:
+            def execute(env):
+                value = env[index]
+                if value is None:
+                    raise NameError('Unbound variable: %s' % expr)
+                return value
+        elif depth == 1:
+            def execute(env):
+                value = env[0][index]
+                if value is None:
+                    raise NameError('Unbound variable: %s' % expr)
+                return value
+        else:
+            def execute(env):
+                value = lexical_address_lookup(address, env)
+                if value is None:
+                    raise NameError('Unbound variable: %s' % expr)
+                return value
+
+        return execute
+
+    def _analyze_global_variable(self, expr):
+        if self.scope is None:
+            return lambda env: lookup_variable_value(expr, env)
+
+        cell = self.env.cell(expr)
+
+        def execute(env):
+            value = cell.value
+            if value is None:
+                raise NameError('Unbound variable: %s' % expr)
+            return value
+
+        return execute
+
+    def _analyze_definition(self, expr, tail):
+        var = definition.definition_variable(expr)
+        if self.scope is None:
+            vproc = self.analyze(definition.definition_value(expr))
+
+            def execute(env):
+                define_variable(var, vproc(env), env)
+                return Symbol('ok')
+
+            return execute
+
+        # internal definition, the slot has to exist before
+        # the value is analyzed for it to see the name
+        self.scope.add(var.name)
+        index = self.scope.find_variable(var.name)[1]
+        vproc = self.analyze(definition.definition_value(expr))
+
+        def execute(env):
+            env[index] = vproc(env)
+            return Symbol('ok')
+
+        return execute
+
+    def _analyze_assignment(self, expr, tail):
+        var = assignment.assignment_variable(expr)
+        vproc = self.analyze(assignment.assignment_value(expr))
+        address = self.scope and self.scope.find_variable(var.name)
+
+        if address is not None:
+            def execute(env):
+                lexical_address_set(address, env, vproc(env))
+                return Symbol('ok')
+        elif self.scope is None:
+            def execute(env):
+                env.set_variable_value(var, vproc(env))
+                return Symbol('ok')
+        else:
+            global_env = self.env
+
+            def execute(env):
+                global_env.set_variable_value(var, vproc(env))
+                return Symbol('ok')
+
+        return execute
+
+    def _analyze_begin(self, expr, tail):
+        return self._analyze_sequence(sequence.begin_actions(expr), tail)
+
+    def _analyze_cond(self, expr, tail):
+        return self.analyze(conditional.cond_to_if(expr), tail)
+
+    def _analyze_record_definition(self, expr, tail):
+        return self.analyze(record.record_definition_to_definitions(expr),
+                            tail)
+
+    def _analyze_binding(self, expr, tail):
+        return self.analyze(
+            cons(lambdaexpr.make_lambda(binding.binding_variables(expr),
+                                        binding.binding_body(expr)),
+                 binding.binding_values(expr)),
+            tail)
+
+    def _analyze_if(self, expr, tail):
+        pproc = self.analyze(conditional.if_predicate(expr))
+        cproc = self.analyze(conditional.if_consequent(expr), tail)
+        alternative = conditional.if_alternative(expr)
+        if alternative is False:
+            # one-armed IF, the value is unspecified
+            aproc = lambda env: UNSPECIFIED
+        else:
+            aproc = self.analyze(alternative, tail)
+
+        def execute(env):
+            value = pproc(env)
+            if value is not FALSE and value is not None:
+                return cproc(env)
+            return aproc(env)
+
+        return execute
+
+    def _analyze_and(self, expr, tail):
+        exprs = pair_to_list(procedure.operands(expr))
+        if not exprs:
+            return lambda env: TRUE
+
+        procs = [self.analyze(e) for e in exprs[:-1]]
+        last_proc = self.analyze(exprs[-1], tail)
+
+        def execute(env):
+            for proc in procs:
+                value = proc(env)
+                if value is FALSE or value is None:
+                    return FALSE
+            return last_proc(env)
+
+        return execute
+
+    def _analyze_or(self, expr, tail):
+        exprs = pair_to_list(procedure.operands(expr))
+        if not exprs:
+            return lambda env: FALSE
+
+        procs = [self.analyze(e) for e in exprs[:-1]]
+        last_proc = self.analyze(exprs[-1], tail)
+
+        def execute(env):
+            for proc in procs:
+                value = proc(env)
+                if value is not FALSE and value is not None:
+                    return value
+            return last_proc(env)
+
+        return execute
+
+    def _analyze_lambda(self, expr, tail):
+        params = lambdaexpr.lambda_parameters(expr)
+        body = lambdaexpr.lambda_body(expr)
+        names, rest = lambdaexpr.parameter_names(params)
+        if rest is not None:
+            names.append(rest)
+
+        outer_scope = self.scope
+        self.scope = CompileTimeEnvironment(names + scan_out_defines(body),
+                                            outer_scope)
+        try:
+            bproc = self._analyze_sequence(body, True)
+            frame_size = self.scope.frame_size
+        finally:
+            self.scope = outer_scope
+
+        # frames come in holding the enclosing frame and the arguments
+        arity = len(names) + 1
+        padding = [None] * (frame_size - arity)
+
+        if rest is None:
+            def execute_body(frame):
+                if len(frame) != arity:
+                    raise ValueError('Wrong number of arguments - APPLY %s'
+                                     % expr)
+                if padding:
+                    frame.extend(padding)
+                return bproc(frame)
+        else:
+            # the arguments past the required ones become the rest list
+            required = arity - 1
+            def execute_body(frame):
+                if len(frame) < required:
+                    raise ValueError('Wrong number of arguments - APPLY %s'
+                                     % expr)
+                frame[required:] = [tolist(*frame[required:])]
+                if padding:
+                    frame.extend(padding)
+                return bproc(frame)
+
+        return lambda env: procedure.make_procedure(params, body, env,
+                                                    execute_body)
+
+    def _analyze_sequence(self, expressions, tail):
+        exprs = pair_to_list(expressions)
+        if not exprs:
+            raise ValueError('Empty sequence - ANALYZE')
+
+        procs = [self.analyze(e) for e in exprs[:-1]]
+        procs.append(self.analyze(exprs[-1], tail))
+
+        def sequentially(proc1, proc2):
+            def execute(env):
+                proc1(env)
+                return proc2(env)
+            return execute
+
+        first_proc = procs[0]
+        for proc in procs[1:]:
+            first_proc = sequentially(first_proc, proc)
+
+        return first_proc
+
+    def _analyze_application(self, expr, tail):
+        fproc = self.analyze(procedure.operator(expr))
+        aprocs = [self.analyze(e)
+                  for e in pair_to_list(procedure.operands(expr))]
+
+        # primitives are applied right here, compound procedures
+        # left to the caller in tail position
+        finish = TailCall if tail else self.execute_application
+
+        # one and two operands skip the generic argument list
+        if len(aprocs) == 1:
+            aproc, = aprocs
+            def execute(env):
+                proc = fproc(env)
+                arg = aproc(env)
+                if proc.__class__ is PrimitiveProcedure:
+                    return proc.fixed[1](arg)
+                return finish(proc, [arg])
+        elif len(aprocs) == 2:
+            aproc1, aproc2 = aprocs
+            def execute(env):
+                proc = fproc(env)
+                arg1 = aproc1(env)
+                arg2 = aproc2(env)
+                if proc.__class__ is PrimitiveProcedure:
+                    return proc.fixed[2](arg1, arg2)
+                return finish(proc, [arg1, arg2])
+        else:
+            def execute(env):
+                proc = fproc(env)
+                args = [aproc(env) for aproc in aprocs]
+                if proc.__class__ is PrimitiveProcedure:
+                    return proc.apply(args)
+                return finish(proc, args)
+
+        return execute
+
+    def execute_application(self, proc, args):
+        """Apply `proc` to the Python list of argument values `args`."""
+        while True:
+            if proc.__class__ is PrimitiveProcedure:
+                return proc.apply(args)
+
+            if proc.__class__ is not CompoundProcedure:
+                raise ValueError('Unknown procedure type - APPLY %s' % proc)
+
+            frame = [proc.env]
+            frame.extend(args)
+            result = proc.analyzed_body(frame)
+            if not isinstance(result, TailCall):
+                return result
+
+            proc, args = result.proc, result.args
+
+    # special form analyzers keyed by the name of the head symbol,
+    # see define_special_form
+    special_forms = {
+        'quote': _analyze_quoted,
+        'define': _analyze_definition,
+        'begin': _analyze_begin,
+        'let': _analyze_binding,
+        'set!': _analyze_assignment,
+        'if': _analyze_if,
+        'cond': _analyze_cond,
+        'and': _analyze_and,
+        'or': _analyze_or,
+        'lambda': _analyze_lambda,
+        'define-record-type': _analyze_record_definition,
+        }
@@ -0,0 +1,297 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import os
+import re
+import sys
+import keyword
+import optparse
+
+from serval.lexer import Lexer
+from serval.parser import Parser
+from serval.interpreter import Interpreter
+from serval.jit import Translator, TranslationError
+from serval.model import (
+    Number, Symbol, String, Boolean, Character, Pair, EmptyList, Vector,
+    UNSPECIFIED
+    )
+from serval.scope import setup_environment
+from serval.expression import definition, lambdaexpr, procedure, record
+from serval.expression.util import tolist, is_load, load
+
+# names the generated module imports, everything it defines itself
+# starts with an underscore as well
+MODULE_HEADER = '''\
+"""Compiled from %s by serval-compile, do not edit."""
+
+from serval.aot import Runtime as _Runtime, make_list as _list
+from serval.model import (
+    Number as _num, Symbol as _sym, String as _str, Boolean as _bool,
+    Character as _chr, EmptyList as _nil, Vector as _vec,
+    UNSPECIFIED as _unspecified
+    )
+
+_runtime = _Runtime()
+'''
+
+DATUM_CONSTRUCTORS = {
+    Number: '_num', Symbol: '_sym', String: '_str', Boolean: '_bool',
+    Character: '_chr',
+    }
+
+
+def make_list(*items, **kwargs):
+    """Return the list of `items` ending in `tail` (default '())."""
+    result = kwargs.get('tail', EmptyList)
+    for item in reversed(items):
+        result = Pair(item, result)
+    return result
+
+
+def datum_source(expr):
+    """Return a Python expression that builds the datum `expr`."""
+    if isinstance(expr, Pair):
+        items = []
+        while isinstance(expr, Pair):
+            items.append(datum_source(expr.head))
+            expr = expr.tail
+        if expr is not EmptyList:
+            items.append('tail=' + datum_source(expr))
+        return '_list(%s)' % ', '.join(items)
+
+    if expr is EmptyList:
+        return '_nil'
+
+    if expr is UNSPECIFIED:
+        return '_unspecified'
+
+    if isinstance(expr, Vector):
+        return '_vec([%s])' % ', '.join(datum_source(item)
+                                        for item in expr.items)
+
+    constructor = DATUM_CONSTRUCTORS.get(expr.__class__)
+    if constructor is None:
+        raise TranslationError('%s has no source - AOT' % expr)
+    if isinstance(expr, Symbol):
+        return '%s(%r)' % (constructor, expr.name)
+    return '%s(%r)' % (constructor, expr.val)
+
+
+class Runtime(object):
+    """Interpreter the top-level forms of a compiled module run in.
+
+    Procedures translated ahead of time are defined like any other
+    and then given their native code, so they are the same compound
+    procedures the interpreter makes and interpreted code can call
+    them, print them or redefine them.
+    """
+
+    def __init__(self):
+        self.interpreter = Interpreter(jit=True)
+        self.env = self.interpreter.env
+        self.jit = self.interpreter.jit
+        # the primitives as bound before the module ran, the fast paths
+        # of native code check the globals against them
+        self.builtins = dict((symbol.name, value) for symbol, value
+                             in self.env.bindings.items())
+
+    def evaluate(self, expr):
+        if is_load(expr):
+            return load(self.interpreter, expr)
+        return self.interpreter.interpret(expr)
+
+    def define(self, name, expr, factory=None, objects=None):
+        """Define `name` to the value of the expression `expr`.
+
+        With `factory` the procedure gets native code: the function
+        returned by `factory`, called with the JIT helpers and the
+        objects described by `objects` (see Translator.translate_lambda).
+        """
+        self.evaluate(tolist(Symbol('define'), Symbol(name), expr))
+        if factory is None:
+            return
+
+        proc = self.env.load(Symbol(name))
+        namespace = self.jit.helpers()
+        for pyname, (kind, value) in objects.items():
+            if kind == 'g':
+                value = self.env.cell(Symbol(value))
+            elif kind == 'p':
+                value = self.builtins[value]
+            elif kind == 'i':
+                primitive, count = value
+                value = self.builtins[primitive].fixed[count]
+            elif kind == 's':
+                value = proc
+            namespace[pyname] = value
+        self.jit.install(proc, factory(**namespace))
+
+    def export(self, name):
+        """Return the value of the global `name` for Python code.
+
+        A procedure comes back as a Python function that applies
+        whatever `name` is bound to when it is called.
+        """
+        value = self.env.load(Symbol(name))
+        if not (procedure.is_compound_procedure(value) or
+                procedure.is_primitive_procedure(value)):
+            return value
+
+        cell = self.env.cell(Symbol(name))
+        def function(*args):
+            return self.jit.call(self.jit._ref(cell), *args)
+        function.__name__ = 'scheme_' + Translator.identifier(name)
+        return function
+
+
+class ModuleCompiler(object):
+    """Compiles Scheme source text into the source of a Python module.
+
+    Top-level definitions of procedures go through serval.jit.Translator
+    and become Python functions, everything else (and procedures the
+    translator gives up on) is kept as data the module hands to the
+    interpreter when it is imported. Either way nothing is lexed or
+    parsed at import time. Every top-level definition is exported as
+    a module attribute, see Runtime.export.
+    """
+
+    def __init__(self):
+        self.translator = Translator(setup_environment(),
+                                     Interpreter.special_forms)
+        # (procedure name, reason) of failed translations
+        self.fallbacks = []
+
+    def compile(self, text, filename='<string>'):
+        """Return the source of the module for the Scheme `text`."""
+        self.fallbacks = []
+        lines = [MODULE_HEADER % os.path.basename(filename)]
+        names = []
+        for index, expr in enumerate(Parser(Lexer(text)).parse()):
+            if definition.is_definition(expr):
+                name = definition.definition_variable(expr).name
+                if name not in names:
+                    names.append(name)
+                lines.append(self._definition(
+                    name, definition.definition_value(expr), index))
+            else:
+                if record.is_record_definition(expr):
+                    names.extend(name for name in
+                                 record.record_definition_names(expr)
+                                 if name not in names)
+                lines.append('_runtime.evaluate(%s)\n' % datum_source(expr))
+
+        exports = {}
+        for name in names:
+            pyname = Translator.identifier(name)
+            if (keyword.iskeyword(pyname) or pyname[0].isdigit() or
+                pyname.startswith('_')):
+                pyname = 'scheme_' + pyname.lstrip('_')
+            while pyname in exports.values():
+                pyname += '_'
+            exports[name] = pyname
+            lines.append('%s = _runtime.export(%r)' % (pyname, name))
+        lines.append('\n__all__ = %r\n' % sorted(exports.values()))
+        return '\n'.join(lines)
+
+    def _definition(self, name, value, index):
+        native = self._translate(name, value)
+        if native is None:
+            return '_runtime.define(%r, %s)\n' % (name, datum_source(value))
+
+        funcname, source, objects = native
+        factory = '_native%d' % index
+        # in the order the translator made them up
+        params = sorted(self.translator.namespace,
+                        key=lambda p: int(re.match(r'\D+(\d+)', p).group(1)))
+        body = ''.join('    ' + line + '\n' for line in source.splitlines())
+        return (
+            '# %s\n'
+            'def %s(TailCall, truth, ref, call, caller, tail_caller%s):\n'
+            '%s'
+            '    return %s\n\n'
+            '_runtime.define(\n'
+            '    %r,\n'
+            '    %s,\n'
+            '    %s,\n'
+            '    {%s})\n' % (
+                name, factory, ''.join(', ' + p for p in params), body,
+                funcname, name, datum_source(value), factory,
+                ', '.join('%r: %s' % (p, objects[p]) for p in params)))
+
+    def _translate(self, name, value):
+        if not lambdaexpr.is_lambda(value):
+            return None
+
+        try:
+            funcname, source, namespace = self.translator.translate_lambda(
+                lambdaexpr.lambda_parameters(value),
+                lambdaexpr.lambda_body(value), name)
+            objects = {}
+            for pyname, (kind, hint) in self.translator.objects.items():
+                # constants are built in place, the rest by Runtime.define
+                payload = (namespace[pyname] if kind == 'k' else
+                           None if kind == 's' else hint)
+                objects[pyname] = '(%r, %s)' % (
+                    kind, datum_source(payload) if kind == 'k'
+                    else repr(payload))
+        except TranslationError as e:
+            self.fallbacks.append((name, str(e)))
+            return None
+        return funcname, source, objects
+
+
+def compile_file(path, output=None):
+    """Compile the Scheme file `path` into a Python module.
+
+    The module is written next to `path` unless `output` says where.
+    Return the compiler, its `fallbacks` list the procedures left
+    to the interpreter.
+    """
+    if output is None:
+        output = os.path.splitext(path)[0] + '.py'
+
+    compiler = ModuleCompiler()
+    with open(path) as infile:
+        source = compiler.compile(infile.read(), path)
+    with open(output, 'w') as outfile:
+        outfile.write(source)
+    return compiler
+
+
+def main():
+    parser = optparse.OptionParser(
+        usage='%prog [-o OUTPUT] FILE.scm',
+        description='Compile a Scheme file into an importable Python module.')
+    parser.add_option('-o', '--output', help='module file to write, '
+                      'FILE.py by default')
+    options, args = parser.parse_args()
+    if len(args) != 1:
+        parser.error('expected one Scheme file')
+
+    compiler = compile_file(args[0], options.output)
+    for name, reason in compiler.fallbacks:
+        print >> sys.stderr, '%s: %s stays interpreted: %s' % (
+            args[0], name, reason)
@@ -27,29 +27,47 @@ __author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
 import operator
 import functools
 
-from serval.model import Number, Boolean, Pair, EmptyList
-from serval.expression.util import cdr
+from serval.model import (
+    Number, String, Symbol, Pair, EmptyList, Vector, HashTable, TRUE, FALSE,
+    PrimitiveProcedure, RecordType, NUMBER_TYPES, is_true, is_number,
+    number_value
+    )
+from serval.numeric import NumericVector
+from serval.persistent import PersistentMap, PersistentVector
+from serval import numeric
+from serval.expression.util import pair_to_list
 
 
 def _perform_arithmetic_function(func, *args):
     return Number(reduce(func, [int(arg.val) for arg in args]))
 
-builtin_add = functools.partial(_perform_arithmetic_function, operator.add)
-builtin_sub = functools.partial(_perform_arithmetic_function, operator.sub)
-builtin_mul = functools.partial(_perform_arithmetic_function, operator.mul)
-builtin_div = functools.partial(_perform_arithmetic_function, operator.div)
+def builtin_add(*args):
+    return Number(reduce(operator.add, [int(arg.val) for arg in args], 0))
+
+def builtin_mul(*args):
+    return Number(reduce(operator.mul, [int(arg.val) for arg in args], 1))
+
+def builtin_sub(*args):
+    if len(args) == 1:
+        return builtin_negate(args[0])
+    return _perform_arithmetic_function(operator.sub, *args)
+
+def builtin_div(*args):
+    if len(args) == 1:
+        return builtin_reciprocal(args[0])
+    return _perform_arithmetic_function(operator.div, *args)
 
 def _perform_comparison(func, *args):
     if len(args) == 1:
-        return Boolean(True)
+        return TRUE
 
     prev, rest = args[0], args[1:]
     for arg in rest:
         if not func(prev, arg):
-            return Boolean(False)
+            return FALSE
         prev = arg
 
-    return Boolean(True)
+    return TRUE
 
 builtin_eq = functools.partial(_perform_comparison, operator.eq)
 builtin_lt = functools.partial(_perform_comparison, operator.lt)
@@ -57,23 +75,65 @@ builtin_le = functools.partial(_perform_comparison, operator.le)
 builtin_gt = functools.partial(_perform_comparison, operator.gt)
 builtin_ge = functools.partial(_perform_comparison, operator.ge)
 
-def builtin_pair_p(*args):
-    arg = args[0]
-    return Boolean(isinstance(arg, Pair))
+#################################
+# Fixed arity fast paths
+#################################
+def builtin_identity(arg):
+    return Number(int(arg.val))
+
+def builtin_negate(arg):
+    return Number(-int(arg.val))
+
+def builtin_reciprocal(arg):
+    # no rationals: 1/x is a float
+    return Number(1.0 / int(arg.val))
+
+def builtin_add2(first, second):
+    return Number(int(first.val) + int(second.val))
+
+def builtin_sub2(first, second):
+    return Number(int(first.val) - int(second.val))
+
+def builtin_mul2(first, second):
+    return Number(int(first.val) * int(second.val))
+
+def builtin_div2(first, second):
+    return Number(int(first.val) / int(second.val))
+
+def builtin_true(arg):
+    return TRUE
+
+def builtin_eq2(first, second):
+    return TRUE if first == second else FALSE
+
+def builtin_lt2(first, second):
+    return TRUE if first < second else FALSE
+
+def builtin_le2(first, second):
+    return TRUE if first <= second else FALSE
 
-def builtin_null_p(*args):
-    return Boolean(args[0] is EmptyList)
+def builtin_gt2(first, second):
+    return TRUE if first > second else FALSE
 
-def builtin_cons(*args):
-    first, second = args
+def builtin_ge2(first, second):
+    return TRUE if first >= second else FALSE
+
+#################################
+# Other primitives
+#################################
+def builtin_pair_p(arg):
+    return TRUE if isinstance(arg, Pair) else FALSE
+
+def builtin_null_p(arg):
+    return TRUE if arg is EmptyList else FALSE
+
+def builtin_cons(first, second):
     return Pair(first, second)
 
-def builtin_car(*args):
-    arg = args[0]
+def builtin_car(arg):
     return arg.head
 
-def builtin_cdr(*args):
-    arg = args[0]
+def builtin_cdr(arg):
     return arg.tail
 
 def builtin_list(*args):
@@ -84,42 +144,467 @@ def builtin_list(*args):
 
     return inner(args)
 
-def builtin_abs(*args):
-    return Number(abs(args[0].val))
+def builtin_abs(arg):
+    return Number(abs(arg.val))
+
+def builtin_not(arg):
+    return FALSE if is_true(arg) else TRUE
 
-def builtin_not(*args):
-    return Boolean(not bool(args[0]))
+def builtin_eq_p(first, second):
+    # symbols, booleans and characters are canonical, the rest
+    # compare by value
+    return TRUE if first is second or first == second else FALSE
 
-def builtin_eq_p(*args):
-    first, second = args
-    return Boolean(first == second)
+def builtin_eqv_p(first, second):
+    return TRUE if eqv(first, second) else FALSE
 
-def builtin_zero_p(*args):
-    return Boolean(args[0] == Number(0))
+def builtin_equal_p(first, second):
+    return TRUE if equal(first, second) else FALSE
 
-def builtin_number_p(*args):
-    return Boolean(isinstance(args[0], Number))
+def builtin_zero_p(arg):
+    # works for Number objects and Python numbers
+    return TRUE if arg == 0 else FALSE
 
-def builtin_expt(*args):
-    first, second = args
+def builtin_number_p(arg):
+    return TRUE if isinstance(arg, Number) else FALSE
+
+def builtin_expt(first, second):
     return Number(first.val ** second.val)
 
-def builtin_length(*args):
-    alist = args[0]
+def builtin_length(alist):
+    return Number(unboxed_length(alist))
+
+def builtin_even_p(arg):
+    return TRUE if arg.val % 2 == 0 else FALSE
+
+#################################
+# Vectors
+#################################
+def _vector_index(vector, k, name):
+    index = number_value(k)
+    if not 0 <= index < len(vector.items):
+        raise IndexError('Index out of range - %s %s' % (name, k))
+    return index
+
+def builtin_make_vector(k, fill=FALSE):
+    return Vector([fill] * number_value(k))
+
+def builtin_vector(*args):
+    return Vector(list(args))
+
+def builtin_vector_ref(vector, k):
+    return vector.items[_vector_index(vector, k, 'VECTOR-REF')]
+
+def builtin_vector_set(vector, k, obj):
+    vector.items[_vector_index(vector, k, 'VECTOR-SET!')] = obj
+    return Symbol('ok')
+
+def builtin_vector_length(vector):
+    return Number(len(vector.items))
+
+def builtin_vector_to_list(vector):
+    result = EmptyList
+    for item in reversed(vector.items):
+        result = Pair(item, result)
+    return result
+
+def builtin_list_to_vector(alist):
+    return Vector(pair_to_list(alist))
+
+def builtin_vector_fill(vector, obj):
+    vector.items[:] = [obj] * len(vector.items)
+    return Symbol('ok')
+
+#################################
+# Hash tables
+#################################
+# the missing default of a lookup, no Scheme value is this object
+_MISSING = object()
+
+class EqualKey(object):
+    """Key of an equal? hash table, compares its object with equal?."""
+
+    __slots__ = ('obj', 'hash')
+
+    def __init__(self, obj):
+        self.obj = obj
+        self.hash = equal_hash(obj)
+
+    def __hash__(self):
+        return self.hash
+
+    def __eq__(self, other):
+        return self.hash == other.hash and equal(self.obj, other.obj)
+
+def _hash_key(table, key):
+    # eq? compares numbers and strings by value, which is what their
+    # __eq__ and __hash__ do, and everything else by identity
+    return EqualKey(key) if table.equal else key
+
+def builtin_make_hash_table(equivalence=None):
+    if equivalence is None:
+        return HashTable(equal=True)
+    implementation = getattr(equivalence, 'implementation', None)
+    if implementation is builtin_equal_p:
+        return HashTable(equal=True)
+    if implementation is builtin_eq_p:
+        return HashTable(equal=False)
+    raise ValueError(
+        'Expecting eq? or equal? - MAKE-HASH-TABLE %s' % equivalence)
+
+def builtin_hash_table_ref(table, key, default=_MISSING):
+    value = table.table.get(_hash_key(table, key), default)
+    if value is _MISSING:
+        raise KeyError('No value for key - HASH-TABLE-REF %s' % key)
+    return value
+
+def builtin_hash_table_set(table, key, value):
+    table.table[_hash_key(table, key)] = value
+    return Symbol('ok')
+
+def builtin_hash_table_delete(table, key):
+    table.table.pop(_hash_key(table, key), None)
+    return Symbol('ok')
+
+def builtin_hash_table_count(table):
+    return Number(len(table.table))
+
+def builtin_hash_table_to_alist(table):
+    result = EmptyList
+    for key, value in table.table.items():
+        if table.equal:
+            key = key.obj
+        result = Pair(Pair(key, value), result)
+    return result
+
+#################################
+# Persistent data structures
+#################################
+def _persistent_map(items):
+    # keys compare with equal?, like the default hash tables
+    return PersistentMap.from_items(items, equal_hash, equal)
+
+def builtin_persistent_map(*args):
+    if len(args) % 2:
+        raise ValueError('Expecting keys and values - PERSISTENT-MAP')
+    return _persistent_map(zip(args[::2], args[1::2]))
+
+def builtin_alist_to_persistent_map(alist):
+    return _persistent_map((pair.head, pair.tail)
+                           for pair in pair_to_list(alist))
+
+def builtin_persistent_map_ref(pmap, key, default=_MISSING):
+    value = pmap.get(key, default)
+    if value is _MISSING:
+        raise KeyError('No value for key - PERSISTENT-MAP-REF %s' % key)
+    return value
+
+def builtin_persistent_map_set(pmap, key, value):
+    return pmap.set(key, value)
+
+def builtin_persistent_map_delete(pmap, key):
+    return pmap.delete(key)
+
+def builtin_persistent_map_count(pmap):
+    return Number(len(pmap))
+
+def builtin_persistent_map_to_alist(pmap):
+    result = EmptyList
+    for key, value in pmap.items():
+        result = Pair(Pair(key, value), result)
+    return result
+
+def builtin_persistent_vector(*args):
+    return PersistentVector.from_items(args)
+
+def builtin_list_to_persistent_vector(alist):
+    return PersistentVector.from_items(pair_to_list(alist))
+
+def builtin_persistent_vector_ref(pvector, k):
+    return pvector.get(number_value(k))
+
+def builtin_persistent_vector_set(pvector, k, obj):
+    return pvector.set(number_value(k), obj)
+
+def builtin_persistent_vector_push(pvector, obj):
+    return pvector.append(obj)
+
+def builtin_persistent_vector_length(pvector):
+    return Number(len(pvector))
 
-    def inner(arg, count):
-        if arg is EmptyList:
-            return count
-        return inner(cdr(arg), count + 1)
+def builtin_persistent_vector_to_list(pvector):
+    result = EmptyList
+    for item in reversed(list(pvector)):
+        result = Pair(item, result)
+    return result
 
-    return inner(alist, 0)
+#################################
+# Numeric vectors
+#################################
+def _pair_list(items):
+    result = EmptyList
+    for item in reversed(items):
+        result = Pair(item, result)
+    return result
 
-def builtin_even_p(*args):
-    return Boolean(args[0].val % 2 == 0)
+def _numeric_vector(kind, *args):
+    return numeric.make(kind, [number_value(arg) for arg in args])
+
+def _make_numeric_vector(kind, k, fill=0):
+    return numeric.make(kind, [number_value(fill)] * number_value(k))
+
+def _numeric_vector_p(kind, obj):
+    return (TRUE if isinstance(obj, NumericVector) and obj.kind == kind
+            else FALSE)
+
+def _list_to_numeric_vector(kind, alist):
+    return _numeric_vector(kind, *pair_to_list(alist))
+
+def _vector_to_numeric_vector(kind, vector):
+    return _numeric_vector(kind, *vector.items)
+
+builtin_make_f64vector = functools.partial(_make_numeric_vector, 'f64')
+builtin_make_s64vector = functools.partial(_make_numeric_vector, 's64')
+builtin_f64vector = functools.partial(_numeric_vector, 'f64')
+builtin_s64vector = functools.partial(_numeric_vector, 's64')
+builtin_f64vector_p = functools.partial(_numeric_vector_p, 'f64')
+builtin_s64vector_p = functools.partial(_numeric_vector_p, 's64')
+builtin_list_to_f64vector = functools.partial(_list_to_numeric_vector, 'f64')
+builtin_list_to_s64vector = functools.partial(_list_to_numeric_vector, 's64')
+builtin_vector_to_f64vector = functools.partial(_vector_to_numeric_vector,
+                                                'f64')
+builtin_vector_to_s64vector = functools.partial(_vector_to_numeric_vector,
+                                                's64')
+
+# the f64vector and s64vector accessors share these
+def builtin_numeric_vector_ref(vector, k):
+    return Number(vector.get(number_value(k)))
+
+def builtin_numeric_vector_set(vector, k, obj):
+    vector.set(number_value(k), number_value(obj))
+    return Symbol('ok')
+
+def builtin_numeric_vector_length(vector):
+    return Number(len(vector))
+
+def builtin_numeric_vector_to_list(vector):
+    return _pair_list(map(Number, vector.tolist()))
+
+def builtin_numeric_vector_to_vector(vector):
+    return Vector(map(Number, vector.tolist()))
+
+def _numeric_operand(obj):
+    return number_value(obj) if is_number(obj) else obj
+
+def builtin_vector_add(first, second):
+    return numeric.binary('add', _numeric_operand(first),
+                          _numeric_operand(second))
+
+def builtin_vector_mul(first, second):
+    return numeric.binary('mul', _numeric_operand(first),
+                          _numeric_operand(second))
+
+def builtin_vector_sum(vector):
+    return Number(numeric.total(vector))
+
+def builtin_vector_dot(first, second):
+    return Number(numeric.dot(first, second))
+
+# primitive procedure name and number of operands -> numeric operation
+VECTORIZED_PROCEDURES = {
+    ('+', 2): 'add',
+    ('-', 2): 'sub',
+    ('*', 2): 'mul',
+    ('-', 1): 'neg',
+    ('abs', 1): 'abs',
+    }
+
+def builtin_vector_map(proc, *args):
+    operation = None
+    if isinstance(proc, PrimitiveProcedure):
+        operation = VECTORIZED_PROCEDURES.get((proc.name, len(args)))
+    if operation is None:
+        raise ValueError('Expecting +, -, * or abs - VECTOR-MAP %s' % proc)
+    operands = [_numeric_operand(arg) for arg in args]
+    if len(operands) == 1:
+        return numeric.unary(operation, *operands)
+    return numeric.binary(operation, *operands)
+
+#################################
+# Records
+#################################
+# the procedures define-record-type expands into, see
+# serval.expression.record
+def builtin_make_record_type(name, fields):
+    return RecordType(name.name,
+                      [field.name for field in pair_to_list(fields)])
+
+def builtin_record_constructor(rtd, fields):
+    cls, new = rtd.cls, rtd.cls.__new__
+    slots = [rtd.slot(field.name) for field in pair_to_list(fields)]
+    unset = [slot for slot in cls.__slots__ if slot not in slots]
+
+    def constructor(*args):
+        record = new(cls)
+        for slot, value in zip(slots, args):
+            setattr(record, slot, value)
+        for slot in unset:
+            setattr(record, slot, FALSE)
+        return record
+
+    return PrimitiveProcedure(constructor, 'make-%s' % rtd.name,
+                              (len(slots), len(slots)))
+
+def builtin_record_predicate(rtd):
+    cls = rtd.cls
+
+    def predicate(obj):
+        return TRUE if obj.__class__ is cls else FALSE
+
+    return PrimitiveProcedure(predicate, '%s?' % rtd.name, (1, 1))
+
+def _check_record(record, rtd, name):
+    if record.__class__ is not rtd.cls:
+        raise TypeError('Expecting a %s record - %s %s' %
+                        (rtd.name, name, record))
+
+def builtin_record_accessor(rtd, field):
+    name = '%s-%s' % (rtd.name, field.name)
+    get = operator.attrgetter(rtd.slot(field.name))
+
+    def accessor(record):
+        _check_record(record, rtd, name)
+        return get(record)
+
+    return PrimitiveProcedure(accessor, name, (1, 1))
+
+def builtin_record_modifier(rtd, field):
+    name = 'set-%s-%s!' % (rtd.name, field.name)
+    slot = rtd.slot(field.name)
+
+    def modifier(record, value):
+        _check_record(record, rtd, name)
+        setattr(record, slot, value)
+        return Symbol('ok')
+
+    return PrimitiveProcedure(modifier, name, (2, 2))
+
+#################################
+# Equivalence
+#################################
+def eqv(first, second):
+    """Return True if `first` and `second` are eqv? in Scheme."""
+    if first is second:
+        return True
+    if is_number(first) and is_number(second):
+        first, second = number_value(first), number_value(second)
+        # exact and inexact numbers are never eqv?
+        return (first == second and
+                isinstance(first, float) == isinstance(second, float))
+    return False
+
+def equal(first, second):
+    """Return True if `first` and `second` are equal? in Scheme.
+
+    Lists are compared with an explicit stack instead of recursion.
+    """
+    stack = [(first, second)]
+    while stack:
+        first, second = stack.pop()
+        if eqv(first, second):
+            continue
+        if first.__class__ is Pair and second.__class__ is Pair:
+            stack.append((first.tail, second.tail))
+            stack.append((first.head, second.head))
+        elif first.__class__ is Vector and second.__class__ is Vector:
+            if len(first.items) != len(second.items):
+                return False
+            stack.extend(zip(first.items, second.items))
+        elif first.__class__ is String and second.__class__ is String:
+            if first.val != second.val:
+                return False
+        else:
+            return False
+
+    return True
+
+def equal_hash(obj):
+    """Return a hash of `obj` that is the same for equal? objects."""
+    result = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if obj.__class__ is Pair:
+            result = (result * 31 + 17) & 0xffffffff
+            stack.append(obj.tail)
+            stack.append(obj.head)
+        elif obj.__class__ is Vector:
+            result = (result * 31 + 19 + len(obj.items)) & 0xffffffff
+            stack.extend(obj.items)
+        else:
+            if is_number(obj):
+                obj = number_value(obj)
+            result = (result * 31 + hash(obj)) & 0xffffffff
+    return result
+
+#################################
+# Unboxed numbers
+#################################
+def unboxed_add(*args):
+    return reduce(operator.add, args, 0)
+
+def unboxed_mul(*args):
+    return reduce(operator.mul, args, 1)
+
+def unboxed_sub(*args):
+    if len(args) == 1:
+        return -args[0]
+    return reduce(operator.sub, args)
+
+def unboxed_div(*args):
+    if len(args) == 1:
+        return unboxed_reciprocal(args[0])
+    return reduce(operator.div, args)
+
+def unboxed_reciprocal(arg):
+    return 1.0 / arg
+
+def unboxed_number_p(arg):
+    return TRUE if arg.__class__ in NUMBER_TYPES else FALSE
+
+def unboxed_length(alist):
+    count = 0
+    while alist is not EmptyList:
+        alist = alist.tail
+        count += 1
+    return count
+
+def unboxed_vector_length(vector):
+    return len(vector.items)
+
+def unboxed_hash_table_count(table):
+    return len(table.table)
+
+def unboxed_persistent_length(collection):
+    return len(collection)
+
+def unboxed_even_p(arg):
+    return TRUE if arg % 2 == 0 else FALSE
+
+def unboxed_numeric_vector_ref(vector, k):
+    return vector.get(k)
+
+def unboxed_numeric_vector_to_list(vector):
+    return _pair_list(vector.tolist())
+
+def unboxed_numeric_vector_to_vector(vector):
+    return Vector(vector.tolist())
 
 BUILTIN_PROCEDURES = [
     ('pair?', builtin_pair_p),
     ('eq?', builtin_eq_p),
+    ('eqv?', builtin_eqv_p),
+    ('equal?', builtin_equal_p),
     ('cons', builtin_cons),
     ('car', builtin_car),
     ('cdr', builtin_cdr),
@@ -132,6 +617,64 @@ BUILTIN_PROCEDURES = [
     ('expt', builtin_expt),
     ('length', builtin_length),
     ('even?', builtin_even_p),
+    ('make-vector', builtin_make_vector),
+    ('vector', builtin_vector),
+    ('vector-ref', builtin_vector_ref),
+    ('vector-set!', builtin_vector_set),
+    ('vector-length', builtin_vector_length),
+    ('vector->list', builtin_vector_to_list),
+    ('list->vector', builtin_list_to_vector),
+    ('vector-fill!', builtin_vector_fill),
+    ('make-hash-table', builtin_make_hash_table),
+    ('hash-table-ref', builtin_hash_table_ref),
+    ('hash-table-set!', builtin_hash_table_set),
+    ('hash-table-delete!', builtin_hash_table_delete),
+    ('hash-table-count', builtin_hash_table_count),
+    ('hash-table->alist', builtin_hash_table_to_alist),
+    ('persistent-map', builtin_persistent_map),
+    ('alist->persistent-map', builtin_alist_to_persistent_map),
+    ('persistent-map-ref', builtin_persistent_map_ref),
+    ('persistent-map-set', builtin_persistent_map_set),
+    ('persistent-map-delete', builtin_persistent_map_delete),
+    ('persistent-map-count', builtin_persistent_map_count),
+    ('persistent-map->alist', builtin_persistent_map_to_alist),
+    ('persistent-vector', builtin_persistent_vector),
+    ('list->persistent-vector', builtin_list_to_persistent_vector),
+    ('persistent-vector-ref', builtin_persistent_vector_ref),
+    ('persistent-vector-set', builtin_persistent_vector_set),
+    ('persistent-vector-push', builtin_persistent_vector_push),
+    ('persistent-vector-length', builtin_persistent_vector_length),
+    ('persistent-vector->list', builtin_persistent_vector_to_list),
+    ('make-f64vector', builtin_make_f64vector),
+    ('f64vector', builtin_f64vector),
+    ('f64vector?', builtin_f64vector_p),
+    ('f64vector-ref', builtin_numeric_vector_ref),
+    ('f64vector-set!', builtin_numeric_vector_set),
+    ('f64vector-length', builtin_numeric_vector_length),
+    ('f64vector->list', builtin_numeric_vector_to_list),
+    ('list->f64vector', builtin_list_to_f64vector),
+    ('f64vector->vector', builtin_numeric_vector_to_vector),
+    ('vector->f64vector', builtin_vector_to_f64vector),
+    ('make-s64vector', builtin_make_s64vector),
+    ('s64vector', builtin_s64vector),
+    ('s64vector?', builtin_s64vector_p),
+    ('s64vector-ref', builtin_numeric_vector_ref),
+    ('s64vector-set!', builtin_numeric_vector_set),
+    ('s64vector-length', builtin_numeric_vector_length),
+    ('s64vector->list', builtin_numeric_vector_to_list),
+    ('list->s64vector', builtin_list_to_s64vector),
+    ('s64vector->vector', builtin_numeric_vector_to_vector),
+    ('vector->s64vector', builtin_vector_to_s64vector),
+    ('vector-add', builtin_vector_add),
+    ('vector-mul', builtin_vector_mul),
+    ('vector-sum', builtin_vector_sum),
+    ('vector-dot', builtin_vector_dot),
+    ('vector-map', builtin_vector_map),
+    ('make-record-type', builtin_make_record_type),
+    ('record-constructor', builtin_record_constructor),
+    ('record-predicate', builtin_record_predicate),
+    ('record-accessor', builtin_record_accessor),
+    ('record-modifier', builtin_record_modifier),
     ('+', builtin_add),
     ('-', builtin_sub),
     ('*', builtin_mul),
@@ -142,3 +685,154 @@ BUILTIN_PROCEDURES = [
     ('>', builtin_gt),
     ('>=', builtin_ge),
     ]
+
+# (minimum, maximum) number of arguments, maximum None for any number
+BUILTIN_ARITIES = {
+    'pair?': (1, 1),
+    'eq?': (2, 2),
+    'eqv?': (2, 2),
+    'equal?': (2, 2),
+    'cons': (2, 2),
+    'car': (1, 1),
+    'cdr': (1, 1),
+    'list': (0, None),
+    'abs': (1, 1),
+    'null?': (1, 1),
+    'not': (1, 1),
+    'zero?': (1, 1),
+    'number?': (1, 1),
+    'expt': (2, 2),
+    'length': (1, 1),
+    'even?': (1, 1),
+    'make-vector': (1, 2),
+    'vector': (0, None),
+    'vector-ref': (2, 2),
+    'vector-set!': (3, 3),
+    'vector-length': (1, 1),
+    'vector->list': (1, 1),
+    'list->vector': (1, 1),
+    'vector-fill!': (2, 2),
+    'make-hash-table': (0, 1),
+    'hash-table-ref': (2, 3),
+    'hash-table-set!': (3, 3),
+    'hash-table-delete!': (2, 2),
+    'hash-table-count': (1, 1),
+    'hash-table->alist': (1, 1),
+    'persistent-map': (0, None),
+    'alist->persistent-map': (1, 1),
+    'persistent-map-ref': (2, 3),
+    'persistent-map-set': (3, 3),
+    'persistent-map-delete': (2, 2),
+    'persistent-map-count': (1, 1),
+    'persistent-map->alist': (1, 1),
+    'persistent-vector': (0, None),
+    'list->persistent-vector': (1, 1),
+    'persistent-vector-ref': (2, 2),
+    'persistent-vector-set': (3, 3),
+    'persistent-vector-push': (2, 2),
+    'persistent-vector-length': (1, 1),
+    'persistent-vector->list': (1, 1),
+    'make-f64vector': (1, 2),
+    'f64vector': (0, None),
+    'f64vector?': (1, 1),
+    'f64vector-ref': (2, 2),
+    'f64vector-set!': (3, 3),
+    'f64vector-length': (1, 1),
+    'f64vector->list': (1, 1),
+    'list->f64vector': (1, 1),
+    'f64vector->vector': (1, 1),
+    'vector->f64vector': (1, 1),
+    'make-s64vector': (1, 2),
+    's64vector': (0, None),
+    's64vector?': (1, 1),
+    's64vector-ref': (2, 2),
+    's64vector-set!': (3, 3),
+    's64vector-length': (1, 1),
+    's64vector->list': (1, 1),
+    'list->s64vector': (1, 1),
+    's64vector->vector': (1, 1),
+    'vector->s64vector': (1, 1),
+    'vector-add': (2, 2),
+    'vector-mul': (2, 2),
+    'vector-sum': (1, 1),
+    'vector-dot': (2, 2),
+    'vector-map': (2, 3),
+    'make-record-type': (2, 2),
+    'record-constructor': (2, 2),
+    'record-predicate': (1, 1),
+    'record-accessor': (2, 2),
+    'record-modifier': (2, 2),
+    '+': (0, None),
+    '-': (1, None),
+    '*': (0, None),
+    '/': (1, None),
+    '=': (1, None),
+    '<': (1, None),
+    '<=': (1, None),
+    '>': (1, None),
+    '>=': (1, None),
+    }
+
+# implementations of the variadic builtins for a fixed number of
+# arguments, keyed by that number
+BUILTIN_SPECIALIZATIONS = {
+    '+': {1: builtin_identity, 2: builtin_add2},
+    '-': {1: builtin_negate, 2: builtin_sub2},
+    '*': {1: builtin_identity, 2: builtin_mul2},
+    '/': {1: builtin_reciprocal, 2: builtin_div2},
+    '=': {1: builtin_true, 2: builtin_eq2},
+    '<': {1: builtin_true, 2: builtin_lt2},
+    '<=': {1: builtin_true, 2: builtin_le2},
+    '>': {1: builtin_true, 2: builtin_gt2},
+    '>=': {1: builtin_true, 2: builtin_ge2},
+    }
+
+# builtins that differ when Scheme numbers are plain Python numbers,
+# the comparisons work on both
+UNBOXED_PROCEDURES = {
+    'abs': abs,
+    'number?': unboxed_number_p,
+    'expt': operator.pow,
+    'even?': unboxed_even_p,
+    'length': unboxed_length,
+    'vector-length': unboxed_vector_length,
+    'hash-table-count': unboxed_hash_table_count,
+    'persistent-map-count': unboxed_persistent_length,
+    'persistent-vector-length': unboxed_persistent_length,
+    'f64vector-ref': unboxed_numeric_vector_ref,
+    'f64vector-length': len,
+    'f64vector->list': unboxed_numeric_vector_to_list,
+    'f64vector->vector': unboxed_numeric_vector_to_vector,
+    's64vector-ref': unboxed_numeric_vector_ref,
+    's64vector-length': len,
+    's64vector->list': unboxed_numeric_vector_to_list,
+    's64vector->vector': unboxed_numeric_vector_to_vector,
+    'vector-sum': numeric.total,
+    'vector-dot': numeric.dot,
+    '+': unboxed_add,
+    '-': unboxed_sub,
+    '*': unboxed_mul,
+    '/': unboxed_div,
+    }
+
+UNBOXED_SPECIALIZATIONS = dict(
+    BUILTIN_SPECIALIZATIONS,
+    **{'+': {1: operator.pos, 2: operator.add},
+       '-': {1: operator.neg, 2: operator.sub},
+       '*': {1: operator.pos, 2: operator.mul},
+       '/': {1: unboxed_reciprocal, 2: operator.div},
+       })
+
+# builtins written in Scheme on top of the primitives (they call
+# procedures given to them), every evaluator runs these definitions
+# when it starts
+BUILTIN_DEFINITIONS = """
+(define (hash-table-walk table proc)
+  (define (walk entries)
+    (if (null? entries)
+      'ok
+      (begin
+        (proc (car (car entries)) (cdr (car entries)))
+        (walk (cdr entries)))))
+  (walk (hash-table->alist table)))
+"""
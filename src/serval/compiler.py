@@ -0,0 +1,354 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+from serval.model import TRUE, FALSE, UNSPECIFIED, EmptyList
+from serval.expression import (
+    selfeval, quote, definition, variable,
+    assignment, conditional, lambdaexpr,
+    procedure, sequence, binding, record
+    )
+from serval.expression.util import cons, pair_to_list
+from serval.scope import CompileTimeEnvironment, scan_out_defines
+
+#################################
+# Instruction set
+#################################
+# Every instruction takes two slots in the instruction stream:
+# the opcode and its argument (0 when the opcode takes none).
+#
+# Locals live in frames, lists holding the enclosing frame followed
+# by the arguments and the internal definitions of a procedure call.
+# They are referred to by a (depth, index, name) address resolved at
+# compile time; globals are referred to by their cell in the global
+# environment (see serval.scope.GlobalEnvironment).
+LOAD_CONST = 0           # push constants[arg]
+LOCAL_REF = 1            # push the local at address constants[arg]
+GLOBAL_REF = 2           # push the value of the cell constants[arg]
+# SET and DEFINE instructions pop the value and push the symbol ok
+LOCAL_SET = 3            # set the local at address constants[arg]
+GLOBAL_SET = 4           # set the global of the cell constants[arg]
+DEFINE_LOCAL = 5         # set slot arg of the current frame
+DEFINE_GLOBAL = 6        # bind the global of the cell constants[arg]
+JUMP = 7                 # continue at arg
+JUMP_IF_FALSE = 8        # pop, continue at arg if the value is false
+JUMP_IF_TRUE_OR_POP = 9  # continue at arg keeping a true value, else pop
+CALL = 10                # call the procedure under arg arguments
+TAIL_CALL = 11           # same as CALL, but reuse the current frame
+RETURN = 12              # return the value on top of the stack
+MAKE_CLOSURE = 13        # push a closure of constants[arg] (a Code)
+POP = 14                 # discard the value on top of the stack
+
+OPCODE_NAMES = [
+    'LOAD_CONST', 'LOCAL_REF', 'GLOBAL_REF', 'LOCAL_SET', 'GLOBAL_SET',
+    'DEFINE_LOCAL', 'DEFINE_GLOBAL', 'JUMP', 'JUMP_IF_FALSE',
+    'JUMP_IF_TRUE_OR_POP', 'CALL', 'TAIL_CALL', 'RETURN', 'MAKE_CLOSURE',
+    'POP',
+    ]
+
+
+class CompilerException(Exception):
+    pass
+
+
+class Code(object):
+    """Compiled body of a procedure or of a top level expression."""
+
+    def __init__(self, name, params, body):
+        self.name = name
+        names, self.rest = lambdaexpr.parameter_names(params)
+        # number of required arguments
+        self.arity = len(names)
+        # names of the parameters in the order of the arguments, the
+        # rest parameter last
+        if self.rest is not None:
+            names.append(self.rest)
+        self.params = tuple(names)
+        # slots of a call frame: the enclosing frame, the arguments
+        # and the internal definitions
+        self.frame_size = len(self.params) + 1
+        # source of the procedure, kept for its external representation
+        self.source_params = params
+        self.source_body = body
+        self.instructions = []
+        self.constants = []
+
+    def __str__(self):
+        return '<code %s>' % self.name
+
+
+class Compiler(object):
+    """Compiles expressions into instructions for serval.vm
+
+    Every expression is compiled with a flag telling whether it is
+    in tail position. A tail expression leaves its value with RETURN
+    or gives the frame away with TAIL_CALL.
+
+    Free variables are linked to the cells of the global
+    environment `env` the code is going to run in.
+    """
+
+    def __init__(self, env):
+        self.env = env
+
+    def compile(self, expr):
+        """Compile a top level expression into a Code object."""
+        code = Code('top-level', EmptyList, EmptyList)
+        self._compile(expr, code, None, True)
+        return code
+
+    def _compile(self, expr, code, scope, tail):
+        if selfeval.is_self_evaluating(expr):
+            self._compile_constant(expr, code, tail)
+
+        elif variable.is_variable(expr):
+            self._compile_variable(expr, code, scope, tail)
+
+        elif procedure.is_application(expr):
+            head = procedure.operator(expr)
+            compiler = None
+            if variable.is_variable(head):
+                compiler = self.special_forms.get(head.name)
+
+            if compiler is not None:
+                compiler(self, expr, code, scope, tail)
+            else:
+                self._compile_application(expr, code, scope, tail)
+
+        else:
+            raise CompilerException('Unknown expression type - COMPILE %s'
+                                    % expr)
+
+    ##########################################################
+    # Code emitting helpers
+    ##########################################################
+    def _emit(self, code, opcode, arg=0):
+        code.instructions.extend((opcode, arg))
+        return len(code.instructions) - 1
+
+    def _constant(self, code, value):
+        for index, constant in enumerate(code.constants):
+            if constant is value:
+                return index
+        code.constants.append(value)
+        return len(code.constants) - 1
+
+    def _address(self, code, address):
+        for index, constant in enumerate(code.constants):
+            if type(constant) is tuple and constant == address:
+                return index
+        code.constants.append(address)
+        return len(code.constants) - 1
+
+    def _cell(self, code, symbol):
+        return self._constant(code, self.env.cell(symbol))
+
+    def _label(self, code):
+        return len(code.instructions)
+
+    def _patch(self, code, position, target):
+        code.instructions[position] = target
+
+    def _return(self, code, tail):
+        if tail:
+            self._emit(code, RETURN)
+
+    ##########################################################
+    # Expressions
+    ##########################################################
+    def _compile_constant(self, value, code, tail):
+        self._emit(code, LOAD_CONST, self._constant(code, value))
+        self._return(code, tail)
+
+    def _compile_variable(self, expr, code, scope, tail):
+        address = scope and scope.find_variable(expr.name)
+        if address is not None:
+            self._emit(code, LOCAL_REF,
+                       self._address(code, address + (expr.name,)))
+        else:
+            self._emit(code, GLOBAL_REF, self._cell(code, expr))
+        self._return(code, tail)
+
+    def _compile_quoted(self, expr, code, scope, tail):
+        self._compile_constant(quote.text_of_quotation(expr), code, tail)
+
+    def _compile_definition(self, expr, code, scope, tail):
+        var = definition.definition_variable(expr)
+        if scope is None:
+            self._compile(definition.definition_value(expr), code, scope,
+                          False)
+            self._emit(code, DEFINE_GLOBAL, self._cell(code, var))
+        else:
+            scope.add(var.name)
+            self._compile(definition.definition_value(expr), code, scope,
+                          False)
+            self._emit(code, DEFINE_LOCAL, scope.find_variable(var.name)[1])
+        self._return(code, tail)
+
+    def _compile_assignment(self, expr, code, scope, tail):
+        var = assignment.assignment_variable(expr)
+        self._compile(assignment.assignment_value(expr), code, scope, False)
+        address = scope and scope.find_variable(var.name)
+        if address is not None:
+            self._emit(code, LOCAL_SET,
+                       self._address(code, address + (var.name,)))
+        else:
+            self._emit(code, GLOBAL_SET, self._cell(code, var))
+        self._return(code, tail)
+
+    def _compile_if(self, expr, code, scope, tail):
+        self._compile(conditional.if_predicate(expr), code, scope, False)
+        jump_if_false = self._emit(code, JUMP_IF_FALSE)
+        self._compile(conditional.if_consequent(expr), code, scope, tail)
+
+        if not tail:
+            jump = self._emit(code, JUMP)
+
+        self._patch(code, jump_if_false, self._label(code))
+        alternative = conditional.if_alternative(expr)
+        if alternative is False:
+            # one-armed IF, the value is unspecified
+            self._compile_constant(UNSPECIFIED, code, tail)
+        else:
+            self._compile(alternative, code, scope, tail)
+
+        if not tail:
+            self._patch(code, jump, self._label(code))
+
+    def _compile_cond(self, expr, code, scope, tail):
+        self._compile(conditional.cond_to_if(expr), code, scope, tail)
+
+    def _compile_and(self, expr, code, scope, tail):
+        exprs = pair_to_list(procedure.operands(expr))
+        if not exprs:
+            self._compile_constant(TRUE, code, tail)
+            return
+
+        jumps = []
+        for e in exprs[:-1]:
+            self._compile(e, code, scope, False)
+            jumps.append(self._emit(code, JUMP_IF_FALSE))
+        self._compile(exprs[-1], code, scope, tail)
+        if not tail:
+            end = self._emit(code, JUMP)
+
+        for jump in jumps:
+            self._patch(code, jump, self._label(code))
+        self._compile_constant(FALSE, code, tail)
+
+        if not tail:
+            self._patch(code, end, self._label(code))
+
+    def _compile_or(self, expr, code, scope, tail):
+        exprs = pair_to_list(procedure.operands(expr))
+        if not exprs:
+            self._compile_constant(FALSE, code, tail)
+            return
+
+        jumps = []
+        for e in exprs[:-1]:
+            self._compile(e, code, scope, False)
+            jumps.append(self._emit(code, JUMP_IF_TRUE_OR_POP))
+        self._compile(exprs[-1], code, scope, tail)
+
+        for jump in jumps:
+            self._patch(code, jump, self._label(code))
+        self._return(code, tail)
+
+    def _compile_begin(self, expr, code, scope, tail):
+        self._compile_sequence(sequence.begin_actions(expr), code, scope,
+                               tail)
+
+    def _compile_sequence(self, expressions, code, scope, tail):
+        exprs = pair_to_list(expressions)
+        if not exprs:
+            raise CompilerException('Empty sequence - COMPILE')
+
+        for e in exprs[:-1]:
+            self._compile(e, code, scope, False)
+            self._emit(code, POP)
+        self._compile(exprs[-1], code, scope, tail)
+
+    def _compile_binding(self, expr, code, scope, tail):
+        self._compile(
+            cons(lambdaexpr.make_lambda(binding.binding_variables(expr),
+                                        binding.binding_body(expr)),
+                 binding.binding_values(expr)),
+            code, scope, tail)
+
+    def _compile_record_definition(self, expr, code, scope, tail):
+        self._compile(record.record_definition_to_definitions(expr),
+                      code, scope, tail)
+
+    def _compile_lambda(self, expr, code, scope, tail):
+        params = lambdaexpr.lambda_parameters(expr)
+        body = lambdaexpr.lambda_body(expr)
+
+        lambda_code = Code('lambda', params, body)
+        lambda_scope = CompileTimeEnvironment(
+            lambda_code.params + tuple(scan_out_defines(body)), scope)
+        self._compile_sequence(body, lambda_code, lambda_scope, True)
+        lambda_code.frame_size = lambda_scope.frame_size
+
+        self._emit(code, MAKE_CLOSURE, self._constant(code, lambda_code))
+        self._return(code, tail)
+
+    def _compile_application(self, expr, code, scope, tail):
+        self._compile(procedure.operator(expr), code, scope, False)
+        operands = pair_to_list(procedure.operands(expr))
+        for operand in operands:
+            self._compile(operand, code, scope, False)
+        self._emit(code, TAIL_CALL if tail else CALL, len(operands))
+
+    # special form compilers keyed by the name of the head symbol
+    special_forms = {
+        'quote': _compile_quoted,
+        'define': _compile_definition,
+        'begin': _compile_begin,
+        'let': _compile_binding,
+        'set!': _compile_assignment,
+        'if': _compile_if,
+        'cond': _compile_cond,
+        'and': _compile_and,
+        'or': _compile_or,
+        'lambda': _compile_lambda,
+        'define-record-type': _compile_record_definition,
+        }
+
+
+def disassemble(code):
+    """Return a readable listing of the instructions of `code`."""
+    lines = []
+    instructions = code.instructions
+    for pc in range(0, len(instructions), 2):
+        opcode, arg = instructions[pc], instructions[pc + 1]
+        line = '%4d %-20s %d' % (pc, OPCODE_NAMES[opcode], arg)
+        if opcode in (LOCAL_REF, LOCAL_SET):
+            line += ' (%s %s %s)' % code.constants[arg]
+        elif opcode in (LOAD_CONST, GLOBAL_REF, GLOBAL_SET, DEFINE_GLOBAL,
+                        MAKE_CLOSURE):
+            line += ' (%s)' % code.constants[arg]
+        lines.append(line)
+    return '\n'.join(lines)
@@ -0,0 +1,401 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+from serval.model import Symbol, TRUE, FALSE, UNSPECIFIED, is_true
+from serval.scope import (
+    setup_environment, define_variable,
+    lookup_variable_value, extend_procedure_environment
+    )
+from serval.expression import (
+    selfeval, quote, definition, variable,
+    assignment, conditional, lambdaexpr,
+    procedure, sequence, binding, record
+    )
+from serval.builtin import BUILTIN_DEFINITIONS
+from serval.expression.util import cons, evaluate_text
+
+
+class MonitoredStack(object):
+    """Stack of the register machine.
+
+    Keeps the statistics of the monitored stack from SICP Ch. 5.2.4
+    """
+
+    def __init__(self):
+        self.initialize()
+
+    def initialize(self):
+        self.items = []
+        self.number_pushes = 0
+        self.number_pops = 0
+        self.max_depth = 0
+
+    def push(self, value):
+        items = self.items
+        items.append(value)
+        self.number_pushes += 1
+        if len(items) > self.max_depth:
+            self.max_depth = len(items)
+
+    def pop(self):
+        if not self.items:
+            raise ValueError('Empty stack - POP')
+        self.number_pops += 1
+        return self.items.pop()
+
+    def statistics(self):
+        return dict(total_pushes=self.number_pushes,
+                    total_pops=self.number_pops,
+                    maximum_depth=self.max_depth)
+
+
+class ExplicitControlEvaluator(object):
+    """Explicit-control evaluator.
+
+    Closely follows the register machine from SICP Ch. 5.4
+
+    Every label is a method that updates the registers and returns
+    the next label (a bound method) to go to; `interpret` runs them
+    in a single loop. All the state of an evaluation lives in the
+    registers and in the explicit stack, so the depth of Scheme
+    recursion is only limited by the memory available for the stack.
+    """
+
+    def __init__(self):
+        self.env = setup_environment()
+        self.stack = MonitoredStack()
+        self._save = self.stack.push
+        self._restore = self.stack.pop
+
+        self.reg_exp = None
+        self.reg_env = None
+        self.reg_val = None
+        self.reg_proc = None
+        self.reg_argl = None
+        self.reg_unev = None
+        self.reg_continue = None
+
+        evaluate_text(self, BUILTIN_DEFINITIONS)
+
+    def interpret(self, expr):
+        self.stack.initialize()
+        self.reg_exp = expr
+        self.reg_env = self.env
+        self.reg_continue = None
+
+        label = self._eval_dispatch
+        while label is not None:
+            label = label()
+
+        return self.reg_val
+
+    def statistics(self):
+        """Stack statistics of the last `interpret` call."""
+        return self.stack.statistics()
+
+    ##########################################################
+    # Core of the evaluator
+    ##########################################################
+    def _eval_dispatch(self):
+        exp = self.reg_exp
+
+        if selfeval.is_self_evaluating(exp):
+            self.reg_val = exp
+            return self.reg_continue
+
+        if variable.is_variable(exp):
+            self.reg_val = lookup_variable_value(exp, self.reg_env)
+            return self.reg_continue
+
+        if procedure.is_application(exp):
+            head = procedure.operator(exp)
+            if variable.is_variable(head):
+                form = self.special_forms.get(head.name)
+                if form is not None:
+                    return form(self)
+
+            return self._ev_application()
+
+        raise ValueError('Unknown expression type - EVAL %s' % exp)
+
+    def _ev_quoted(self):
+        self.reg_val = quote.text_of_quotation(self.reg_exp)
+        return self.reg_continue
+
+    def _ev_lambda(self):
+        self.reg_val = procedure.make_procedure(
+            lambdaexpr.lambda_parameters(self.reg_exp),
+            lambdaexpr.lambda_body(self.reg_exp),
+            self.reg_env
+            )
+        return self.reg_continue
+
+    ##########################################################
+    # Procedure application
+    ##########################################################
+    def _ev_application(self):
+        self._save(self.reg_continue)
+        self._save(self.reg_env)
+        self.reg_unev = procedure.operands(self.reg_exp)
+        self._save(self.reg_unev)
+        self.reg_exp = procedure.operator(self.reg_exp)
+        self.reg_continue = self._ev_appl_did_operator
+        return self._eval_dispatch
+
+    def _ev_appl_did_operator(self):
+        self.reg_unev = self._restore()
+        self.reg_env = self._restore()
+        self.reg_argl = []
+        self.reg_proc = self.reg_val
+        if procedure.no_operands(self.reg_unev):
+            return self._apply_dispatch
+
+        self._save(self.reg_proc)
+        return self._ev_appl_operand_loop
+
+    def _ev_appl_operand_loop(self):
+        self._save(self.reg_argl)
+        self.reg_exp = procedure.first_operand(self.reg_unev)
+        if procedure.no_operands(procedure.rest_operands(self.reg_unev)):
+            return self._ev_appl_last_arg
+
+        self._save(self.reg_env)
+        self._save(self.reg_unev)
+        self.reg_continue = self._ev_appl_accumulate_arg
+        return self._eval_dispatch
+
+    def _ev_appl_accumulate_arg(self):
+        self.reg_unev = self._restore()
+        self.reg_env = self._restore()
+        self.reg_argl = self._restore()
+        self.reg_argl.append(self.reg_val)
+        self.reg_unev = procedure.rest_operands(self.reg_unev)
+        return self._ev_appl_operand_loop
+
+    def _ev_appl_last_arg(self):
+        self.reg_continue = self._ev_appl_accum_last_arg
+        return self._eval_dispatch
+
+    def _ev_appl_accum_last_arg(self):
+        self.reg_argl = self._restore()
+        self.reg_argl.append(self.reg_val)
+        self.reg_proc = self._restore()
+        return self._apply_dispatch
+
+    def _apply_dispatch(self):
+        proc = self.reg_proc
+
+        if procedure.is_primitive_procedure(proc):
+            self.reg_val = proc.apply(self.reg_argl)
+            return self._restore()
+
+        if procedure.is_compound_procedure(proc):
+            self.reg_env = extend_procedure_environment(
+                proc, tuple(self.reg_argl))
+            self.reg_unev = procedure.procedure_body(proc)
+            return self._ev_sequence
+
+        raise ValueError('Unknown procedure type - APPLY %s' % proc)
+
+    ##########################################################
+    # Sequence evaluation
+    ##########################################################
+    def _ev_begin(self):
+        self.reg_unev = sequence.begin_actions(self.reg_exp)
+        self._save(self.reg_continue)
+        return self._ev_sequence
+
+    def _ev_sequence(self):
+        self.reg_exp = sequence.first_expr(self.reg_unev)
+        if sequence.is_last_expr(self.reg_unev):
+            return self._ev_sequence_last_exp
+
+        self._save(self.reg_unev)
+        self._save(self.reg_env)
+        self.reg_continue = self._ev_sequence_continue
+        return self._eval_dispatch
+
+    def _ev_sequence_continue(self):
+        self.reg_env = self._restore()
+        self.reg_unev = self._restore()
+        self.reg_unev = sequence.rest_exprs(self.reg_unev)
+        return self._ev_sequence
+
+    def _ev_sequence_last_exp(self):
+        self.reg_continue = self._restore()
+        return self._eval_dispatch
+
+    ##########################################################
+    # Conditionals
+    ##########################################################
+    def _ev_if(self):
+        self._save(self.reg_exp)
+        self._save(self.reg_env)
+        self._save(self.reg_continue)
+        self.reg_continue = self._ev_if_decide
+        self.reg_exp = conditional.if_predicate(self.reg_exp)
+        return self._eval_dispatch
+
+    def _ev_if_decide(self):
+        self.reg_continue = self._restore()
+        self.reg_env = self._restore()
+        self.reg_exp = self._restore()
+        if is_true(self.reg_val):
+            self.reg_exp = conditional.if_consequent(self.reg_exp)
+            return self._eval_dispatch
+
+        self.reg_exp = conditional.if_alternative(self.reg_exp)
+        if self.reg_exp is False:
+            # one-armed IF, the value is unspecified
+            self.reg_val = UNSPECIFIED
+            return self.reg_continue
+
+        return self._eval_dispatch
+
+    def _ev_cond(self):
+        self.reg_exp = conditional.cond_to_if(self.reg_exp)
+        return self._eval_dispatch
+
+    def _ev_and(self):
+        self.reg_unev = procedure.operands(self.reg_exp)
+        if procedure.no_operands(self.reg_unev):
+            self.reg_val = TRUE
+            return self.reg_continue
+
+        self._save(self.reg_continue)
+        return self._ev_and_loop
+
+    def _ev_and_loop(self):
+        self.reg_exp = sequence.first_expr(self.reg_unev)
+        if sequence.is_last_expr(self.reg_unev):
+            return self._ev_sequence_last_exp
+
+        self._save(self.reg_env)
+        self._save(self.reg_unev)
+        self.reg_continue = self._ev_and_decide
+        return self._eval_dispatch
+
+    def _ev_and_decide(self):
+        self.reg_unev = self._restore()
+        self.reg_env = self._restore()
+        if not is_true(self.reg_val):
+            self.reg_val = FALSE
+            return self._restore()
+
+        self.reg_unev = sequence.rest_exprs(self.reg_unev)
+        return self._ev_and_loop
+
+    def _ev_or(self):
+        self.reg_unev = procedure.operands(self.reg_exp)
+        if procedure.no_operands(self.reg_unev):
+            self.reg_val = FALSE
+            return self.reg_continue
+
+        self._save(self.reg_continue)
+        return self._ev_or_loop
+
+    def _ev_or_loop(self):
+        self.reg_exp = sequence.first_expr(self.reg_unev)
+        if sequence.is_last_expr(self.reg_unev):
+            return self._ev_sequence_last_exp
+
+        self._save(self.reg_env)
+        self._save(self.reg_unev)
+        self.reg_continue = self._ev_or_decide
+        return self._eval_dispatch
+
+    def _ev_or_decide(self):
+        self.reg_unev = self._restore()
+        self.reg_env = self._restore()
+        if is_true(self.reg_val):
+            return self._restore()
+
+        self.reg_unev = sequence.rest_exprs(self.reg_unev)
+        return self._ev_or_loop
+
+    def _ev_let(self):
+        self.reg_exp = cons(
+            lambdaexpr.make_lambda(binding.binding_variables(self.reg_exp),
+                                   binding.binding_body(self.reg_exp)),
+            binding.binding_values(self.reg_exp))
+        return self._eval_dispatch
+
+    def _ev_record_definition(self):
+        self.reg_exp = record.record_definition_to_definitions(self.reg_exp)
+        return self._eval_dispatch
+
+    ##########################################################
+    # Assignments and definitions
+    ##########################################################
+    def _ev_assignment(self):
+        self.reg_unev = assignment.assignment_variable(self.reg_exp)
+        self._save(self.reg_unev)
+        self.reg_exp = assignment.assignment_value(self.reg_exp)
+        self._save(self.reg_env)
+        self._save(self.reg_continue)
+        self.reg_continue = self._ev_assignment_1
+        return self._eval_dispatch
+
+    def _ev_assignment_1(self):
+        self.reg_continue = self._restore()
+        self.reg_env = self._restore()
+        self.reg_unev = self._restore()
+        self.reg_env.set_variable_value(self.reg_unev, self.reg_val)
+        self.reg_val = Symbol('ok')
+        return self.reg_continue
+
+    def _ev_definition(self):
+        self.reg_unev = definition.definition_variable(self.reg_exp)
+        self._save(self.reg_unev)
+        self.reg_exp = definition.definition_value(self.reg_exp)
+        self._save(self.reg_env)
+        self._save(self.reg_continue)
+        self.reg_continue = self._ev_definition_1
+        return self._eval_dispatch
+
+    def _ev_definition_1(self):
+        self.reg_continue = self._restore()
+        self.reg_env = self._restore()
+        self.reg_unev = self._restore()
+        define_variable(self.reg_unev, self.reg_val, self.reg_env)
+        self.reg_val = Symbol('ok')
+        return self.reg_continue
+
+    # the first label of every special form keyed by the name of
+    # the head symbol
+    special_forms = {
+        'quote': _ev_quoted,
+        'define': _ev_definition,
+        'begin': _ev_begin,
+        'let': _ev_let,
+        'set!': _ev_assignment,
+        'if': _ev_if,
+        'cond': _ev_cond,
+        'and': _ev_and,
+        'or': _ev_or,
+        'lambda': _ev_lambda,
+        'define-record-type': _ev_record_definition,
+        }
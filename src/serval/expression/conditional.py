@@ -24,7 +24,7 @@
 
 __author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
 
-from serval.model import Symbol, Boolean, EmptyList
+from serval.model import Symbol, FALSE, EmptyList
 from serval.expression.sequence import sequence_exp
 from serval.expression.util import (
     is_tagged_list, car, cdr, cadr, caddr, cdddr, cadddr, tolist)
@@ -61,7 +61,7 @@ def cond_clauses(expr):
     return cdr(expr)
 
 def is_cond_else_clause(clause):
-    return cond_predicate(clause) == Symbol('else')
+    return cond_predicate(clause) is Symbol('else')
 
 def cond_predicate(clause):
     return car(clause)
@@ -74,7 +74,7 @@ def cond_to_if(expr):
 
 def expand_clauses(clauses):
     if clauses is EmptyList:
-        return Boolean(False)
+        return FALSE
 
     first = car(clauses)
     rest = cdr(clauses)
@@ -24,7 +24,7 @@
 
 __author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
 
-from serval.model import Symbol
+from serval.model import Symbol, Pair, EmptyList
 from serval.expression.util import is_tagged_list, cadr, cddr, cons
 
 
@@ -40,3 +40,14 @@ def lambda_body(expr):
 def make_lambda(params, body):
     return cons(Symbol('lambda'), cons(params, body))
 
+def parameter_names(params):
+    """Return the names of the required parameters and of the rest one.
+
+    The rest parameter name is None unless `params` is a symbol or
+    an improper list, as in (lambda args ...) and (lambda (a . rest) ...)
+    """
+    names = []
+    while isinstance(params, Pair):
+        names.append(params.head.name)
+        params = params.tail
+    return names, None if params is EmptyList else params.name
@@ -24,10 +24,14 @@
 
 __author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
 
-from serval.model import Symbol, Pair, EmptyList
-from serval.expression.util import (
-    is_tagged_list, pair_to_list, car, cdr, cons, cadr, caddr, cadddr)
-from serval.builtin import BUILTIN_PROCEDURES
+from serval.model import (
+    Pair, EmptyList, CompoundProcedure, PrimitiveProcedure
+    )
+from serval.expression.util import pair_to_list, car, cdr
+from serval.builtin import (
+    BUILTIN_PROCEDURES, BUILTIN_ARITIES, BUILTIN_SPECIALIZATIONS,
+    UNBOXED_PROCEDURES, UNBOXED_SPECIALIZATIONS
+    )
 
 
 #################################
@@ -54,43 +58,55 @@ def rest_operands(ops):
 #################################
 # Compound procedures
 #################################
-def make_procedure(params, body, env):
-    """Create a list"""
-    return cons(Symbol('procedure'),
-                cons(params, cons(body, cons(env, EmptyList))))
+def make_procedure(params, body, env, analyzed_body=None):
+    """Create a CompoundProcedure
+
+    `analyzed_body` is the execution procedure built for the body
+    by the analyzing evaluator, if any.
+    """
+    return CompoundProcedure(params, body, env, analyzed_body)
 
 def is_compound_procedure(expr):
-    return is_tagged_list(expr, Symbol('procedure'))
+    return expr.__class__ is CompoundProcedure
 
 def procedure_parameters(expr):
-    return cadr(expr)
+    return expr.parameters
 
 def procedure_body(expr):
-    return caddr(expr)
+    return expr.body
 
 def procedure_environment(expr):
-    return cadddr(expr)
+    return expr.env
+
+def procedure_analyzed_body(expr):
+    return expr.analyzed_body
 
 def get_procedure_repr(expr):
-    return '#<procedure %s %s <procedure-env>' % (
-        procedure_parameters(expr), procedure_body(expr))
+    return str(expr)
 
 #################################
 # Primitive procedures
 #################################
 def is_primitive_procedure(expr):
-    return is_tagged_list(expr, Symbol('primitive'))
+    return expr.__class__ is PrimitiveProcedure
 
 def primitive_implementation(expr):
-    return cadr(expr)
+    return expr.implementation
 
 def primitive_procedure_names():
     return [name for name, _ in BUILTIN_PROCEDURES]
 
-def primitive_procedure_values():
-    return [Pair(Symbol('primitive'), Pair(proc, EmptyList))
-            for _, proc in BUILTIN_PROCEDURES]
+def primitive_procedure_values(unboxed=False):
+    """Return the builtins, for plain Python numbers with `unboxed` set."""
+    if not unboxed:
+        return [PrimitiveProcedure(proc, name, BUILTIN_ARITIES[name],
+                                   BUILTIN_SPECIALIZATIONS.get(name))
+                for name, proc in BUILTIN_PROCEDURES]
+
+    return [PrimitiveProcedure(UNBOXED_PROCEDURES.get(name, proc), name,
+                               BUILTIN_ARITIES[name],
+                               UNBOXED_SPECIALIZATIONS.get(name))
+            for name, proc in BUILTIN_PROCEDURES]
 
 def apply_primitive_procedure(proc, args):
-    func = primitive_implementation(proc)
-    return func(*pair_to_list(args))
+    return proc.apply(tuple(pair_to_list(args)))
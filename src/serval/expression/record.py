@@ -0,0 +1,98 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+from serval.model import Symbol
+from serval.expression.sequence import make_begin
+from serval.expression.util import (
+    is_tagged_list, is_symbol, car, cdr, cadr, caddr, cadddr, cddddr,
+    tolist, pair_to_list)
+
+
+def is_record_definition(expr):
+    return is_tagged_list(expr, Symbol('define-record-type'))
+
+def record_type_name(expr):
+    return cadr(expr)
+
+def record_constructor(expr):
+    # (name field ...), or a bare name taking every field in order
+    return caddr(expr)
+
+def record_predicate(expr):
+    return cadddr(expr)
+
+def record_field_specs(expr):
+    # (field accessor) or (field accessor modifier)
+    return pair_to_list(cddddr(expr))
+
+def record_definition_names(expr):
+    """Return the names a define-record-type defines."""
+    names = [record_type_name(expr), record_predicate(expr)]
+    constructor = record_constructor(expr)
+    names.append(constructor if is_symbol(constructor) else car(constructor))
+    for spec in record_field_specs(expr):
+        names.extend(pair_to_list(cdr(spec)))
+    return [name.name for name in names]
+
+def _quoted(datum):
+    return tolist(Symbol('quote'), datum)
+
+def _define(name, *application):
+    return tolist(Symbol('define'), name, tolist(*application))
+
+def record_definition_to_definitions(expr):
+    """Return a BEGIN with the definitions of a define-record-type.
+
+    The record type, constructor, predicate, accessors and modifiers
+    come from the make-record-type family of primitives.
+    """
+    type_name = record_type_name(expr)
+    specs = record_field_specs(expr)
+    fields = tolist(*[car(spec) for spec in specs])
+
+    constructor = record_constructor(expr)
+    if is_symbol(constructor):
+        constructor_name, constructor_fields = constructor, fields
+    else:
+        constructor_name = car(constructor)
+        constructor_fields = cdr(constructor)
+
+    definitions = [
+        _define(type_name, Symbol('make-record-type'),
+                _quoted(type_name), _quoted(fields)),
+        _define(constructor_name, Symbol('record-constructor'),
+                type_name, _quoted(constructor_fields)),
+        _define(record_predicate(expr), Symbol('record-predicate'),
+                type_name),
+        ]
+    for spec in specs:
+        names = pair_to_list(cdr(spec))
+        definitions.append(_define(names[0], Symbol('record-accessor'),
+                                   type_name, _quoted(car(spec))))
+        if len(names) > 1:
+            definitions.append(_define(names[1], Symbol('record-modifier'),
+                                       type_name, _quoted(car(spec))))
+    return make_begin(tolist(*definitions))
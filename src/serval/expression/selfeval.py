@@ -24,11 +24,16 @@
 
 __author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
 
-from serval.model import Number, String, Boolean, Character
+from serval.model import (
+    Number, String, Boolean, Character, Vector, NUMBER_TYPES
+    )
+
+SELF_EVALUATING_TYPES = (
+    (Number, String, Boolean, Character, Vector) + NUMBER_TYPES)
 
 
 def is_self_evaluating(expr):
-    if isinstance(expr, (Number, String, Boolean, Character)):
+    if isinstance(expr, SELF_EVALUATING_TYPES):
         return True
 
     return False
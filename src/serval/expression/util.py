@@ -32,7 +32,7 @@ from serval.model import Pair, Symbol, EmptyList
 
 
 def is_tagged_list(expr, tag):
-    if isinstance(expr, Pair) and car(expr) == tag:
+    if isinstance(expr, Pair) and car(expr) is tag:
         return True
 
     return False
@@ -63,6 +63,7 @@ caddr = lambda pair: car(cdr(cdr(pair)))
 cadar = lambda pair: car(cdr(car(pair)))
 cdddr = lambda pair: cdr(cdr(cdr(pair)))
 cadddr = lambda pair: car(cdr(cdr(cdr(pair))))
+cddddr = lambda pair: cdr(cdr(cdr(cdr(pair))))
 caadr = lambda pair: car(car(cdr(pair)))
 cdadr = lambda pair: cdr(car(cdr(pair)))
 cddr = lambda pair: cdr(cdr(pair))
@@ -91,8 +92,10 @@ def load(interpreter, expression):
     """
     filepath = cadr(expression).val
     data = open(os.path.abspath(filepath)).read()
-    parser = Parser(Lexer(data))
+    evaluate_text(interpreter, data)
 
-    for expr in parser.parse():
+def evaluate_text(interpreter, text):
+    """Evaluate the expressions in `text` one after another."""
+    for expr in Parser(Lexer(text)).parse():
         interpreter.interpret(expr)
 
@@ -24,81 +24,183 @@
 
 __author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
 
+import sys
 import readline
 
+from serval import printer
 from serval.lexer import Lexer
 from serval.parser import Parser
-from serval.model import Symbol, Boolean, EmptyList
+from serval.analyzer import Analyzer
+from serval.optimizer import Optimizer
+from serval.jit import JIT, TailCall
+from serval.model import (
+    Symbol, CompoundProcedure, PrimitiveProcedure, TRUE, FALSE, UNSPECIFIED,
+    unbox_numbers
+    )
 from serval.scope import (
     setup_environment, define_variable,
-    lookup_variable_value, extend_environment
+    lookup_variable_value, extend_procedure_environment
     )
 from serval.expression import (
     selfeval, quote, definition, variable,
     assignment, conditional, lambdaexpr,
-    procedure, sequence, binding
+    procedure, sequence, binding, record
     )
-from serval.expression.util import cons, is_load, load
+from serval.builtin import BUILTIN_DEFINITIONS
+from serval.expression.util import cons, is_load, load, evaluate_text
+
+
+class TailExpression(object):
+    """An expression left in tail position by a special form.
+
+    Special form evaluators return it instead of evaluating the
+    expression themselves, so that `Interpreter._eval` continues
+    with it in the same Python frame (proper tail calls).
+    """
+
+    __slots__ = ('expr', 'env')
+
+    def __init__(self, expr, env):
+        self.expr = expr
+        self.env = env
 
 
 class Interpreter(object):
     """Serval interpreter.
 
     Closely follows Eval/Apply from SICP Ch. 4
-    """
-
-    def __init__(self):
-        self.env = setup_environment()
 
-    def interpret(self, expr):
-        return self._eval(expr, self.env)
+    With `analyze` set expressions are run by the analyzing
+    evaluator from SICP Ch. 4.1.7 instead (see serval.analyzer)
 
-    def _eval(self, expr, env):
-        if selfeval.is_self_evaluating(expr):
-            return expr
+    With `optimize` set expressions go through serval.optimizer
+    before they are evaluated.
 
-        if quote.is_quoted(expr):
-            return quote.text_of_quotation(expr)
+    With `jit` set hot procedures are compiled to Python functions
+    (see serval.jit); the analyzing evaluator does not use it.
 
-        if definition.is_definition(expr):
-            return self._eval_definition(expr, env)
+    With `unboxed` set Scheme numbers are plain Python ints and floats
+    instead of Number objects; Numbers in the expressions given to
+    `interpret` are converted.
+    """
 
-        if sequence.is_begin(expr):
-            return self._eval_sequence(sequence.begin_actions(expr), env)
+    def __init__(self, analyze=False, optimize=False, jit=False,
+                 unboxed=False):
+        self.unboxed = unboxed
+        self.env = setup_environment(unboxed)
+        self.analyzer = Analyzer(self.env) if analyze else None
+        self.optimizer = (Optimizer(self.env, self.special_forms)
+                          if optimize else None)
+        self.jit = JIT(self) if jit else None
+        evaluate_text(self, BUILTIN_DEFINITIONS)
+
+    @classmethod
+    def define_special_form(cls, name, evaluator):
+        """Make `evaluator` handle expressions that start with `name`.
+
+        `evaluator` is called with the interpreter, the expression
+        and the environment, and returns the value of the expression.
+        Subexpressions are evaluated with `Interpreter.evaluate`;
+        a subexpression in tail position should be returned wrapped
+        in a `TailExpression` instead.
+        """
+        if 'special_forms' not in cls.__dict__:
+            cls.special_forms = dict(cls.special_forms)
+        cls.special_forms[intern(name)] = evaluator
 
-        if binding.is_let_binding(expr):
-            return self._eval_binding(expr, env)
+    def interpret(self, expr):
+        if self.unboxed:
+            expr = unbox_numbers(expr)
 
-        if variable.is_variable(expr):
-            return lookup_variable_value(expr, env)
+        if self.optimizer is not None:
+            expr = self.optimizer.optimize(expr)
+            for name, source, body in self.optimizer.pop_deoptimized():
+                self._deoptimize(name, source, body)
 
-        if assignment.is_assignment(expr):
-            return self._eval_assignment(expr, env)
+        return self._interpret(expr)
 
-        if conditional.is_if(expr):
-            return self._eval_if(expr, env)
+    def _interpret(self, expr):
+        if self.analyzer is not None:
+            return self.analyzer.analyze(expr)(self.env)
 
-        if conditional.is_cond(expr):
-            return self._eval(conditional.cond_to_if(expr), env)
+        return self._eval(expr, self.env)
 
-        if conditional.is_and(expr):
-            return self._eval_and(expr, env)
+    def _deoptimize(self, name, source, body):
+        # put the code of `source` into the procedure built with
+        # `body` in place, so every reference to it sees the change
+        proc = self.env.load(Symbol(name))
+        if (proc is None or not procedure.is_compound_procedure(proc) or
+            procedure.procedure_body(proc) is not body):
+            return
 
-        if conditional.is_or(expr):
-            return self._eval_or(expr, env)
+        fresh = self._interpret(
+            self.optimizer.optimize_procedure(name, source))
+        proc.body, proc.analyzed_body = fresh.body, fresh.analyzed_body
+        if self.jit is not None:
+            self.jit.invalidate(proc)
 
-        if lambdaexpr.is_lambda(expr):
-            return procedure.make_procedure(
-                lambdaexpr.lambda_parameters(expr),
-                lambdaexpr.lambda_body(expr),
-                env
-                )
+    def evaluate(self, expr, env):
+        return self._eval(expr, env)
 
-        if procedure.is_application(expr):
-            return self._apply(
-                self._eval(procedure.operator(expr), env),
-                self._list_of_values(procedure.operands(expr), env)
-                )
+    def _eval(self, expr, env):
+        # tail positions loop here instead of recursing
+        while True:
+            if selfeval.is_self_evaluating(expr):
+                return expr
+
+            if variable.is_variable(expr):
+                return lookup_variable_value(expr, env)
+
+            if not procedure.is_application(expr):
+                return None
+
+            head = procedure.operator(expr)
+            if variable.is_variable(head):
+                evaluator = self.special_forms.get(head.name)
+                if evaluator is not None:
+                    result = evaluator(self, expr, env)
+                    if not isinstance(result, TailExpression):
+                        return result
+                    expr, env = result.expr, result.env
+                    continue
+
+            proc = self._eval(head, env)
+            args = self._list_of_values(procedure.operands(expr), env)
+
+            if self.jit is not None and proc.__class__ is CompoundProcedure:
+                result = self.jit.enter(proc, args)
+                if result.__class__ is not TailCall:
+                    return result
+                proc, args = result.proc, result.args
+
+            if proc.__class__ is PrimitiveProcedure:
+                return proc.apply(args)
+            if proc.__class__ is not CompoundProcedure:
+                return self._apply(proc, args)
+
+            env = extend_procedure_environment(proc, args)
+            expr = self._eval_sequence_head(proc.body, env)
+
+    def _eval_quoted(self, expr, env):
+        return quote.text_of_quotation(expr)
+
+    def _eval_begin(self, expr, env):
+        return TailExpression(
+            self._eval_sequence_head(sequence.begin_actions(expr), env), env)
+
+    def _eval_cond(self, expr, env):
+        return TailExpression(conditional.cond_to_if(expr), env)
+
+    def _eval_record_definition(self, expr, env):
+        return TailExpression(record.record_definition_to_definitions(expr),
+                              env)
+
+    def _eval_lambda(self, expr, env):
+        return procedure.make_procedure(
+            lambdaexpr.lambda_parameters(expr),
+            lambdaexpr.lambda_body(expr),
+            env
+            )
 
     def _eval_definition(self, expr, env):
         define_variable(
@@ -117,77 +219,95 @@ class Interpreter(object):
 
     def _eval_binding(self, expr, env):
         # return an application
-        return self._eval(
+        return TailExpression(
             cons(lambdaexpr.make_lambda(binding.binding_variables(expr),
                                         binding.binding_body(expr)),
                  binding.binding_values(expr)),
             env)
 
     def _eval_if(self, expr, env):
-        if self._eval(conditional.if_predicate(expr), env):
-            return self._eval(conditional.if_consequent(expr), env)
+        value = self._eval(conditional.if_predicate(expr), env)
+        if value is not FALSE and value is not None:
+            return TailExpression(conditional.if_consequent(expr), env)
 
-        return self._eval(conditional.if_alternative(expr), env)
+        alternative = conditional.if_alternative(expr)
+        if alternative is False:
+            # one-armed IF, the value is unspecified
+            return UNSPECIFIED
+        return TailExpression(alternative, env)
 
     def _eval_and(self, expr, env):
-        if procedure.no_operands(procedure.operands(expr)):
-            return Boolean(True)
+        exprs = procedure.operands(expr)
+        if procedure.no_operands(exprs):
+            return TRUE
 
-        def inner(expr, env):
-            if sequence.is_last_expr(expr):
-                return self._eval(sequence.first_expr(expr), env)
+        while not sequence.is_last_expr(exprs):
+            value = self._eval(sequence.first_expr(exprs), env)
+            if value is FALSE or value is None:
+                return FALSE
+            exprs = sequence.rest_exprs(exprs)
 
-            if not self._eval(sequence.first_expr(expr), env):
-                return Boolean(False)
-
-            return inner(sequence.rest_exprs(expr), env)
-
-        return inner(sequence.rest_exprs(expr), env)
+        return TailExpression(sequence.first_expr(exprs), env)
 
     def _eval_or(self, expr, env):
-        if procedure.no_operands(procedure.operands(expr)):
-            return Boolean(False)
-
-        def inner(expr, env):
-            if sequence.is_last_expr(expr):
-                return self._eval(sequence.first_expr(expr), env)
+        exprs = procedure.operands(expr)
+        if procedure.no_operands(exprs):
+            return FALSE
 
-            first_value = self._eval(sequence.first_expr(expr), env)
-            if first_value:
+        while not sequence.is_last_expr(exprs):
+            first_value = self._eval(sequence.first_expr(exprs), env)
+            if first_value is not FALSE and first_value is not None:
                 return first_value
+            exprs = sequence.rest_exprs(exprs)
 
-            return inner(sequence.rest_exprs(expr), env)
+        return TailExpression(sequence.first_expr(exprs), env)
 
-        return inner(sequence.rest_exprs(expr), env)
-
-    def _eval_sequence(self, expressions, env):
-        if sequence.is_last_expr(expressions):
-            return self._eval(sequence.first_expr(expressions), env)
-        else:
+    def _eval_sequence_head(self, expressions, env):
+        """Evaluate all but the last expression and return the last one."""
+        while not sequence.is_last_expr(expressions):
             self._eval(sequence.first_expr(expressions), env)
-            return self._eval_sequence(sequence.rest_exprs(expressions), env)
+            expressions = sequence.rest_exprs(expressions)
+
+        return sequence.first_expr(expressions)
 
     def _list_of_values(self, expressions, env):
-        if procedure.no_operands(expressions):
-            return EmptyList
-        else:
-            return cons(
-                self._eval(procedure.first_operand(expressions), env),
-                self._list_of_values(procedure.rest_operands(expressions), env)
-                )
+        """Return the tuple of the values of `expressions`."""
+        values = []
+        while not procedure.no_operands(expressions):
+            values.append(
+                self._eval(procedure.first_operand(expressions), env))
+            expressions = procedure.rest_operands(expressions)
+        return tuple(values)
 
     def _apply(self, proc, args):
-        if procedure.is_primitive_procedure(proc):
-            return procedure.apply_primitive_procedure(proc, args)
-        elif procedure.is_compound_procedure(proc):
-            return self._eval_sequence(
-                procedure.procedure_body(proc),
-                extend_environment(
-                    procedure.procedure_parameters(proc),
-                    args,
-                    procedure.procedure_environment(proc)
-                    )
-                )
+        """Apply `proc` to the tuple of argument values `args`."""
+        if proc.__class__ is PrimitiveProcedure:
+            return proc.apply(args)
+        elif proc.__class__ is CompoundProcedure:
+            env = extend_procedure_environment(proc, args)
+            return self._eval(self._eval_sequence_head(proc.body, env), env)
+
+    # special form evaluators keyed by the name of the head symbol,
+    # see define_special_form
+    special_forms = {
+        'quote': _eval_quoted,
+        'define': _eval_definition,
+        'begin': _eval_begin,
+        'let': _eval_binding,
+        'set!': _eval_assignment,
+        'if': _eval_if,
+        'cond': _eval_cond,
+        'and': _eval_and,
+        'or': _eval_or,
+        'lambda': _eval_lambda,
+        'define-record-type': _eval_record_definition,
+        }
+
+
+# limits on the nesting and the length of the lists the REPL prints,
+# None for no limit
+PRINT_DEPTH = None
+PRINT_LENGTH = None
 
 
 def main():
@@ -212,10 +332,8 @@ def main():
                 continue
 
             result_expr = interpreter.interpret(expression)
-            if procedure.is_compound_procedure(result_expr):
-                print procedure.get_procedure_repr(result_expr)
-            else:
-                print result_expr
+            printer.write(result_expr, sys.stdout, PRINT_DEPTH, PRINT_LENGTH)
+            sys.stdout.write('\n')
         except Exception as e:
             print str(e)
             continue
@@ -0,0 +1,527 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import re
+
+from serval.model import TRUE, FALSE, UNSPECIFIED, EmptyList, is_true
+from serval.expression import (
+    selfeval, quote, variable, conditional,
+    procedure, sequence, binding, lambdaexpr
+    )
+from serval.expression.util import pair_to_list
+
+# calls of a procedure before it gets compiled to Python
+JIT_THRESHOLD = 50
+
+# spelling of Scheme name characters in Python identifiers
+IDENTIFIER_CHARACTERS = {
+    '?': '_p', '!': '_x', '+': 'add', '-': '_', '*': 'mul', '/': 'div',
+    '<': 'lt', '>': 'gt', '=': 'eq',
+    }
+
+
+class TranslationError(Exception):
+    """Raised for expressions that have no Python translation."""
+
+
+class TailCall(object):
+    """Procedure application returned by native code in tail position.
+
+    The caller keeps applying until it gets a value, so native code
+    runs tail calls in constant Python stack space.
+    """
+
+    __slots__ = ('proc', 'args')
+
+    def __init__(self, proc, args):
+        self.proc = proc
+        self.args = args
+
+
+class Translator(object):
+    """Translates a compound procedure into the source of a Python function.
+
+    Parameters and `let` variables become Python locals, `if`, `cond`,
+    `and` and `or` become Python conditionals and a tail call of the
+    procedure to itself becomes another round of a `while` loop.
+    Global variables are read from the cells of the global environment
+    `env`; calls of primitives still bound to the builtin go straight
+    to the implementation. Values are the serval.model objects the
+    interpreter uses, with `unboxed` set numbers are Python numbers.
+
+    Lambdas, definitions, assignments and other special forms raise
+    TranslationError.
+    """
+
+    def __init__(self, env, special_forms, unboxed=False):
+        self.env = env
+        self.unboxed = unboxed
+        # special forms of the interpreter, the ones not translated
+        # make the translation fail
+        self.special_forms = special_forms
+
+    def translate(self, proc, name=None):
+        """Return the source of the function and the namespace it needs.
+
+        `name` is the global name of `proc`, used to recognize tail
+        calls to itself.
+        """
+        return self.translate_lambda(procedure.procedure_parameters(proc),
+                                     procedure.procedure_body(proc),
+                                     name, proc)
+
+    def translate_lambda(self, params, body, name=None, proc=None):
+        """Translate a procedure given by its parameters and body.
+
+        Besides the namespace, `objects` maps every name in it to the
+        kind of object ('g' cell, 'p' primitive, 'i' its implementation
+        for a number of arguments, 'k' constant or 's' the procedure
+        itself) and the Scheme name it stands for, a (name, number of
+        arguments) pair for 'i'.
+        """
+        self.name = name
+        self.proc = proc
+        self.namespace = {}
+        self.objects = {}
+        self._objects = {}
+        self._counter = 0
+        self._loop = False
+
+        params, rest = lambdaexpr.parameter_names(params)
+        if rest is not None:
+            raise TranslationError('rest parameters are not supported - JIT')
+        scope = {}
+        pyparams = [self._local(param, scope) for param in params]
+        self.params = pyparams
+
+        lines = []
+        self._tail(sequence.sequence_exp(body), scope, lines, 2)
+
+        funcname = 'scheme_' + self.identifier(name or 'lambda')
+        if self._loop:
+            lines.insert(0, '    while True:')
+        else:
+            lines = [line[4:] for line in lines]
+        source = ['def %s(%s):' % (funcname, ', '.join(pyparams))] + lines
+        return funcname, '\n'.join(source) + '\n', self.namespace
+
+    ##########################################################
+    # Names
+    ##########################################################
+    @staticmethod
+    def identifier(name):
+        """Return a Python identifier spelling the Scheme name `name`."""
+        return re.sub(r'\W', '_', ''.join(IDENTIFIER_CHARACTERS.get(c, c)
+                                          for c in name))
+
+    def _local(self, name, scope):
+        pyname = 'v%d_%s' % (self._counter, self.identifier(name))
+        self._counter += 1
+        scope[name] = pyname
+        return pyname
+
+    def _object(self, prefix, value, hint='', payload=None):
+        key = (prefix, id(value))
+        pyname = self._objects.get(key)
+        if pyname is None:
+            pyname = '%s%d' % (prefix, len(self._objects))
+            if hint:
+                pyname += '_' + self.identifier(hint)
+            self._objects[key] = pyname
+            self.namespace[pyname] = value
+            self.objects[pyname] = (prefix,
+                                    hint if payload is None else payload)
+        return pyname
+
+    def _cell(self, symbol):
+        return self._object('g', self.env.cell(symbol), symbol.name)
+
+    def _constant(self, value):
+        return self._object('k', value)
+
+    ##########################################################
+    # Expressions
+    ##########################################################
+    def _expr(self, expr, scope):
+        """Return a Python expression computing the value of `expr`."""
+        if selfeval.is_self_evaluating(expr):
+            return self._constant(expr)
+
+        if variable.is_variable(expr):
+            if expr.name in scope:
+                return scope[expr.name]
+            return 'ref(%s)' % self._cell(expr)
+
+        if not procedure.is_application(expr):
+            raise TranslationError('Unknown expression type - JIT %s' % expr)
+
+        form = self._form(expr, scope)
+        if form == 'quote':
+            return self._constant(quote.text_of_quotation(expr))
+
+        if form == 'if':
+            alternative = conditional.if_alternative(expr)
+            return '(%s if %s else %s)' % (
+                self._expr(conditional.if_consequent(expr), scope),
+                self._test(self._expr(conditional.if_predicate(expr),
+                                      scope)),
+                self._constant(UNSPECIFIED) if alternative is False
+                else self._expr(alternative, scope))
+
+        if form == 'cond':
+            return self._expr(conditional.cond_to_if(expr), scope)
+
+        if form == 'and':
+            return self._and(pair_to_list(procedure.operands(expr)), scope)
+
+        if form == 'or':
+            return self._or(pair_to_list(procedure.operands(expr)), scope)
+
+        if form == 'begin':
+            exprs = pair_to_list(sequence.begin_actions(expr))
+            return '(%s,)[-1]' % ', '.join(self._expr(e, scope)
+                                           for e in exprs)
+
+        if form == 'let':
+            inner = dict(scope)
+            names = [self._local(var.name, inner) for var in
+                     pair_to_list(binding.binding_variables(expr))]
+            values = [self._expr(value, scope) for value in
+                      pair_to_list(binding.binding_values(expr))]
+            body = self._expr(
+                sequence.sequence_exp(binding.binding_body(expr)), inner)
+            return '(lambda %s: %s)(%s)' % (', '.join(names), body,
+                                            ', '.join(values))
+
+        return self._application(expr, scope, tail=False)
+
+    def _and(self, exprs, scope):
+        if not exprs:
+            return self._constant(TRUE)
+        if len(exprs) == 1:
+            return self._expr(exprs[0], scope)
+        # the value of a false operand is #f, whatever it is
+        return '(%s if %s else %s)' % (self._and(exprs[1:], scope),
+                                       self._test(self._expr(exprs[0], scope)),
+                                       self._constant(FALSE))
+
+    def _or(self, exprs, scope):
+        if not exprs:
+            return self._constant(FALSE)
+        if not self.unboxed:
+            return '(%s)' % ' or '.join(self._expr(e, scope) for e in exprs)
+        if len(exprs) == 1:
+            return self._expr(exprs[0], scope)
+        value = 't%d' % self._counter
+        self._counter += 1
+        return '(lambda %s: %s if truth(%s) else %s)(%s)' % (
+            value, value, value, self._or(exprs[1:], scope),
+            self._expr(exprs[0], scope))
+
+    def _is_true(self, value):
+        """Return the condition for the Scheme truth of the local `value`."""
+        # identity checks, cheaper than Boolean.__nonzero__
+        return '%s is not %s and %s is not None' % (
+            value, self._constant(FALSE), value)
+
+    def _temporary(self, source, pad, lines):
+        value = 't%d' % self._counter
+        self._counter += 1
+        lines.append(pad + '%s = %s' % (value, source))
+        return value
+
+    def _test(self, source):
+        """Return the Python condition for the Scheme truth of `source`."""
+        # Python conditionals are right for the objects of serval.model,
+        # but a Python 0 is true in Scheme
+        if self.unboxed:
+            return 'truth(%s)' % source
+        return source
+
+    def _form(self, expr, scope):
+        head = procedure.operator(expr)
+        if not variable.is_variable(head):
+            return None
+        if head.name in ('quote', 'if', 'cond', 'and', 'or', 'begin', 'let'):
+            return head.name
+        if head.name in self.special_forms:
+            raise TranslationError('%s is not supported - JIT' % head.name)
+        return None
+
+    def _application(self, expr, scope, tail):
+        head = procedure.operator(expr)
+        operands = pair_to_list(procedure.operands(expr))
+        args = ', '.join(self._expr(e, scope) for e in operands)
+
+        if variable.is_variable(head) and head.name not in scope:
+            cell = self._cell(head)
+            value = self.env.cell(head).value
+            if (value is not None and
+                procedure.is_primitive_procedure(value) and
+                len(operands) < value.FIXED_ARITIES):
+                # the builtin as long as the global still holds it
+                implementation = value.fixed[len(operands)]
+                return '(%s if %s.value is %s else %s(ref(%s)))(%s)' % (
+                    self._object('i', implementation, head.name,
+                                 (head.name, len(operands))),
+                    cell, self._object('p', value, head.name),
+                    'tail_caller' if tail else 'caller', cell, args)
+            operator = 'ref(%s)' % cell
+        else:
+            operator = self._expr(head, scope)
+
+        if tail:
+            return 'TailCall(%s, (%s))' % (operator, args + ',' if args
+                                           else '')
+        return 'call(%s)' % ', '.join(filter(None, [operator, args]))
+
+    ##########################################################
+    # Statements
+    ##########################################################
+    def _tail(self, expr, scope, lines, indent):
+        """Add statements returning the value of `expr` to `lines`."""
+        pad = '    ' * indent
+        if (not procedure.is_application(expr) or
+            variable.is_variable(expr)):
+            lines.append(pad + 'return ' + self._expr(expr, scope))
+            return
+
+        form = self._form(expr, scope)
+        if form == 'if':
+            value = self._temporary(
+                self._expr(conditional.if_predicate(expr), scope), pad, lines)
+            lines.append(pad + 'if %s:' % self._is_true(value))
+            self._tail(conditional.if_consequent(expr), scope, lines,
+                       indent + 1)
+            alternative = conditional.if_alternative(expr)
+            if alternative is False:
+                lines.append(pad + 'return %s' % self._constant(UNSPECIFIED))
+            else:
+                self._tail(alternative, scope, lines, indent)
+
+        elif form == 'cond':
+            self._tail(conditional.cond_to_if(expr), scope, lines, indent)
+
+        elif form == 'begin':
+            exprs = pair_to_list(sequence.begin_actions(expr))
+            for e in exprs[:-1]:
+                lines.append(pad + self._expr(e, scope))
+            self._tail(exprs[-1], scope, lines, indent)
+
+        elif form == 'and' and procedure.operands(expr) is not EmptyList:
+            exprs = pair_to_list(procedure.operands(expr))
+            for e in exprs[:-1]:
+                value = self._temporary(self._expr(e, scope), pad, lines)
+                lines.append(pad + 'if not (%s):' % self._is_true(value))
+                lines.append(pad + '    return %s' %
+                             self._constant(FALSE))
+            self._tail(exprs[-1], scope, lines, indent)
+
+        elif form == 'or' and procedure.operands(expr) is not EmptyList:
+            exprs = pair_to_list(procedure.operands(expr))
+            for e in exprs[:-1]:
+                value = self._temporary(self._expr(e, scope), pad, lines)
+                lines.append(pad + 'if %s:' % self._is_true(value))
+                lines.append(pad + '    return %s' % value)
+            self._tail(exprs[-1], scope, lines, indent)
+
+        elif form == 'let':
+            inner = dict(scope)
+            values = [self._expr(value, scope) for value in
+                      pair_to_list(binding.binding_values(expr))]
+            names = [self._local(var.name, inner) for var in
+                     pair_to_list(binding.binding_variables(expr))]
+            if names:
+                lines.append(pad + '%s = %s' % (', '.join(names),
+                                                ', '.join(values)))
+            self._tail(sequence.sequence_exp(binding.binding_body(expr)),
+                       inner, lines, indent)
+
+        elif form is None and self._is_self_call(expr, scope):
+            args = [self._expr(e, scope)
+                    for e in pair_to_list(procedure.operands(expr))]
+            head = procedure.operator(expr)
+            cell = self._cell(head)
+            pyargs = 'a%d' % self._counter
+            self._counter += 1
+            lines.append(pad + '%s = (%s)' % (
+                pyargs, ''.join(arg + ', ' for arg in args)))
+            lines.append(pad + 'if %s.value is not %s:' % (
+                cell, self._object('s', self.proc, head.name)))
+            lines.append(pad + '    return TailCall(ref(%s), %s)' % (
+                cell, pyargs))
+            if self.params:
+                lines.append(pad + '%s, = %s' % (', '.join(self.params),
+                                                 pyargs))
+            lines.append(pad + 'continue')
+            self._loop = True
+
+        elif form is None:
+            lines.append(pad + 'return ' + self._application(expr, scope,
+                                                             tail=True))
+        else:
+            lines.append(pad + 'return ' + self._expr(expr, scope))
+
+    def _is_self_call(self, expr, scope):
+        head = procedure.operator(expr)
+        return (self.name is not None and variable.is_variable(head) and
+                head.name == self.name and head.name not in scope and
+                len(pair_to_list(procedure.operands(expr))) ==
+                len(self.params))
+
+
+class JIT(object):
+    """Tiered execution for the tree-walking interpreter.
+
+    Counts the calls of the procedures defined at the top level and
+    translates a procedure to Python once it has been called
+    `threshold` times. Procedures that can't be translated stay with
+    the interpreter. With `dump` set to a file object the source of
+    every compiled procedure is written to it.
+
+    The call counts and the native code are kept on the procedures
+    (see CompoundProcedure), the JIT holds no reference to them.
+    """
+
+    def __init__(self, interpreter, threshold=JIT_THRESHOLD, dump=None):
+        self.interpreter = interpreter
+        self.env = interpreter.env
+        self.threshold = threshold
+        self.dump = dump
+        self.translator = Translator(self.env, interpreter.special_forms,
+                                     interpreter.unboxed)
+        # (procedure name, reason) of failed translations
+        self.fallbacks = []
+
+    def source(self, proc):
+        """Return the Python source generated for `proc` or None."""
+        return getattr(proc, 'native_source', None)
+
+    def invalidate(self, proc):
+        """Forget the native code of `proc` after its body changed."""
+        proc.calls, proc.native, proc.native_source = 0, None, None
+
+    def install(self, proc, native, source=None):
+        """Run `proc` as the Python function `native` from now on."""
+        proc.native = native
+        if source is not None:
+            proc.native_source = source
+
+    def helpers(self):
+        """Return the names generated code expects besides its objects."""
+        return dict(
+            TailCall=TailCall,
+            truth=is_true,
+            ref=self._ref,
+            call=self.call,
+            caller=lambda proc: lambda *args: self.call(proc, *args),
+            tail_caller=lambda proc: lambda *args: TailCall(proc, args),
+            )
+
+    def enter(self, proc, args):
+        """Apply the compound procedure `proc` to the tuple `args`.
+
+        Runs native code as long as there is some and returns the
+        value, or a TailCall with a procedure left for the interpreter.
+        """
+        native = proc.native or self._tier_up(proc)
+        if native is None:
+            return TailCall(proc, args)
+
+        while True:
+            if len(args) != proc.arity:
+                raise ValueError('Wrong number of arguments - APPLY %s' % proc)
+            result = native(*args)
+            if result.__class__ is not TailCall:
+                return result
+
+            proc, args = result.proc, result.args
+            native = getattr(proc, 'native', None) or self._tier_up(proc)
+            if native is None:
+                if procedure.is_primitive_procedure(proc):
+                    return proc.apply(args)
+                return TailCall(proc, args)
+
+    def call(self, proc, *args):
+        """Apply `proc` to `args` from native code."""
+        while True:
+            native = getattr(proc, 'native', None) or self._tier_up(proc)
+            if native is None:
+                if procedure.is_primitive_procedure(proc):
+                    return proc.apply(args)
+                return self.interpreter._apply(proc, args)
+
+            if len(args) != proc.arity:
+                raise ValueError('Wrong number of arguments - APPLY %s' % proc)
+            result = native(*args)
+            if result.__class__ is not TailCall:
+                return result
+            proc, args = result.proc, result.args
+
+    def _tier_up(self, proc):
+        if (not procedure.is_compound_procedure(proc) or
+            procedure.procedure_environment(proc) is not self.env):
+            return None
+
+        if proc.calls is None:
+            return None
+
+        proc.calls += 1
+        if proc.calls < self.threshold:
+            return None
+
+        native = self._compile(proc)
+        if native is None:
+            proc.calls = None
+        else:
+            proc.native = native
+        return native
+
+    def _compile(self, proc):
+        names = sorted(symbol.name for symbol, value
+                       in self.env.bindings.items() if value is proc)
+        name = names[0] if names else None
+        try:
+            funcname, source, namespace = self.translator.translate(proc, name)
+        except TranslationError as e:
+            self.fallbacks.append((name, str(e)))
+            return None
+
+        namespace.update(self.helpers())
+        exec compile(source, '<serval-jit %s>' % name, 'exec') in namespace
+
+        proc.native_source = source
+        if self.dump is not None:
+            self.dump.write('# %s\n%s\n' % (
+                name or procedure.get_procedure_repr(proc), source))
+        return namespace[funcname]
+
+    @staticmethod
+    def _ref(cell):
+        value = cell.value
+        if value is None:
+            raise NameError('Unbound variable: %s' % cell)
+        return value
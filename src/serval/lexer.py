@@ -56,6 +56,7 @@ class Lexer(object):
         (r'#t|#f', tokens.BOOLEAN),
         (r'#\\(?:newline|space|[a-zA-Z])', tokens.CHARACTER),
         (r'".*"', tokens.STRING),
+        (r'#\(', tokens.VECTOR),
         (r'\(', tokens.LPAREN),
         (r'\)', tokens.RPAREN),
         (r'\'', tokens.QUOTE),
@@ -25,8 +25,15 @@
 __author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
 
 
+# Python types of the numbers of the unboxed mode, where Scheme
+# numbers are plain Python numbers instead of Number objects
+NUMBER_TYPES = (int, long, float)
+
+
 class Number(object):
 
+    __slots__ = ('val',)
+
     def __init__(self, val):
         self.val = val
 
@@ -34,12 +41,20 @@ class Number(object):
         return str(self.val)
 
     def __eq__(self, other):
+        if other.__class__ in NUMBER_TYPES:
+            return self.val == other
         return isinstance(other, self.__class__) and self.val == other.val
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
+    def __hash__(self):
+        # equal to the hash of the Python number it is equal to
+        return hash(self.val)
+
     def __lt__(self, other):
+        if other.__class__ in NUMBER_TYPES:
+            return self.val < other
         return isinstance(other, self.__class__) and self.val < other.val
 
     def __le__(self, other):
@@ -55,10 +70,34 @@ class Number(object):
         return True
 
 
+def is_number(value):
+    """Return True if `value` is a boxed or an unboxed Scheme number."""
+    return value.__class__ in NUMBER_TYPES or isinstance(value, Number)
+
+
+def number_value(value):
+    """Return the Python number of a boxed or an unboxed Scheme number."""
+    if value.__class__ in NUMBER_TYPES:
+        return value
+    return value.val
+
+
+def box_number(value):
+    """Return `value` as a Number object."""
+    if value.__class__ in NUMBER_TYPES:
+        return Number(value)
+    return value
+
+
 class Boolean(object):
+    """#t or #f, Boolean(val) returns one of the two instances
+    TRUE and FALSE, so booleans are compared by identity.
+    """
 
-    def __init__(self, val):
-        self.val = val
+    __slots__ = ('val',)
+
+    def __new__(cls, val):
+        return TRUE if val else FALSE
 
     def __str__(self):
         return '#t' if self.val else '#f'
@@ -66,27 +105,64 @@ class Boolean(object):
     def __nonzero__(self):
         return self.val
 
-    def __eq__(self, other):
-        return isinstance(other, self.__class__) and self.val == other.val
+
+def _make_boolean(val):
+    boolean = object.__new__(Boolean)
+    boolean.val = val
+    return boolean
+
+TRUE = _make_boolean(True)
+FALSE = _make_boolean(False)
+
+
+def is_true(value):
+    """Scheme truth: only #f is false (and None, which no Scheme
+    expression evaluates to), 0 of the unboxed mode is not.
+    """
+    return value is not FALSE and value is not None
+
+
+class Unspecified(object):
+    """Value of the expressions Scheme leaves unspecified, like a
+    one-armed IF whose test is false. UNSPECIFIED is the only instance;
+    unlike None it is never taken for an unbound variable.
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        return '#!unspecific'
+
+UNSPECIFIED = Unspecified()
 
 
 class Character(object):
+    """Canonical character, Character('a') is Character('a')."""
 
-    def __init__(self, val):
-        self.val = val
+    __slots__ = ('val',)
+
+    # text -> character
+    table = {}
+
+    def __new__(cls, val):
+        character = cls.table.get(val)
+        if character is None:
+            character = object.__new__(cls)
+            character.val = val
+            cls.table[val] = character
+        return character
 
     def __str__(self):
         return '#\\' + self.val
 
-    def __eq__(self, other):
-        return isinstance(other, self.__class__) and self.val == other.val
-
     def __nonzero__(self):
         return True
 
 
 class String(object):
 
+    __slots__ = ('val',)
+
     def __init__(self, val):
         self.val = val
 
@@ -96,23 +172,38 @@ class String(object):
     def __eq__(self, other):
         return isinstance(other, self.__class__) and self.val == other.val
 
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.val)
+
     def __nonzero__(self):
         return True
 
 
 class Symbol(object):
+    """Interned symbol, Symbol('x') is Symbol('x').
 
-    def __init__(self, name):
-        self.name = name
+    Symbols are compared (and hashed) by identity; their names are
+    interned strings.
+    """
 
-    def __str__(self):
-        return self.name
+    __slots__ = ('name',)
 
-    def __eq__(self, other):
-        if isinstance(other, Symbol) and self.name == other.name:
-            return True
+    # name -> symbol, symbols live as long as the process
+    table = {}
 
-        return False
+    def __new__(cls, name):
+        symbol = cls.table.get(name)
+        if symbol is None:
+            symbol = object.__new__(cls)
+            symbol.name = intern(name)
+            cls.table[symbol.name] = symbol
+        return symbol
+
+    def __str__(self):
+        return self.name
 
     def __nonzero__(self):
         return True
@@ -120,12 +211,17 @@ class Symbol(object):
 
 class EmptyList(object):
 
+    __slots__ = ()
+
     def __str__(self):
         return '()'
 
     def __eq__(self, other):
         return isinstance(other, self.__class__)
 
+    def __hash__(self):
+        return 0
+
     def __nonzero__(self):
         return True
 
@@ -134,45 +230,235 @@ EmptyList = EmptyList()
 
 class Pair(object):
 
+    __slots__ = ('head', 'tail')
+
     def __init__(self, head, tail):
         self.head = head
         self.tail = tail
 
     def __str__(self):
-        return '(%s)' % self._write_pair(self)
+        from serval.printer import to_string
+        return to_string(self)
+
+
+class Vector(object):
+    """Scheme vector, its elements are in the Python list `items`."""
+
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = items
+
+    def __str__(self):
+        from serval.printer import to_string
+        return to_string(self)
+
+    def __nonzero__(self):
+        return True
 
-    @staticmethod
-    def _write_pair(pair):
-        head, tail = pair.head, pair.tail
 
-        output = str(head)
+class HashTable(object):
+    """Scheme hash table backed by the dict `table`.
 
-        if isinstance(tail, Pair):
-            output += ' %s' % Pair._write_pair(tail)
-            return output
+    The keys of an eq? table are the Scheme objects themselves, an
+    equal? table (`equal` set) wraps them so they compare with equal?.
+    """
 
-        if tail is EmptyList:
-            return output
+    __slots__ = ('table', 'equal')
 
-        output += ' . %s' % str(tail)
-        return output
+    def __init__(self, equal=False):
+        self.table = {}
+        self.equal = equal
 
+    def __str__(self):
+        return '#<hash-table %s %d>' % ('equal?' if self.equal else 'eq?',
+                                        len(self.table))
 
+    def __nonzero__(self):
+        return True
 
 
+class Record(object):
+    """Base class of the classes made for record types."""
+
+    __slots__ = ()
+
+    def __str__(self):
+        return '#<record %s>' % self.record_type.name
+
+    def __nonzero__(self):
+        return True
 
 
+class RecordType(object):
+    """Record type made by define-record-type.
 
+    Its records are instances of `cls`, a class made for the type with
+    one slot per name in `fields`. The slot of field i is `_i`, since
+    field names need not be Python identifiers.
+    """
 
+    __slots__ = ('name', 'fields', 'cls')
 
+    def __init__(self, name, fields):
+        if len(set(fields)) != len(fields):
+            raise ValueError('Duplicate field names - %s' % name)
+        self.name = name
+        self.fields = tuple(fields)
+        self.cls = type(name, (Record,), {
+            '__slots__': tuple('_%d' % index
+                               for index in range(len(fields))),
+            'record_type': self,
+            })
 
+    def __str__(self):
+        return '#<record-type %s>' % self.name
 
+    def __nonzero__(self):
+        return True
 
+    def slot(self, field):
+        """Return the name of the slot holding `field`."""
+        if field not in self.fields:
+            raise ValueError('Unknown field %s - %s' % (field, self.name))
+        return '_%d' % self.fields.index(field)
+
+
+class CompoundProcedure(object):
+    """Procedure made by evaluating a `lambda` expression.
+
+    `parameters` is the parameter list as written, `params` the tuple
+    of required parameter symbols and `arity` its length. `rest` is
+    the parameter that gets the list of the remaining arguments, if
+    any. `analyzed_body` is the execution procedure built for the body
+    by the analyzing evaluator, if any.
+
+    The JIT (serval.jit) keeps its state for the procedure here, so it
+    goes away with the procedure: `calls` counts the calls so far (None
+    once the procedure is known not to translate), `native` is the
+    Python function it runs as and `native_source` the generated source.
+    """
+
+    __slots__ = ('parameters', 'params', 'arity', 'rest', 'body', 'env',
+                 'analyzed_body', 'calls', 'native', 'native_source')
+
+    def __init__(self, parameters, body, env, analyzed_body=None):
+        params = []
+        rest = parameters
+        while rest.__class__ is Pair:
+            params.append(rest.head)
+            rest = rest.tail
+
+        self.parameters = parameters
+        self.params = tuple(params)
+        self.arity = len(params)
+        self.rest = None if rest is EmptyList else rest
+        self.body = body
+        self.env = env
+        self.analyzed_body = analyzed_body
+        self.calls = 0
+        self.native = None
+        self.native_source = None
 
+    def __str__(self):
+        return '#<procedure %s %s <procedure-env>' % (self.parameters,
+                                                      self.body)
 
 
+class PrimitiveProcedure(object):
+    """Procedure implemented by the Python function `implementation`.
 
+    `implementation` takes any number of arguments within `arity`,
+    the (minimum, maximum) number of arguments with maximum None for
+    no limit. `specialized` maps a number of arguments to a function
+    taking exactly that many, used instead of `implementation` when
+    a call has that many arguments. `fixed[n]` is the function to call
+    with n arguments for n below FIXED_ARITIES; it raises a ValueError
+    naming the procedure when n is not allowed.
+    """
 
+    __slots__ = ('implementation', 'name', 'arity', 'fixed')
 
+    FIXED_ARITIES = 4
 
+    def __init__(self, implementation, name=None, arity=(0, None),
+                 specialized=None):
+        self.implementation = implementation
+        self.name = name
+        self.arity = arity
+        self.fixed = tuple(self._function(count, specialized or {})
+                           for count in range(self.FIXED_ARITIES))
 
+    def __str__(self):
+        return '#<primitive %s>' % (self.name or self.implementation)
+
+    def apply(self, args):
+        """Apply the procedure to the tuple `args`."""
+        count = len(args)
+        if count < self.FIXED_ARITIES:
+            return self.fixed[count](*args)
+        self.check_arity(count)
+        return self.implementation(*args)
+
+    def caller(self, count):
+        """Return the function to call with `count` arguments."""
+        if count < self.FIXED_ARITIES:
+            return self.fixed[count]
+        self.check_arity(count)
+        return self.implementation
+
+    def check_arity(self, count):
+        minimum, maximum = self.arity
+        if count < minimum or (maximum is not None and count > maximum):
+            if maximum is None:
+                expected = 'at least %d' % minimum
+            elif maximum == minimum:
+                expected = '%d' % minimum
+            else:
+                expected = '%d to %d' % (minimum, maximum)
+            raise ValueError(
+                'Wrong number of arguments - APPLY %s: expected %s, got %d'
+                % (self, expected, count))
+
+    def _function(self, count, specialized):
+        if count in specialized:
+            return specialized[count]
+        try:
+            self.check_arity(count)
+        except ValueError:
+            def wrong_number_of_arguments(*args):
+                self.check_arity(len(args))
+            return wrong_number_of_arguments
+        return self.implementation
+
+
+def unbox_numbers(expr):
+    """Return `expr` with its Number objects replaced by Python numbers.
+
+    Lists and vectors are copied only when something in them changes.
+    """
+    if isinstance(expr, Number):
+        return expr.val
+    if isinstance(expr, Vector):
+        items = [unbox_numbers(item) for item in expr.items]
+        if all(item is old for item, old in zip(items, expr.items)):
+            return expr
+        return Vector(items)
+    if not isinstance(expr, Pair):
+        return expr
+
+    heads = []
+    tail = expr
+    while isinstance(tail, Pair):
+        heads.append(tail.head)
+        tail = tail.tail
+
+    items = [unbox_numbers(head) for head in heads]
+    result = unbox_numbers(tail)
+    if result is tail and all(item is head
+                              for item, head in zip(items, heads)):
+        return expr
+
+    for item in reversed(items):
+        result = Pair(item, result)
+    return result
@@ -0,0 +1,179 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import array
+import itertools
+import operator
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# element kind -> (NumPy dtype, array.array typecode), 'l' is a 64-bit
+# C long on the LP64 platforms
+KINDS = {
+    'f64': ('float64', 'd'),
+    's64': ('int64', 'l'),
+    }
+
+# operation -> (NumPy ufunc name, Python function)
+UNARY_OPERATIONS = {
+    'neg': ('negative', operator.neg),
+    'abs': ('absolute', abs),
+    }
+
+BINARY_OPERATIONS = {
+    'add': ('add', operator.add),
+    'sub': ('subtract', operator.sub),
+    'mul': ('multiply', operator.mul),
+    }
+
+
+class NumericVector(object):
+    """Homogeneous vector of 'f64' (float) or 's64' (integer) `kind`.
+
+    The elements are in `data`, a NumPy array when NumPy is installed
+    and an array.array otherwise.
+    """
+
+    __slots__ = ('kind', 'data')
+
+    def __init__(self, kind, data):
+        self.kind = kind
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __str__(self):
+        return '#%s(%s)' % (self.kind, ' '.join(map(str, self.tolist())))
+
+    def __nonzero__(self):
+        return True
+
+    def tolist(self):
+        """Return the elements as a list of Python numbers."""
+        return self.data.tolist()
+
+    def get(self, index):
+        self._check_index(index)
+        if numpy is not None:
+            return self.data.item(index)
+        return self.data[index]
+
+    def set(self, index, value):
+        self._check_index(index)
+        _check_items(self.kind, [value])
+        self.data[index] = value
+
+    def _check_index(self, index):
+        if not 0 <= index < len(self.data):
+            raise IndexError('Index out of range - %s' % index)
+
+
+def _check_items(kind, items):
+    if kind == 's64':
+        for item in items:
+            if item.__class__ is not int and item.__class__ is not long:
+                raise TypeError('Expecting an integer - %s' % item)
+
+
+def make(kind, items):
+    """Return a NumericVector of `kind` holding the list `items`."""
+    _check_items(kind, items)
+    dtype, typecode = KINDS[kind]
+    if numpy is not None:
+        return NumericVector(kind, numpy.array(items, dtype=dtype))
+    return NumericVector(kind, array.array(typecode, items))
+
+
+def _result_kind(operands):
+    for operand in operands:
+        if isinstance(operand, NumericVector):
+            if operand.kind == 'f64':
+                return 'f64'
+        elif operand.__class__ is float:
+            return 'f64'
+    return 's64'
+
+
+def _length(operands):
+    lengths = set(len(operand) for operand in operands
+                  if isinstance(operand, NumericVector))
+    if not lengths:
+        raise TypeError('Expecting a numeric vector')
+    if len(lengths) > 1:
+        raise ValueError('Vectors differ in length')
+    return lengths.pop()
+
+
+def _apply(operation, operands):
+    ufunc, func = operation
+    kind = _result_kind(operands)
+    length = _length(operands)
+    if numpy is not None:
+        data = getattr(numpy, ufunc)(
+            *[getattr(operand, 'data', operand) for operand in operands])
+        return NumericVector(kind, numpy.asarray(data, KINDS[kind][0]))
+
+    iterables = [operand.data if isinstance(operand, NumericVector)
+                 else itertools.repeat(operand, length)
+                 for operand in operands]
+    return NumericVector(
+        kind, array.array(KINDS[kind][1], itertools.imap(func, *iterables)))
+
+
+def unary(name, operand):
+    """Apply the operation `name` to every element of `operand`."""
+    return _apply(UNARY_OPERATIONS[name], [operand])
+
+
+def binary(name, first, second):
+    """Apply the operation `name` element by element.
+
+    Either operand can be a Python number, used for every element.
+    """
+    return _apply(BINARY_OPERATIONS[name], [first, second])
+
+
+def total(vector):
+    """Return the sum of the elements of `vector`."""
+    if numpy is not None:
+        return vector.data.sum().item()
+    return sum(vector.data, 0.0 if vector.kind == 'f64' else 0)
+
+
+def dot(first, second):
+    """Return the dot product of two vectors of the same length."""
+    _length([first, second])
+    if numpy is not None:
+        return numpy.dot(first.data, second.data).item()
+    start = 0.0 if _result_kind([first, second]) == 'f64' else 0
+    return sum(itertools.imap(operator.mul, first.data, second.data), start)
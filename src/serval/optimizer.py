@@ -0,0 +1,509 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+from serval import builtin
+from serval.model import Symbol, is_true
+from serval.scope import scan_out_defines
+from serval.expression import (
+    selfeval, quote, definition, variable,
+    assignment, conditional, lambdaexpr,
+    procedure, binding, record
+    )
+from serval.expression.util import car, cons, tolist, pair_to_list
+
+# primitives without side effects that can be run at optimization
+# time when all of their arguments are constants, their unboxed
+# variants in builtin.UNBOXED_PROCEDURES are pure too
+PURE_PRIMITIVES = {
+    '+': builtin.builtin_add,
+    '-': builtin.builtin_sub,
+    '*': builtin.builtin_mul,
+    '/': builtin.builtin_div,
+    '=': builtin.builtin_eq,
+    '<': builtin.builtin_lt,
+    '<=': builtin.builtin_le,
+    '>': builtin.builtin_gt,
+    '>=': builtin.builtin_ge,
+    'abs': builtin.builtin_abs,
+    'not': builtin.builtin_not,
+    'zero?': builtin.builtin_zero_p,
+    'number?': builtin.builtin_number_p,
+    'even?': builtin.builtin_even_p,
+    'expt': builtin.builtin_expt,
+    }
+
+# largest body, in symbols and constants, of a procedure that gets
+# inlined at its call sites
+INLINE_SIZE_LIMIT = 20
+
+# forms allowed in the body of an inlined procedure: none of them
+# binds variables, so parameters can be substituted textually
+INLINE_FORMS = ('quote', 'if', 'and', 'or', 'begin')
+
+
+class Optimizer(object):
+    """Source to source optimizer run on parsed expressions.
+
+    Folds calls of pure primitives on constants, prunes `if` arms
+    that can never be taken and expands `cond` and `let` into `if`
+    and lambda applications, so evaluation does not redo that work
+    on every call.
+
+    A primitive is folded only when its name is bound to the builtin
+    in the global environment `env`, is not shadowed by a local
+    variable and is not defined or set! by any expression seen so far.
+    Top level procedure definitions with folded calls are deoptimized
+    like the callers of inlined procedures (see below) when the
+    primitive is redefined; other code optimized before that keeps
+    the builtin.
+
+    Calls in the bodies of top level procedure definitions are
+    replaced by the body of the procedure called when it is small,
+    not recursive, made of INLINE_FORMS only and its name is never
+    the target of a set!. Every such caller is recorded as depending
+    on the procedure; defining or assigning the procedure's name
+    later deoptimizes the callers: `pop_deoptimized` hands out their
+    original source, which the interpreter puts back in place.
+
+    Expressions whose head is in `special_forms`, but not handled
+    here, are left alone.
+    """
+
+    def __init__(self, env, special_forms=None):
+        self.env = env
+        self.special_forms = special_forms or {}
+        # global names defined or assigned by the program
+        self.rebound = set()
+        # global names that are the target of a set!
+        self.assigned = set()
+        # name -> (params, body, free variables) of inlinable procedures
+        self.inlinable = {}
+        # name -> names of the procedures it has been inlined into
+        self.dependents = {}
+        # caller name -> (source, optimized body) of its definition
+        self.sources = {}
+        # name of the procedure whose body calls are inlined into
+        self._caller = None
+        self._deoptimized = []
+        self.folded = 0
+        self.pruned = 0
+        self.expanded = 0
+        self.inlined = 0
+        self.deoptimized = 0
+
+    def statistics(self):
+        return dict(folded=self.folded, pruned=self.pruned,
+                    expanded=self.expanded, inlined=self.inlined,
+                    deoptimized=self.deoptimized)
+
+    def pop_deoptimized(self):
+        """Return (name, source, optimized body) of deoptimized callers.
+
+        The optimized body is the one the procedure named `name` was
+        built with; `source` is its definition before inlining.
+        """
+        deoptimized, self._deoptimized = self._deoptimized, []
+        return deoptimized
+
+    def optimize(self, expr):
+        return self._optimize(expr, frozenset())
+
+    def optimize_procedure(self, name, source):
+        """Optimize the lambda expression `source` of the top level
+        procedure `name`, recording what it depends on.
+
+        Also used to rebuild a deoptimized procedure from its source.
+        """
+        inlined, folded = self.inlined, self.folded
+        value = self._optimize_lambda(source, frozenset(), caller=name)
+        if self.inlined != inlined or self.folded != folded:
+            self.sources[name] = (source, lambdaexpr.lambda_body(value))
+        self._record_inlinable(name, value)
+        return value
+
+    def _optimize(self, expr, bound):
+        # `bound` holds the names of the enclosing local variables
+        if not procedure.is_application(expr):
+            return expr
+
+        head = procedure.operator(expr)
+        if variable.is_variable(head):
+            transform = self.transforms.get(head.name)
+            if transform is not None:
+                return transform(self, expr, bound)
+            if head.name in self.special_forms:
+                return expr
+
+        return self._optimize_application(expr, bound)
+
+    def _optimize_sequence(self, exprs, bound):
+        return tolist(*[self._optimize(e, bound) for e in pair_to_list(exprs)])
+
+    def _is_constant(self, expr):
+        return selfeval.is_self_evaluating(expr) or quote.is_quoted(expr)
+
+    def _constant_value(self, expr):
+        if quote.is_quoted(expr):
+            return quote.text_of_quotation(expr)
+        return expr
+
+    def _rebind(self, var, bound):
+        if var.name not in bound:
+            self.rebound.add(var.name)
+            self.sources.pop(var.name, None)
+            self._invalidate(var.name)
+
+    def _invalidate(self, name):
+        self.inlinable.pop(name, None)
+        for caller in self.dependents.pop(name, ()):
+            record = self.sources.pop(caller, None)
+            if record is not None:
+                self.deoptimized += 1
+                self._deoptimized.append((caller,) + record)
+            self._invalidate(caller)
+
+    ##########################################################
+    # Transformations
+    ##########################################################
+    def _optimize_quoted(self, expr, bound):
+        return expr
+
+    def _optimize_definition(self, expr, bound):
+        var = definition.definition_variable(expr)
+        self._rebind(var, bound)
+        source = definition.definition_value(expr)
+
+        if bound or not lambdaexpr.is_lambda(source):
+            value = self._optimize(source, bound)
+            if not bound and variable.is_variable(value):
+                self._record_alias(var.name, value.name)
+            return tolist(procedure.operator(expr), var, value)
+
+        value = self.optimize_procedure(var.name, source)
+        return tolist(procedure.operator(expr), var, value)
+
+    def _optimize_record_definition(self, expr, bound):
+        for name in record.record_definition_names(expr):
+            self._rebind(Symbol(name), bound)
+        return expr
+
+    def _optimize_assignment(self, expr, bound):
+        var = assignment.assignment_variable(expr)
+        self._rebind(var, bound)
+        if var.name not in bound:
+            self.assigned.add(var.name)
+        value = self._optimize(assignment.assignment_value(expr), bound)
+        return tolist(procedure.operator(expr), var, value)
+
+    def _optimize_if(self, expr, bound):
+        predicate = self._optimize(conditional.if_predicate(expr), bound)
+        consequent = self._optimize(conditional.if_consequent(expr), bound)
+        alternative = conditional.if_alternative(expr)
+        if alternative is not False:
+            alternative = self._optimize(alternative, bound)
+
+        if self._is_constant(predicate):
+            if is_true(self._constant_value(predicate)):
+                self.pruned += 1
+                return consequent
+            if alternative is not False:
+                self.pruned += 1
+                return alternative
+
+        if alternative is False:
+            return tolist(procedure.operator(expr), predicate, consequent)
+        return conditional.make_if(predicate, consequent, alternative)
+
+    def _optimize_cond(self, expr, bound):
+        self.expanded += 1
+        return self._optimize(conditional.cond_to_if(expr), bound)
+
+    def _optimize_binding(self, expr, bound):
+        self.expanded += 1
+        return self._optimize(
+            cons(lambdaexpr.make_lambda(binding.binding_variables(expr),
+                                        binding.binding_body(expr)),
+                 binding.binding_values(expr)),
+            bound)
+
+    def _optimize_lambda(self, expr, bound, caller=None):
+        # calls are inlined only into the body of the procedure being
+        # defined (and the lambdas it applies right away): closures
+        # made by it would escape deoptimization
+        params = lambdaexpr.lambda_parameters(expr)
+        body = lambdaexpr.lambda_body(expr)
+        names, rest = lambdaexpr.parameter_names(params)
+        bound = bound.union(names, [rest] if rest else [],
+                            scan_out_defines(body))
+
+        outer_caller, self._caller = self._caller, caller
+        try:
+            body = self._optimize_sequence(body, bound)
+        finally:
+            self._caller = outer_caller
+        return lambdaexpr.make_lambda(params, body)
+
+    def _optimize_operands(self, expr, bound):
+        # begin, and, or
+        return cons(procedure.operator(expr),
+                    self._optimize_sequence(procedure.operands(expr), bound))
+
+    def _optimize_application(self, expr, bound):
+        operator = procedure.operator(expr)
+        if lambdaexpr.is_lambda(operator):
+            operator = self._optimize_lambda(operator, bound, self._caller)
+        else:
+            operator = self._optimize(operator, bound)
+        operands = pair_to_list(
+            self._optimize_sequence(procedure.operands(expr), bound))
+
+        if self._caller is not None:
+            body = self._inline(operator, operands, bound)
+            if body is not None:
+                return body
+
+        proc = self._pure_primitive(operator, bound)
+        if proc is not None and all(self._is_constant(operand)
+                                    for operand in operands):
+            try:
+                value = proc.apply(tuple(self._constant_value(operand)
+                                         for operand in operands))
+            except Exception:
+                # leave the error to run time
+                pass
+            else:
+                self.folded += 1
+                if self._caller is not None:
+                    # redefining the primitive deoptimizes the caller
+                    self.dependents.setdefault(
+                        operator.name, set()).add(self._caller)
+                return value
+
+        return cons(operator, tolist(*operands))
+
+    def _pure_primitive(self, operator, bound):
+        if not variable.is_variable(operator):
+            return None
+
+        name = operator.name
+        func = PURE_PRIMITIVES.get(name)
+        if func is None or name in bound or name in self.rebound:
+            return None
+
+        value = self.env.load(operator)
+        if (value is None or not procedure.is_primitive_procedure(value) or
+            procedure.primitive_implementation(value) not in
+            (func, builtin.UNBOXED_PROCEDURES.get(name, func))):
+            return None
+
+        return value
+
+    ##########################################################
+    # Inlining
+    ##########################################################
+    def _record_inlinable(self, name, expr):
+        params, rest = lambdaexpr.parameter_names(
+            lambdaexpr.lambda_parameters(expr))
+        body = lambdaexpr.lambda_body(expr)
+        if (name in self.assigned or rest is not None or
+            len(pair_to_list(body)) != 1):
+            return
+
+        free = set()
+        if self._inline_size(car(body), name, params, free) is None:
+            return
+        self.inlinable[name] = (params, body, free)
+
+    def _record_alias(self, name, target):
+        # (define table-of first): same procedure, same body
+        if name not in self.assigned and target in self.inlinable:
+            self.inlinable[name] = self.inlinable[target]
+            self.dependents.setdefault(target, set()).add(name)
+
+    def _inline_size(self, expr, name, params, free):
+        """Return the size of an inlinable `expr`, None if it is not."""
+        if variable.is_variable(expr):
+            if expr.name == name:
+                # recursive
+                return None
+            if expr.name not in params:
+                free.add(expr.name)
+            return 1
+
+        if not procedure.is_application(expr):
+            return 1
+
+        head = procedure.operator(expr)
+        exprs = pair_to_list(expr)
+        if variable.is_variable(head) and (head.name in self.transforms or
+                                           head.name in self.special_forms):
+            if head.name not in INLINE_FORMS:
+                return None
+            if head.name == 'quote':
+                return 1
+            exprs = exprs[1:]
+
+        size = 0
+        for e in exprs:
+            e_size = self._inline_size(e, name, params, free)
+            if e_size is None:
+                return None
+            size += e_size
+            if size > INLINE_SIZE_LIMIT:
+                return None
+        return size
+
+    def _inline(self, operator, operands, bound):
+        if not variable.is_variable(operator) or operator.name in bound:
+            return None
+
+        candidate = self.inlinable.get(operator.name)
+        if candidate is None:
+            return None
+
+        params, body, free = candidate
+        proc = self.env.load(operator)
+        if (proc is None or not procedure.is_compound_procedure(proc) or
+            procedure.procedure_body(proc) is not body or
+            len(operands) != len(params) or free & bound):
+            return None
+
+        # an operand that is not a constant or a variable has to be
+        # evaluated exactly once and in the same order as before
+        occurrences = []
+        self._occurrences(car(body), params, True, occurrences)
+        evaluated = [param for param, operand in zip(params, operands)
+                     if not self._is_trivial(operand)]
+        for param in evaluated:
+            if [strict for name, strict in occurrences
+                if name == param] != [True]:
+                return None
+        if [name for name, _ in occurrences if name in evaluated] != evaluated:
+            return None
+
+        self.inlined += 1
+        self.dependents.setdefault(operator.name, set()).add(self._caller)
+        if self._substitutable(params, operands, occurrences):
+            return self._substitute(car(body), dict(zip(params, operands)))
+
+        # a call in the body could change what the operands evaluate
+        # to: bind them once before the body, like the call did
+        mapping = dict((param, operand)
+                       for param, operand in zip(params, operands)
+                       if self._is_constant(operand))
+        bound_params = [param for param in params if param not in mapping]
+        return cons(
+            lambdaexpr.make_lambda(
+                tolist(*[Symbol(param) for param in bound_params]),
+                tolist(self._substitute(car(body), mapping))),
+            tolist(*[operand for param, operand in zip(params, operands)
+                     if param in bound_params]))
+
+    def _substitutable(self, params, operands, occurrences):
+        """Return True if no operand can see a side effect of the body.
+
+        A call in the body may have side effects, so only constants
+        can be substituted after one; a variable can not be
+        substituted after another operand has been evaluated either.
+        """
+        operand_of = dict(zip(params, operands))
+        called = evaluated = False
+        for name, _ in occurrences:
+            if name is None:
+                called = True
+            elif self._is_constant(operand_of[name]):
+                continue
+            elif variable.is_variable(operand_of[name]):
+                if called or evaluated:
+                    return False
+            elif called:
+                return False
+            else:
+                evaluated = True
+        return True
+
+    def _is_trivial(self, expr):
+        return self._is_constant(expr) or variable.is_variable(expr)
+
+    def _occurrences(self, expr, names, strict, result):
+        # collect (name, strict) for every reference to `names` in
+        # evaluation order, strict meaning it is always evaluated,
+        # and (None, strict) for every call once it is made
+        if variable.is_variable(expr):
+            if expr.name in names:
+                result.append((expr.name, strict))
+            return
+
+        if not procedure.is_application(expr) or quote.is_quoted(expr):
+            return
+
+        head = procedure.operator(expr)
+        operands = pair_to_list(procedure.operands(expr))
+        form = variable.is_variable(head) and head.name
+        if form == 'if':
+            self._occurrences(operands[0], names, strict, result)
+            for e in operands[1:]:
+                self._occurrences(e, names, False, result)
+        elif form in ('and', 'or'):
+            for index, e in enumerate(operands):
+                self._occurrences(e, names, strict and index == 0, result)
+        elif form == 'begin':
+            for e in operands:
+                self._occurrences(e, names, strict, result)
+        else:
+            for e in pair_to_list(expr):
+                self._occurrences(e, names, strict, result)
+            result.append((None, strict))
+
+    def _substitute(self, expr, mapping):
+        if variable.is_variable(expr):
+            return mapping.get(expr.name, expr)
+
+        if not procedure.is_application(expr) or quote.is_quoted(expr):
+            return expr
+
+        head = procedure.operator(expr)
+        if variable.is_variable(head) and head.name in INLINE_FORMS:
+            operands = pair_to_list(procedure.operands(expr))
+            return cons(head, tolist(*[self._substitute(e, mapping)
+                                       for e in operands]))
+        return tolist(*[self._substitute(e, mapping)
+                        for e in pair_to_list(expr)])
+
+    # transformations keyed by the name of the head symbol
+    transforms = {
+        'quote': _optimize_quoted,
+        'define': _optimize_definition,
+        'define-record-type': _optimize_record_definition,
+        'begin': _optimize_operands,
+        'let': _optimize_binding,
+        'set!': _optimize_assignment,
+        'if': _optimize_if,
+        'cond': _optimize_cond,
+        'and': _optimize_operands,
+        'or': _optimize_operands,
+        'lambda': _optimize_lambda,
+        }
@@ -28,13 +28,14 @@ import itertools
 
 from serval import tokens
 from serval.model import (
-    Number, Boolean, Character, String, Symbol, Pair, EmptyList)
+    Number, TRUE, FALSE, Character, String, Symbol, Pair, EmptyList, Vector)
 
 # datum: simple_datum | compound_datum
 # simple_datum: boolean | number | character | string | symbol
 # symbol: identifier
-# compound_datum: list
+# compound_datum: list | vector
 # list: ( datum *) | ( datum + . datum ) | abbreviation
+# vector: #( datum * )
 # abbreviation: abbrev_prefix datum
 # abbrev_prefix: '
 
@@ -70,6 +71,9 @@ class Parser(object):
         if self._lookahead_type(0) in (tokens.LPAREN, tokens.QUOTE):
             return self._list()
 
+        if self._lookahead_type(0) == tokens.VECTOR:
+            return self._vector()
+
         return self._simple_datum()
 
     def _simple_datum(self):
@@ -79,7 +83,7 @@ class Parser(object):
             expr = Number(int(token.text))
 
         elif token.type == tokens.BOOLEAN:
-            expr = Boolean(True if token.text == '#t' else False)
+            expr = TRUE if token.text == '#t' else FALSE
 
         elif token.type == tokens.CHARACTER:
             expr = Character(token.text[2:])
@@ -99,10 +103,7 @@ class Parser(object):
     def _abbreviation(self):
         self._match(tokens.QUOTE)
 
-        if self._lookahead_type(0) == tokens.LPAREN:
-            expr = self._list()
-        else:
-            expr = self._simple_datum()
+        expr = self._datum()
 
         return Pair(Symbol('quote'), Pair(expr, EmptyList))
 
@@ -149,6 +150,16 @@ class Parser(object):
 
         return tail
 
+    def _vector(self):
+        self._match(tokens.VECTOR)
+
+        items = []
+        while self._lookahead_type(0) != tokens.RPAREN:
+            items.append(self._datum())
+
+        self._match(tokens.RPAREN)
+        return Vector(items)
+
     ##########################################################
     # Parser helper methods
     ##########################################################
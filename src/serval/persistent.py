@@ -0,0 +1,388 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import operator
+
+BITS = 5
+WIDTH = 1 << BITS
+MASK = WIDTH - 1
+
+# hashes are cut down to 32 bits, so a trie is at most 7 levels deep
+HASH_MASK = 0xffffffff
+
+
+##########################################################
+# Vector
+##########################################################
+class PersistentVector(object):
+    """Persistent vector of `count` elements.
+
+    A radix-balanced trie as in Clojure: the elements are in 32-wide
+    leaves of `root`, a tree of Python lists `shift` / BITS levels
+    high, except for the last (up to 32) ones kept in `tail`. Updates
+    return a new vector that shares all but the copied path with the
+    old one.
+    """
+
+    __slots__ = ('count', 'shift', 'root', 'tail')
+
+    def __init__(self, count=0, shift=BITS, root=None, tail=None):
+        self.count = count
+        self.shift = shift
+        self.root = [] if root is None else root
+        self.tail = [] if tail is None else tail
+
+    @classmethod
+    def from_items(cls, items):
+        """Return the vector of the elements of the sequence `items`."""
+        items = list(items)
+        count = len(items)
+        if not count:
+            return cls()
+
+        tail_offset = ((count - 1) >> BITS) << BITS
+        nodes = [items[index:index + WIDTH]
+                 for index in xrange(0, tail_offset, WIDTH)]
+        shift = BITS
+        while len(nodes) > WIDTH:
+            nodes = [nodes[index:index + WIDTH]
+                     for index in xrange(0, len(nodes), WIDTH)]
+            shift += BITS
+
+        return cls(count, shift, nodes, items[tail_offset:])
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        stack = [(self.root, self.shift)]
+        while stack:
+            node, level = stack.pop()
+            if level == 0:
+                for item in node:
+                    yield item
+            else:
+                stack.extend((child, level - BITS)
+                             for child in reversed(node))
+        for item in self.tail:
+            yield item
+
+    def __str__(self):
+        return '#<persistent-vector %d>' % self.count
+
+    def __nonzero__(self):
+        return True
+
+    def _tail_offset(self):
+        return self.count - len(self.tail)
+
+    def _check_index(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError('Index out of range - %s' % index)
+
+    def get(self, index):
+        self._check_index(index)
+        offset = self._tail_offset()
+        if index >= offset:
+            return self.tail[index - offset]
+
+        node = self.root
+        level = self.shift
+        while level > 0:
+            node = node[(index >> level) & MASK]
+            level -= BITS
+        return node[index & MASK]
+
+    def set(self, index, value):
+        """Return a copy of the vector with `value` at `index`."""
+        self._check_index(index)
+        offset = self._tail_offset()
+        if index >= offset:
+            tail = list(self.tail)
+            tail[index - offset] = value
+            return PersistentVector(self.count, self.shift, self.root, tail)
+
+        root = node = list(self.root)
+        level = self.shift
+        while level > 0:
+            slot = (index >> level) & MASK
+            child = node[slot] = list(node[slot])
+            node = child
+            level -= BITS
+        node[index & MASK] = value
+        return PersistentVector(self.count, self.shift, root, self.tail)
+
+    def append(self, value):
+        """Return a copy of the vector with `value` added at the end."""
+        if len(self.tail) < WIDTH:
+            return PersistentVector(self.count + 1, self.shift, self.root,
+                                    self.tail + [value])
+
+        # the tail is full, it goes into the tree as a leaf
+        shift = self.shift
+        if (self.count >> BITS) > (1 << shift):
+            root = [self.root, _new_path(shift, self.tail)]
+            shift += BITS
+        else:
+            root = self._push_tail(shift, self.root, self.tail)
+        return PersistentVector(self.count + 1, shift, root, [value])
+
+    def _push_tail(self, level, parent, leaf):
+        slot = ((self.count - 1) >> level) & MASK
+        node = list(parent)
+        if level == BITS:
+            child = leaf
+        elif slot < len(parent):
+            child = self._push_tail(level - BITS, parent[slot], leaf)
+        else:
+            child = _new_path(level - BITS, leaf)
+
+        if slot < len(node):
+            node[slot] = child
+        else:
+            node.append(child)
+        return node
+
+
+def _new_path(level, leaf):
+    node = leaf
+    while level > 0:
+        node = [node]
+        level -= BITS
+    return node
+
+
+##########################################################
+# Map
+##########################################################
+class _BitmapNode(object):
+    """Trie node, `entries` holds a (hash, key, value) leaf or a child
+    node for every bit set in `bitmap`, in bit order.
+    """
+
+    __slots__ = ('bitmap', 'entries')
+
+    def __init__(self, bitmap, entries):
+        self.bitmap = bitmap
+        self.entries = entries
+
+
+class _CollisionNode(object):
+    """The (hash, key, value) leaves of keys with the same `hash`."""
+
+    __slots__ = ('hash', 'entries')
+
+    def __init__(self, hash, entries):
+        self.hash = hash
+        self.entries = entries
+
+
+def _popcount(bits):
+    return bin(bits).count('1')
+
+
+class PersistentMap(object):
+    """Persistent map from keys to values.
+
+    A hash array mapped trie (Bagwell): every node keeps a bitmap of
+    the 5-bit hash slices in use and a compact list of entries, and
+    updates copy only the path to the changed entry. Keys are hashed
+    with `hash` and compared with `equal`.
+    """
+
+    __slots__ = ('count', 'root', 'hash', 'equal')
+
+    def __init__(self, hash=hash, equal=operator.eq, count=0, root=None):
+        self.count = count
+        self.root = _BitmapNode(0, []) if root is None else root
+        self.hash = hash
+        self.equal = equal
+
+    @classmethod
+    def from_items(cls, items, hash=hash, equal=operator.eq):
+        """Return the map of the (key, value) pairs in `items`."""
+        result = cls(hash, equal)
+        for key, value in items:
+            result = result.set(key, value)
+        return result
+
+    def __len__(self):
+        return self.count
+
+    def items(self):
+        """Yield the (key, value) pairs of the map."""
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            for entry in node.entries:
+                if entry.__class__ is tuple:
+                    yield entry[1], entry[2]
+                else:
+                    stack.append(entry)
+
+    def __str__(self):
+        return '#<persistent-map %d>' % self.count
+
+    def __nonzero__(self):
+        return True
+
+    def get(self, key, default=None):
+        code = self.hash(key) & HASH_MASK
+        equal = self.equal
+        node = self.root
+        shift = 0
+        while True:
+            if node.__class__ is _CollisionNode:
+                for entry in node.entries:
+                    if equal(entry[1], key):
+                        return entry[2]
+                return default
+
+            bit = 1 << ((code >> shift) & MASK)
+            if not node.bitmap & bit:
+                return default
+            entry = node.entries[_popcount(node.bitmap & (bit - 1))]
+            if entry.__class__ is tuple:
+                if entry[0] == code and equal(entry[1], key):
+                    return entry[2]
+                return default
+            node = entry
+            shift += BITS
+
+    def set(self, key, value):
+        """Return a copy of the map with `key` mapped to `value`."""
+        leaf = (self.hash(key) & HASH_MASK, key, value)
+        root, added = self._assoc(self.root, 0, leaf)
+        if root is self.root:
+            return self
+        return PersistentMap(self.hash, self.equal,
+                             self.count + added, root)
+
+    def delete(self, key):
+        """Return a copy of the map without `key`."""
+        root = self._without(self.root, 0, self.hash(key) & HASH_MASK, key)
+        if root is self.root:
+            return self
+        if root is None:
+            root = _BitmapNode(0, [])
+        return PersistentMap(self.hash, self.equal, self.count - 1, root)
+
+    def _assoc(self, node, shift, leaf):
+        """Return the node with `leaf` added and whether it is new."""
+        code, key = leaf[0], leaf[1]
+
+        if node.__class__ is _CollisionNode:
+            if node.hash != code:
+                # move the collision node down into a bitmap node
+                bit = 1 << ((node.hash >> shift) & MASK)
+                return self._assoc(_BitmapNode(bit, [node]), shift, leaf)
+            entries = list(node.entries)
+            for index, entry in enumerate(entries):
+                if self.equal(entry[1], key):
+                    entries[index] = leaf
+                    return _CollisionNode(code, entries), False
+            entries.append(leaf)
+            return _CollisionNode(code, entries), True
+
+        bit = 1 << ((code >> shift) & MASK)
+        index = _popcount(node.bitmap & (bit - 1))
+        entries = list(node.entries)
+        if not node.bitmap & bit:
+            entries.insert(index, leaf)
+            return _BitmapNode(node.bitmap | bit, entries), True
+
+        entry = entries[index]
+        if entry.__class__ is tuple:
+            if entry[0] == code and self.equal(entry[1], key):
+                if entry[2] is leaf[2]:
+                    return node, False
+                entries[index] = leaf
+                return _BitmapNode(node.bitmap, entries), False
+            entries[index] = self._merge(shift + BITS, entry, leaf)
+            return _BitmapNode(node.bitmap, entries), True
+
+        child, added = self._assoc(entry, shift + BITS, leaf)
+        if child is entry:
+            return node, False
+        entries[index] = child
+        return _BitmapNode(node.bitmap, entries), added
+
+    def _merge(self, shift, first, second):
+        """Return a node holding the leaves `first` and `second`."""
+        if first[0] == second[0]:
+            return _CollisionNode(first[0], [first, second])
+
+        first_slot = (first[0] >> shift) & MASK
+        second_slot = (second[0] >> shift) & MASK
+        if first_slot == second_slot:
+            return _BitmapNode(1 << first_slot,
+                               [self._merge(shift + BITS, first, second)])
+        entries = [first, second] if first_slot < second_slot \
+            else [second, first]
+        return _BitmapNode((1 << first_slot) | (1 << second_slot), entries)
+
+    def _without(self, node, shift, code, key):
+        """Return the node without `key`: the same node if the key is
+        not there, None if nothing is left and a single leaf if only
+        that is left of a node below the root.
+        """
+        if node.__class__ is _CollisionNode:
+            entries = [entry for entry in node.entries
+                       if not self.equal(entry[1], key)]
+            if len(entries) == len(node.entries):
+                return node
+            if len(entries) == 1:
+                return entries[0]
+            return _CollisionNode(node.hash, entries)
+
+        bit = 1 << ((code >> shift) & MASK)
+        if not node.bitmap & bit:
+            return node
+        index = _popcount(node.bitmap & (bit - 1))
+        entry = node.entries[index]
+
+        if entry.__class__ is tuple:
+            if entry[0] != code or not self.equal(entry[1], key):
+                return node
+            child = None
+        else:
+            child = self._without(entry, shift + BITS, code, key)
+            if child is entry:
+                return node
+
+        entries = list(node.entries)
+        bitmap = node.bitmap
+        if child is None:
+            del entries[index]
+            bitmap &= ~bit
+            if not entries:
+                return None
+        else:
+            entries[index] = child
+
+        if shift and len(entries) == 1 and entries[0].__class__ is tuple:
+            return entries[0]
+        return _BitmapNode(bitmap, entries)
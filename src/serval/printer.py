@@ -0,0 +1,106 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+from cStringIO import StringIO
+
+from serval.model import Pair, EmptyList, Vector
+
+# pieces of output collected before they are written out
+CHUNK_SIZE = 4096
+
+# entries of the writer's stack: an object to write, the rest of a
+# list whose opening parenthesis and first elements are written, or
+# the elements of a vector from an index on
+_OBJECT, _REST, _ITEMS = range(3)
+
+
+def write(obj, out, depth=None, length=None):
+    """Write the external representation of `obj` to the file-like `out`.
+
+    Lists are walked with an explicit stack, so neither long nor deeply
+    nested lists run into the recursion limit, and the output goes out
+    in chunks. Lists and vectors nested deeper than `depth` are written
+    as `...`, and so are their elements after the first `length`.
+    """
+    chunk = []
+    stack = [(_OBJECT, obj, 0)]
+    while stack:
+        entry = stack.pop()
+
+        if entry[0] == _OBJECT:
+            obj, level = entry[1], entry[2]
+            if obj.__class__ is not Pair and obj.__class__ is not Vector:
+                chunk.append(str(obj))
+            elif depth is not None and level >= depth:
+                chunk.append('...')
+            elif obj.__class__ is Vector:
+                chunk.append('#(')
+                stack.append((_ITEMS, obj.items, level, 0))
+            elif length == 0:
+                chunk.append('(...)')
+            else:
+                chunk.append('(')
+                stack.append((_REST, obj.tail, level, 1))
+                stack.append((_OBJECT, obj.head, level + 1))
+
+        elif entry[0] == _ITEMS:
+            items, level, index = entry[1], entry[2], entry[3]
+            if index == len(items):
+                chunk.append(')')
+            elif length is not None and index >= length:
+                chunk.append('...)' if index == 0 else ' ...)')
+            else:
+                if index:
+                    chunk.append(' ')
+                stack.append((_ITEMS, items, level, index + 1))
+                stack.append((_OBJECT, items[index], level + 1))
+
+        else:
+            # `count` elements of the list written so far
+            tail, level, count = entry[1], entry[2], entry[3]
+            if tail is EmptyList:
+                chunk.append(')')
+            elif tail.__class__ is not Pair:
+                chunk.append(' . %s)' % tail)
+            elif length is not None and count >= length:
+                chunk.append(' ...)')
+            else:
+                chunk.append(' ')
+                stack.append((_REST, tail.tail, level, count + 1))
+                stack.append((_OBJECT, tail.head, level + 1))
+
+        if len(chunk) >= CHUNK_SIZE:
+            out.write(''.join(chunk))
+            chunk = []
+
+    out.write(''.join(chunk))
+
+
+def to_string(obj, depth=None, length=None):
+    """Return the external representation of `obj` as a string."""
+    out = StringIO()
+    write(obj, out, depth, length)
+    return out.getvalue()
@@ -24,35 +24,37 @@
 
 __author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
 
+from serval.model import Symbol
 from serval.expression.procedure import (primitive_procedure_names,
                                          primitive_procedure_values)
-from serval.expression.util import pair_to_list
+from serval.expression import definition, sequence, record
+from serval.expression.util import tolist, pair_to_list
 
 
 class Environment(object):
 
+    __slots__ = ('parent', 'bindings')
+
     def __init__(self, parent=None, bindings=None):
         self.parent = parent
         self.bindings = dict() if bindings is None else bindings
 
     def define_variable(self, symbol, val):
-        self.bindings[symbol.name] = val
+        self.bindings[symbol] = val
 
     def set_variable_value(self, symbol, val):
-        name = symbol.name
-        if name in self.bindings:
-            self.bindings[name] = val
+        if symbol in self.bindings:
+            self.bindings[symbol] = val
 
         elif self.parent is not None:
             self.parent.set_variable_value(symbol, val)
 
         else:
-            raise NameError('Unbound variable - SET! %s' % name)
+            raise NameError('Unbound variable - SET! %s' % symbol)
 
     def load(self, symbol):
-        name = symbol.name
-        if name in self.bindings:
-            return self.bindings[name]
+        if symbol in self.bindings:
+            return self.bindings[symbol]
 
         if self.parent is not None:
             return self.parent.load(symbol)
@@ -60,12 +62,60 @@ class Environment(object):
         return None
 
 
-def setup_environment():
+class Cell(object):
+    """Mutable box holding the value of a global variable."""
+
+    __slots__ = ('symbol', 'value')
+
+    def __init__(self, symbol, value=None):
+        self.symbol = symbol
+        self.value = value
+
+    def __str__(self):
+        return self.symbol.name
+
+
+class GlobalEnvironment(Environment):
+    """The outermost environment.
+
+    Besides the bindings dict every global variable can have a cell
+    that always holds its current value (None while unbound). Code
+    that resolves its free variables ahead of time links to the cell
+    once and then reads it without any lookup.
+    """
+
+    __slots__ = ('cells',)
+
+    def __init__(self, bindings=None):
+        super(GlobalEnvironment, self).__init__(bindings=bindings)
+        self.cells = {}
+
+    def cell(self, symbol):
+        """Return the cell of the global variable `symbol`."""
+        cell = self.cells.get(symbol)
+        if cell is None:
+            cell = self.cells[symbol] = Cell(symbol, self.bindings.get(symbol))
+        return cell
+
+    def define_variable(self, symbol, val):
+        self.bindings[symbol] = val
+        cell = self.cells.get(symbol)
+        if cell is not None:
+            cell.value = val
+
+    def set_variable_value(self, symbol, val):
+        if symbol not in self.bindings:
+            raise NameError('Unbound variable - SET! %s' % symbol)
+        self.define_variable(symbol, val)
+
+
+def setup_environment(unboxed=False):
     bindings = dict(
-        zip(primitive_procedure_names(), primitive_procedure_values())
+        zip([Symbol(name) for name in primitive_procedure_names()],
+            primitive_procedure_values(unboxed))
         )
 
-    return Environment(bindings=bindings)
+    return GlobalEnvironment(bindings=bindings)
 
 def define_variable(var, val, env):
     env.define_variable(var, val)
@@ -77,8 +127,83 @@ def lookup_variable_value(var, env):
     return val
 
 def extend_environment(variables, values, env):
-    bindings = dict(zip([var.name for var in pair_to_list(variables)],
-                        pair_to_list(values)))
+    bindings = dict(zip(pair_to_list(variables), pair_to_list(values)))
 
     env = Environment(parent=env, bindings=bindings)
     return env
+
+def extend_procedure_environment(proc, args):
+    """Return the environment of a call of `proc` with the tuple `args`.
+
+    The list bound to a rest parameter is the only thing consed.
+    """
+    arity = proc.arity
+    if len(args) != arity and (proc.rest is None or len(args) < arity):
+        raise ValueError('Wrong number of arguments - APPLY %s' % proc)
+
+    bindings = dict(zip(proc.params, args))
+    if proc.rest is not None:
+        bindings[proc.rest] = tolist(*args[arity:])
+    return Environment(proc.env, bindings)
+
+
+#################################
+# Lexical addressing (SICP 5.5.6)
+#################################
+# Procedure calls of the analyzer and the virtual machine run in
+# frames: lists holding the enclosing frame in slot 0 followed by the
+# arguments and the internal definitions. Locals are found by a
+# (depth, index) lexical address computed from a compile-time
+# environment; the outermost frame links to the global Environment.
+
+class CompileTimeEnvironment(object):
+    """Names of the frames enclosing an expression."""
+
+    def __init__(self, names, parent=None):
+        self.names = list(names)
+        self.parent = parent
+
+    def add(self, name):
+        """Add a slot for an internal definition."""
+        if name not in self.names:
+            self.names.append(name)
+
+    @property
+    def frame_size(self):
+        return len(self.names) + 1
+
+    def find_variable(self, name):
+        """Return the lexical address of `name`, None for a global."""
+        depth, cenv = 0, self
+        while cenv is not None:
+            if name in cenv.names:
+                return depth, cenv.names.index(name) + 1
+            depth, cenv = depth + 1, cenv.parent
+        return None
+
+
+def scan_out_defines(body):
+    """Return names defined at the top of a procedure body."""
+    names = []
+    for expr in pair_to_list(body):
+        if definition.is_definition(expr):
+            names.append(definition.definition_variable(expr).name)
+        elif sequence.is_begin(expr):
+            names.extend(scan_out_defines(sequence.begin_actions(expr)))
+        elif record.is_record_definition(expr):
+            names.extend(record.record_definition_names(expr))
+    return names
+
+def lexical_address_lookup(address, frame):
+    depth, index = address
+    while depth:
+        frame = frame[0]
+        depth -= 1
+    return frame[index]
+
+def lexical_address_set(address, frame, val):
+    depth, index = address
+    while depth:
+        frame = frame[0]
+        depth -= 1
+    frame[index] = val
@@ -0,0 +1,255 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+from serval.tests import test_interpreter, test_the_little_schemer
+
+ANALYZE = dict(analyze=True)
+
+
+class AnalyzerRepresentationTestCase(
+    test_interpreter.InterpreterRepresentationTestCase):
+    interpreter_options = ANALYZE
+
+
+class AnalyzerIFSpecialFormTestCase(test_interpreter.IFSpecialFormTestCase):
+    interpreter_options = ANALYZE
+
+
+class AnalyzerUnspecifiedValueTestCase(
+    test_interpreter.UnspecifiedValueTestCase):
+    interpreter_options = ANALYZE
+
+
+class AnalyzerCONDDerivedFormTestCase(
+    test_interpreter.CONDDerivedFormTestCase):
+    interpreter_options = ANALYZE
+
+
+class AnalyzerANDSpecialFormTestCase(
+    test_interpreter.ANDSpecialFormTestCase):
+    interpreter_options = ANALYZE
+
+
+class AnalyzerORSpecialFormTestCase(test_interpreter.ORSpecialFormTestCase):
+    interpreter_options = ANALYZE
+
+
+class AnalyzerAssignmentTestCase(test_interpreter.AssignmentTestCase):
+    interpreter_options = ANALYZE
+
+
+class AnalyzerBindingTestCase(test_interpreter.BindingTestCase):
+    interpreter_options = ANALYZE
+
+
+class AnalyzerRecordDefinitionTestCase(
+    test_interpreter.RecordDefinitionTestCase):
+    interpreter_options = ANALYZE
+
+
+class AnalyzerSequencingTestCase(test_interpreter.SequencingTestCase):
+    interpreter_options = ANALYZE
+
+
+class AnalyzerDefinitionTestCase(test_interpreter.DefinitionTestCase):
+    interpreter_options = ANALYZE
+
+
+class AnalyzerEnvironmentLookupTestCase(
+    test_interpreter.EnvironmentLookupTestCase):
+    interpreter_options = ANALYZE
+
+
+class AnalyzerProcedureApplicationTestCase(
+    test_interpreter.ProcedureApplicationTestCase):
+    interpreter_options = ANALYZE
+
+
+class AnalyzerProperTailCallTestCase(
+    test_interpreter.ProperTailCallTestCase):
+    interpreter_options = ANALYZE
+
+
+class AnalyzerBuiltinTestCase(test_interpreter.BuiltinTestCase):
+    interpreter_options = ANALYZE
+
+
+class AnalyzerLittleSchemerEvaluatorTestCase(
+    test_the_little_schemer.LittleSchemerEvaluatorTestCase):
+    interpreter_options = ANALYZE
+
+
+class AnalyzedBodyCacheTestCase(test_interpreter.BaseTestCase):
+
+    interpreter_options = ANALYZE
+
+    def _procedures(self):
+        from serval.lexer import Lexer
+        from serval.parser import Parser
+
+        interpreter = self._make_interpreter()
+        self._interpret(
+            """
+            (define (make-adder n)
+              (lambda (x) (+ x n)))
+            (define add1 (make-adder 1))
+            (define add2 (make-adder 2))
+            """, interpreter=interpreter)
+        return [interpreter.interpret(expr)
+                for expr in Parser(Lexer('add1 add2')).parse()]
+
+    def test_procedure_keeps_analyzed_body(self):
+        from serval.expression.procedure import procedure_analyzed_body
+
+        add1, _ = self._procedures()
+        self.assertTrue(callable(procedure_analyzed_body(add1)))
+
+    def test_lambda_is_analyzed_once(self):
+        from serval.expression.procedure import procedure_analyzed_body
+
+        add1, add2 = self._procedures()
+        self.assertTrue(
+            procedure_analyzed_body(add1) is procedure_analyzed_body(add2))
+
+    def test_tree_walker_procedure_has_no_analyzed_body(self):
+        from serval.interpreter import Interpreter
+        from serval.lexer import Lexer
+        from serval.parser import Parser
+        from serval.expression.procedure import procedure_analyzed_body
+
+        interpreter = Interpreter()
+        proc = interpreter.interpret(
+            Parser(Lexer('(lambda (x) x)')).parse()[0])
+        self.assertTrue(procedure_analyzed_body(proc) is None)
+
+    def test_procedure_parameters(self):
+        from serval.model import Symbol
+
+        add1, _ = self._procedures()
+        self.assertEquals(add1.params, (Symbol('x'),))
+        self.assertEquals(add1.arity, 1)
+        self.assertEquals(str(add1.parameters), '(x)')
+
+
+class LexicalAddressingTestCase(test_interpreter.BaseTestCase):
+
+    interpreter_options = ANALYZE
+
+    def test_procedure_environment_is_a_frame(self):
+        from serval.lexer import Lexer
+        from serval.parser import Parser
+        from serval.expression.procedure import procedure_environment
+
+        interpreter = self._make_interpreter()
+        exprs = Parser(Lexer('((lambda (x) (lambda (y) x)) 1)')).parse()
+        frame = procedure_environment(interpreter.interpret(exprs[0]))
+        self.assertTrue(frame[0] is interpreter.env)
+        self.assertEquals(str(frame[1]), '1')
+
+    def test_nested_frames(self):
+        result = self._interpret(
+            """
+            (define (f a)
+              (lambda (b)
+                (lambda (c)
+                  (set! a (+ a 1))
+                  (list a b c))))
+            (((f 1) 2) 3)
+            """)
+        self.assertEquals(result, '(2 2 3)')
+
+    def test_internal_definitions(self):
+        result = self._interpret(
+            """
+            (define (parity n)
+              (define (ev? n) (if (= n 0) #t (od? (- n 1))))
+              (define (od? n) (if (= n 0) #f (ev? (- n 1))))
+              (if (ev? n) 'even 'odd))
+            (list (parity 10) (parity 7))
+            """)
+        self.assertEquals(result, '(even odd)')
+
+    def test_global_shadowed_by_local(self):
+        result = self._interpret(
+            """
+            (define x 'global)
+            (define (f x) (lambda () x))
+            (list ((f 'local)) x)
+            """)
+        self.assertEquals(result, '(local global)')
+
+    def test_set_global_from_procedure(self):
+        result = self._interpret(
+            """
+            (define counter 0)
+            (define (tick) (lambda () (set! counter (+ counter 1))))
+            ((tick))
+            ((tick))
+            counter
+            """)
+        self.assertEquals(result, '2')
+
+    def test_unassigned_internal_definition(self):
+        self.assertRaises(
+            NameError, self._interpret,
+            '((lambda () (define a b) (define b 1) a))')
+
+    def test_wrong_number_of_arguments(self):
+        self.assertRaises(ValueError, self._interpret, '((lambda (x) x))')
+
+
+class AnalyzerSpecialFormRegistryTestCase(
+    test_interpreter.SpecialFormRegistryTestCase):
+
+    interpreter_options = ANALYZE
+
+    def setUp(self):
+        from serval.analyzer import Analyzer
+        from serval.model import Symbol
+        from serval.expression.sequence import sequence_exp
+        from serval.expression.util import cadr, cddr
+
+        def analyze_when(analyzer, expr, tail):
+            pproc = analyzer.analyze(cadr(expr))
+            bproc = analyzer.analyze(sequence_exp(cddr(expr)), tail)
+
+            def execute(env):
+                if pproc(env):
+                    return bproc(env)
+                return Symbol('ok')
+
+            return execute
+
+        Analyzer.define_special_form('when', analyze_when)
+
+    def tearDown(self):
+        from serval.analyzer import Analyzer
+        del Analyzer.special_forms['when']
+
+    def test_special_form_registry_is_keyed_by_name(self):
+        from serval.analyzer import Analyzer
+        self.assertTrue('when' in Analyzer.special_forms)
+        self.assertTrue('lambda' in Analyzer.special_forms)
@@ -0,0 +1,185 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import os
+import imp
+import shutil
+import tempfile
+import unittest
+
+from serval.tests import test_the_little_schemer
+
+
+def _compile(text):
+    from serval.aot import ModuleCompiler
+
+    module = imp.new_module('compiled')
+    source = ModuleCompiler().compile(text)
+    exec compile(source, '<compiled>', 'exec') in module.__dict__
+    return module
+
+
+def _parse(text):
+    from serval.lexer import Lexer
+    from serval.parser import Parser
+    return Parser(Lexer(text)).parse()
+
+
+class AOTLittleSchemerEvaluatorTestCase(
+    test_the_little_schemer.LittleSchemerEvaluatorTestCase):
+    """The evaluator of Ch. 10 run from a compiled module."""
+
+    def _get_interpreter(self):
+        return _compile(self.TEXT)._runtime.interpreter
+
+
+class LittleSchemerBothWaysTestCase(unittest.TestCase):
+
+    TEXT = test_the_little_schemer.LittleSchemerEvaluatorTestCase.TEXT
+
+    EXPRESSIONS = [
+        '(add1 6)',
+        '(quote (a b c))',
+        '(car (quote (a b c)))',
+        '(cdr (cdr (quote (a b c))))',
+        '(cond ((null? (quote ())) (quote yes)) (else (quote no)))',
+        '((lambda (x y) (cons y (cons x (quote ())))) 1 2)',
+        '((lambda (f) (f (f 3))) (lambda (n) (add1 n)))',
+        ]
+
+    def test_value(self):
+        from serval.interpreter import Interpreter
+
+        interpreter = Interpreter()
+        for expr in _parse(self.TEXT):
+            interpreter.interpret(expr)
+        module = _compile(self.TEXT)
+
+        for text in self.EXPRESSIONS:
+            expected = interpreter.interpret(
+                _parse("(value '%s)" % text)[0])
+            self.assertEquals(str(module.value(_parse(text)[0])),
+                              str(expected))
+
+    def test_procedures_are_native(self):
+        module = _compile(self.TEXT)
+        for name in ('value', 'meaning', 'evcon', 'apply-closure'):
+            proc = module._runtime.env.load(_parse(name)[0])
+            self.assertTrue(proc.native is not None, name)
+
+
+class ModuleCompilerTestCase(unittest.TestCase):
+
+    def test_exports(self):
+        module = _compile("""
+        (define x 5)
+        (define (atom? x) (not (pair? x)))
+        (define first car)
+        """)
+        from serval.model import Number, Symbol
+        from serval.expression.util import tolist
+
+        self.assertEquals(str(module.x), '5')
+        self.assertEquals(str(module.atom_p(Symbol('a'))), '#t')
+        self.assertEquals(str(module.first(tolist(Number(1)))), '1')
+        self.assertEquals(module.__all__, ['atom_p', 'first', 'x'])
+
+    def test_record_exports(self):
+        module = _compile("""
+        (define-record-type point (make-point x y) point?
+          (x point-x)
+          (y point-y))
+        (define (sum p) (+ (point-x p) (point-y p)))
+        """)
+        from serval.model import Number
+
+        point = module.make_point(Number(1), Number(2))
+        self.assertEquals(str(module.sum(point)), '3')
+        self.assertEquals(str(module.point_p(point)), '#t')
+        self.assertEquals(module.__all__, ['make_point', 'point', 'point_p',
+                                           'point_x', 'point_y', 'sum'])
+
+    def test_one_armed_if(self):
+        module = _compile("""
+        (define (f x) (if x 'yes))
+        (define result (f #f))
+        """)
+        self.assertEquals(str(module.result), '#!unspecific')
+
+    def test_tail_calls(self):
+        module = _compile("""
+        (define (loop n acc)
+          (if (= n 0) acc (loop (- n 1) (+ acc 1))))
+        (define (even? n) (if (= n 0) #t (odd? (- n 1))))
+        (define (odd? n) (if (= n 0) #f (even? (- n 1))))
+        """)
+        from serval.model import Number
+
+        self.assertEquals(str(module.loop(Number(10000), Number(0))),
+                          '10000')
+        self.assertEquals(str(module.even_p(Number(10001))), '#f')
+
+    def test_redefined_primitive(self):
+        module = _compile("""
+        (define (second l) (car (cdr l)))
+        (define (car l) 'mine)
+        (define result (second '(1 2 3)))
+        """)
+        self.assertEquals(str(module.result), 'mine')
+
+    def test_interpreted_fallback(self):
+        from serval.aot import ModuleCompiler
+
+        compiler = ModuleCompiler()
+        compiler.compile("""
+        (define (make-adder n) (lambda (m) (+ n m)))
+        """)
+        self.assertEquals([name for name, _ in compiler.fallbacks],
+                          ['make-adder'])
+
+        module = _compile("""
+        (define (make-adder n) (lambda (m) (+ n m)))
+        (define add2 (make-adder 2))
+        (define result (add2 3))
+        """)
+        self.assertEquals(str(module.result), '5')
+
+    def test_compile_file(self):
+        from serval.aot import compile_file
+
+        tempdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tempdir, 'fib.scm')
+            with open(path, 'w') as f:
+                f.write('(define (fib n) '
+                        '(if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))')
+            compile_file(path)
+
+            module = imp.load_source('fib', os.path.join(tempdir, 'fib.py'))
+            from serval.model import Number
+            self.assertEquals(str(module.fib(Number(15))), '610')
+        finally:
+            shutil.rmtree(tempdir)
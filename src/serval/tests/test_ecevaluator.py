@@ -0,0 +1,208 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+from serval.tests import test_interpreter, test_the_little_schemer
+
+
+class ExplicitControlMixin(object):
+
+    def _make_interpreter(self):
+        from serval.ecevaluator import ExplicitControlEvaluator
+        return ExplicitControlEvaluator()
+
+
+class ECEvalRepresentationTestCase(
+    ExplicitControlMixin, test_interpreter.InterpreterRepresentationTestCase):
+    pass
+
+
+class ECEvalIFSpecialFormTestCase(
+    ExplicitControlMixin, test_interpreter.IFSpecialFormTestCase):
+    pass
+
+
+class ECEvalUnspecifiedValueTestCase(
+    ExplicitControlMixin, test_interpreter.UnspecifiedValueTestCase):
+    pass
+
+
+class ECEvalCONDDerivedFormTestCase(
+    ExplicitControlMixin, test_interpreter.CONDDerivedFormTestCase):
+    pass
+
+
+class ECEvalANDSpecialFormTestCase(
+    ExplicitControlMixin, test_interpreter.ANDSpecialFormTestCase):
+    pass
+
+
+class ECEvalORSpecialFormTestCase(
+    ExplicitControlMixin, test_interpreter.ORSpecialFormTestCase):
+    pass
+
+
+class ECEvalAssignmentTestCase(
+    ExplicitControlMixin, test_interpreter.AssignmentTestCase):
+    pass
+
+
+class ECEvalBindingTestCase(
+    ExplicitControlMixin, test_interpreter.BindingTestCase):
+    pass
+
+
+class ECEvalRecordDefinitionTestCase(
+    ExplicitControlMixin, test_interpreter.RecordDefinitionTestCase):
+    pass
+
+
+class ECEvalSequencingTestCase(
+    ExplicitControlMixin, test_interpreter.SequencingTestCase):
+    pass
+
+
+class ECEvalDefinitionTestCase(
+    ExplicitControlMixin, test_interpreter.DefinitionTestCase):
+    pass
+
+
+class ECEvalEnvironmentLookupTestCase(
+    ExplicitControlMixin, test_interpreter.EnvironmentLookupTestCase):
+    pass
+
+
+class ECEvalProcedureApplicationTestCase(
+    ExplicitControlMixin, test_interpreter.ProcedureApplicationTestCase):
+    pass
+
+
+class ECEvalProperTailCallTestCase(
+    ExplicitControlMixin, test_interpreter.ProperTailCallTestCase):
+
+    def test_tail_loop_million_iterations(self):
+        # the register machine is a model to measure, not a fast
+        # path; check that the stack does not grow with the loop
+        from serval.lexer import Lexer
+        from serval.parser import Parser
+
+        evaluator = self._make_interpreter()
+        self._interpret(
+            """
+            (define (loop n)
+              (if (= n 0) 'done (loop (- n 1))))
+            """, interpreter=evaluator)
+
+        depths = []
+        for count in (10, 1000):
+            expr = Parser(Lexer('(loop %d)' % count)).parse()[0]
+            evaluator.interpret(expr)
+            depths.append(evaluator.statistics()['maximum_depth'])
+
+        self.assertEquals(depths[0], depths[1])
+
+
+class ECEvalBuiltinTestCase(
+    ExplicitControlMixin, test_interpreter.BuiltinTestCase):
+    pass
+
+
+class ECEvalLittleSchemerEvaluatorTestCase(
+    ExplicitControlMixin,
+    test_the_little_schemer.LittleSchemerEvaluatorTestCase):
+    pass
+
+
+class MonitoredStackTestCase(ExplicitControlMixin,
+                             test_interpreter.BaseTestCase):
+
+    FACTORIAL = """
+    (define (factorial n)
+      (if (= n 1)
+        1
+        (* (factorial (- n 1)) n)))
+    """
+
+    def _statistics(self, text, definitions=FACTORIAL):
+        from serval.lexer import Lexer
+        from serval.parser import Parser
+
+        evaluator = self._make_interpreter()
+        self._interpret(definitions, interpreter=evaluator)
+        evaluator.interpret(Parser(Lexer(text)).parse()[0])
+        return evaluator.statistics()
+
+    def test_pushes_and_pops_are_balanced(self):
+        stats = self._statistics('(factorial 5)')
+        self.assertTrue(stats['total_pushes'] > 0)
+        self.assertEquals(stats['total_pushes'], stats['total_pops'])
+
+    def test_recursive_process_grows_the_stack(self):
+        small = self._statistics('(factorial 5)')
+        large = self._statistics('(factorial 10)')
+        self.assertTrue(large['maximum_depth'] > small['maximum_depth'])
+        self.assertTrue(large['total_pushes'] > small['total_pushes'])
+
+    def test_statistics_are_per_evaluation(self):
+        first = self._statistics('(factorial 5)')
+        second = self._statistics('(factorial 5)')
+        self.assertEquals(first, second)
+
+    def test_deep_recursion_is_not_limited_by_python_stack(self):
+        result = self._interpret(
+            """
+            (define (sum n)
+              (if (= n 0)
+                0
+                (+ n (sum (- n 1)))))
+            (sum 20000)
+            """)
+        self.assertEquals(result, '200010000')
+
+
+class DifferentialTestCase(ExplicitControlMixin,
+                           test_interpreter.BaseTestCase):
+    """Both engines give the same answers on the same inputs."""
+
+    PROGRAMS = [
+        "(define (f x) (cond ((< x 0) 'neg) ((> x 0) 'pos) (else 'zero))) "
+        "(list (f -1) (f 1) (f 0))",
+        "(let ((x 2) (y 3)) (let ((x 7) (z (+ x y))) (* z x)))",
+        "(define x 1) (define (g) (set! x (+ x 1)) x) (g) (g)",
+        "(define (compose f g) (lambda (x) (f (g x)))) "
+        "((compose car cdr) '(1 2 3))",
+        "(and 1 (or #f '()) (if #f #f 'x))",
+        "(begin (define a 1) (define b (+ a 1)) (cons a b))",
+        "(define (fib n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2))))) "
+        "(fib 12)",
+        ]
+
+    def test_same_results_as_interpreter(self):
+        from serval.interpreter import Interpreter
+
+        for program in self.PROGRAMS:
+            self.assertEquals(
+                self._interpret(program),
+                self._interpret(program, interpreter=Interpreter()))
@@ -33,15 +33,20 @@ THIS_MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 class BaseTestCase(unittest.TestCase):
 
+    interpreter_options = {}
+
+    def _make_interpreter(self):
+        from serval.interpreter import Interpreter
+        return Interpreter(**self.interpreter_options)
+
     def _interpret(self, text, interpreter=None):
         from serval.lexer import Lexer
         from serval.parser import Parser
-        from serval.interpreter import Interpreter
         from serval.expression.procedure import (
             is_compound_procedure, get_procedure_repr)
 
         if interpreter is None:
-            interpreter = Interpreter()
+            interpreter = self._make_interpreter()
 
         expressions = Parser(Lexer(text)).parse()
         for expr in expressions:
@@ -96,6 +101,14 @@ class InterpreterRepresentationTestCase(BaseTestCase):
         result = self._interpret("'(1 . (2 . 3))")
         self.assertEquals(result, '(1 2 . 3)')
 
+    def test_primitive_procedure_repr(self):
+        result = self._interpret('car')
+        self.assertEquals(result, '#<primitive car>')
+
+    def test_list_tagged_procedure_repr(self):
+        result = self._interpret("'(procedure (x) (x) ())")
+        self.assertEquals(result, '(procedure (x) (x) ())')
+
     def test_pair_with_empty_list_repr(self):
         result = self._interpret("'(1 . (2 . (3 . ())))")
         self.assertEquals(result, '(1 2 3)')
@@ -168,6 +181,38 @@ class IFSpecialFormTestCase(BaseTestCase):
         self.assertEquals(result, '(0)')
 
 
+class UnspecifiedValueTestCase(BaseTestCase):
+    """A one-armed IF with a false test has a value, it is not unbound."""
+
+    def test_one_armed_if(self):
+        self.assertEquals(self._interpret('(if #f #f)'), '#!unspecific')
+
+    def test_unspecified_global(self):
+        result = self._interpret(
+            """
+            (define x (if #f #f))
+            x
+            """)
+        self.assertEquals(result, '#!unspecific')
+
+    def test_unspecified_internal_definition(self):
+        result = self._interpret(
+            """
+            (define (f)
+              (define y (if #f #f))
+              y)
+            (f)
+            """)
+        self.assertEquals(result, '#!unspecific')
+
+    def test_unspecified_parameter(self):
+        result = self._interpret("((lambda (x) x) (if #f #f))")
+        self.assertEquals(result, '#!unspecific')
+
+    def test_unspecified_is_true(self):
+        self.assertEquals(self._interpret("(if (if #f #f) 'yes 'no)"), 'yes')
+
+
 class CONDDerivedFormTestCase(BaseTestCase):
 
     def test_cond(self):
@@ -294,6 +339,77 @@ class BindingTestCase(BaseTestCase):
         self.assertEquals(result, '(a b c)')
 
 
+class RecordDefinitionTestCase(BaseTestCase):
+
+    POINT = """
+    (define-record-type point
+      (make-point x y)
+      point?
+      (x point-x set-point-x!)
+      (y point-y))
+    """
+
+    def test_record_constructor_and_accessors(self):
+        result = self._interpret(self.POINT + """
+            (define p (make-point 1 2))
+            (list (point-x p) (point-y p) (point? p) (point? '(1 2)))
+            """)
+        self.assertEquals(result, '(1 2 #t #f)')
+
+    def test_record_modifier(self):
+        result = self._interpret(self.POINT + """
+            (define p (make-point 1 2))
+            (define q (make-point 3 4))
+            (set-point-x! p 10)
+            (list (point-x p) (point-x q))
+            """)
+        self.assertEquals(result, '(10 3)')
+
+    def test_record_constructor_subset_of_fields(self):
+        result = self._interpret(
+            """
+            (define-record-type node (make-node value) node?
+              (value node-value)
+              (next node-next set-node-next!))
+            (define n (make-node 1))
+            (define before (node-next n))
+            (set-node-next! n 'end)
+            (list before (node-next n))
+            """)
+        self.assertEquals(result, '(#f end)')
+
+    def test_record_definition_in_procedure_body(self):
+        result = self._interpret(
+            """
+            (define (f a)
+              (define-record-type box (make-box v) box? (v unbox))
+              (unbox (make-box a)))
+            (f 'x)
+            """)
+        self.assertEquals(result, 'x')
+
+    def test_record_types_are_distinct(self):
+        result = self._interpret(self.POINT + """
+            (define-record-type other (make-other x) other? (x other-x))
+            (list (point? (make-other 1)) (other? (make-other 1)))
+            """)
+        self.assertEquals(result, '(#f #t)')
+
+    def test_record_accessor_checks_type(self):
+        self.assertRaises(TypeError, self._interpret, self.POINT + """
+            (define-record-type other (make-other x) other? (x other-x))
+            (point-x (make-other 1))
+            """)
+
+    def test_record_constructor_arity(self):
+        self.assertRaises(ValueError, self._interpret,
+                          self.POINT + "(make-point 1)")
+
+    def test_record_printing(self):
+        result = self._interpret(self.POINT + "(list point (make-point 1 2))")
+        self.assertEquals(result, '(#<record-type point> #<record point>)')
+
+
 class SequencingTestCase(BaseTestCase):
 
     def test_begin(self):
@@ -357,6 +473,29 @@ class EnvironmentLookupTestCase(BaseTestCase):
     def test_lookup_variable_value_exception(self):
         self.assertRaises(NameError, self._interpret, 'a')
 
+    def test_lookup_global_defined_after_procedure(self):
+        result = self._interpret(
+            """
+            (define (f) (lambda () (g)))
+            (define (g) 'late)
+            ((f))
+            """)
+        self.assertEquals(result, 'late')
+
+    def test_lookup_redefined_primitive(self):
+        result = self._interpret(
+            """
+            (define (first l) (car l))
+            (first '(1 2))
+            (define car cdr)
+            (first '(1 2))
+            """)
+        self.assertEquals(result, '(2)')
+
+    def test_lookup_unbound_variable_in_procedure_exception(self):
+        self.assertRaises(NameError, self._interpret,
+                          '((lambda () undefined-variable))')
+
 
 class ProcedureApplicationTestCase(BaseTestCase):
 
@@ -425,6 +564,125 @@ class ProcedureApplicationTestCase(BaseTestCase):
             """)
         self.assertEquals(result, '58')
 
+    def test_apply_procedure_with_rest_parameter(self):
+        result = self._interpret(
+            """
+            (define (f a . rest) (cons a rest))
+            (f 1 2 3)
+            """)
+        self.assertEquals(result, '(1 2 3)')
+
+    def test_apply_procedure_with_empty_rest_parameter(self):
+        result = self._interpret(
+            """
+            (define (f a . rest) (cons a rest))
+            (f 1)
+            """)
+        self.assertEquals(result, '(1)')
+
+    def test_apply_lambda_with_only_rest_parameter(self):
+        result = self._interpret("((lambda args args) 1 2)")
+        self.assertEquals(result, '(1 2)')
+
+    def test_apply_wrong_number_of_arguments_exception(self):
+        self.assertRaises(ValueError, self._interpret,
+                          '(define (f a b) a) (f 1)')
+
+    def test_apply_too_few_arguments_for_rest_parameter_exception(self):
+        self.assertRaises(ValueError, self._interpret,
+                          '(define (f a b . rest) a) (f 1)')
+
+
+class ProperTailCallTestCase(BaseTestCase):
+    # deeper than the Python recursion limit
+    DEPTH = 10000
+
+    def _loop(self, definition, count):
+        return self._interpret(
+            """
+            %s
+            (loop %d)
+            """ % (definition, count))
+
+    def test_tail_call_in_if(self):
+        result = self._loop(
+            """
+            (define (loop n)
+              (if (= n 0) 'done (loop (- n 1))))
+            """, self.DEPTH)
+        self.assertEquals(result, 'done')
+
+    def test_tail_call_in_cond(self):
+        result = self._loop(
+            """
+            (define (loop n)
+              (cond
+                ((= n 0) 'done)
+                (else (loop (- n 1)))))
+            """, self.DEPTH)
+        self.assertEquals(result, 'done')
+
+    def test_tail_call_in_and(self):
+        result = self._loop(
+            """
+            (define (loop n)
+              (and #t (if (= n 0) 'done (loop (- n 1)))))
+            """, self.DEPTH)
+        self.assertEquals(result, 'done')
+
+    def test_tail_call_in_or(self):
+        result = self._loop(
+            """
+            (define (loop n)
+              (or (= n -1) (if (= n 0) 'done (loop (- n 1)))))
+            """, self.DEPTH)
+        self.assertEquals(result, 'done')
+
+    def test_tail_call_in_begin_and_let(self):
+        result = self._loop(
+            """
+            (define (loop n)
+              (begin
+                n
+                (let ((m (- n 1)))
+                  (if (< m 0) 'done (loop m)))))
+            """, self.DEPTH)
+        self.assertEquals(result, 'done')
+
+    def test_mutual_tail_recursion(self):
+        result = self._interpret(
+            """
+            (define (my-even? n)
+              (if (= n 0) #t (my-odd? (- n 1))))
+            (define (my-odd? n)
+              (if (= n 0) #f (my-even? (- n 1))))
+            (my-even? %d)
+            """ % self.DEPTH)
+        self.assertEquals(result, '#t')
+
+    def test_little_schemer_style_list_loop(self):
+        result = self._interpret(
+            """
+            (define (build-list n acc)
+              (cond
+                ((zero? n) acc)
+                (else (build-list (- n 1) (cons n acc)))))
+            (define (last-of l)
+              (cond
+                ((null? (cdr l)) (car l))
+                (else (last-of (cdr l)))))
+            (last-of (build-list %d '()))
+            """ % self.DEPTH)
+        self.assertEquals(result, str(self.DEPTH))
+
+    def test_tail_loop_million_iterations(self):
+        result = self._loop(
+            """
+            (define (loop n)
+              (if (= n 0) 'done (loop (- n 1))))
+            """, 1000000)
+        self.assertEquals(result, 'done')
+
 
 class BuiltinTestCase(BaseTestCase):
 
@@ -444,6 +702,65 @@ class BuiltinTestCase(BaseTestCase):
         result = self._interpret('(/ 30 2 5)')
         self.assertEquals(result, '3')
 
+    def test_number_builtin_add_two(self):
+        result = self._interpret('(+ 1 2)')
+        self.assertEquals(result, '3')
+
+    def test_number_builtin_add_one(self):
+        result = self._interpret('(+ 7)')
+        self.assertEquals(result, '7')
+
+    def test_number_builtin_add_none(self):
+        result = self._interpret('(+)')
+        self.assertEquals(result, '0')
+
+    def test_number_builtin_mul_none(self):
+        result = self._interpret('(*)')
+        self.assertEquals(result, '1')
+
+    def test_number_builtin_div_one_is_reciprocal(self):
+        result = self._interpret('(/ 2)')
+        self.assertEquals(result, '0.5')
+
+    def test_number_builtin_sub_negates_one(self):
+        result = self._interpret('(- 5)')
+        self.assertEquals(result, '-5')
+
+    def test_number_builtin_mul_two(self):
+        result = self._interpret('(* 6 7)')
+        self.assertEquals(result, '42')
+
+    def test_number_builtin_div_two(self):
+        result = self._interpret('(/ 7 2)')
+        self.assertEquals(result, '3')
+
+    def test_number_builtin_gt_predicate_many(self):
+        result = self._interpret('(> 5 4 3 2 2)')
+        self.assertEquals(result, '#f')
+
+    def test_number_builtin_lt_predicate_one(self):
+        result = self._interpret('(< 1)')
+        self.assertEquals(result, '#t')
+
+    def test_builtin_too_many_arguments_exception(self):
+        self.assertRaises(ValueError, self._interpret, "(car '(1) '(2))")
+
+    def test_builtin_too_few_arguments_exception(self):
+        self.assertRaises(ValueError, self._interpret, '(cons 1)')
+
+    def test_builtin_variadic_too_few_arguments_exception(self):
+        self.assertRaises(ValueError, self._interpret, '(-)')
+
+    def test_builtin_arity_error_message(self):
+        try:
+            self._interpret("(cdr '(1) '(2) '(3) '(4))")
+        except ValueError as e:
+            self.assertEquals(
+                str(e), 'Wrong number of arguments - APPLY '
+                '#<primitive cdr>: expected 1, got 4')
+        else:
+            self.fail('ValueError not raised')
+
     def test_number_builtin_eq_predicate_false(self):
         result = self._interpret('(= 1 2)')
         self.assertEquals(result, '#f')
@@ -549,6 +866,234 @@ class BuiltinTestCase(BaseTestCase):
     def test_builtin_eq_p_symbol_symbol(self):
         self.assertEquals(self._interpret("(eq? 'a 'a)"), '#t')
 
+    def test_builtin_eq_p_character_character(self):
+        self.assertEquals(self._interpret(r"(eq? #\a #\a)"), '#t')
+
+    def test_builtin_eq_p_comparison_results(self):
+        self.assertEquals(self._interpret('(eq? (< 1 2) (not #f))'), '#t')
+
+    def test_builtin_eqv_p(self):
+        self.assertEquals(self._interpret("(eqv? 'a 'a)"), '#t')
+        self.assertEquals(self._interpret('(eqv? 100 100)'), '#t')
+        self.assertEquals(self._interpret("(eqv? '(1) '(1))"), '#f')
+        self.assertEquals(self._interpret("""(define s "a")
+                                             (define t "a")
+                                             (eqv? s t)"""), '#f')
+
+    def test_builtin_equal_p(self):
+        self.assertEquals(self._interpret("""(define x '(1 (a "b") . c))
+                                             (define y '(1 (a "b") . c))
+                                             (equal? x y)"""), '#t')
+        self.assertEquals(self._interpret("(equal? '(1 (2)) '(1 (3)))"), '#f')
+        self.assertEquals(self._interpret("(equal? '(1 2) '(1 2 3))"), '#f')
+        self.assertEquals(self._interpret("(equal? '() '())"), '#t')
+
+    def test_builtin_equal_p_deep_lists(self):
+        result = self._interpret(
+            """
+            (define (nest n acc)
+              (if (= n 0) acc (nest (- n 1) (list acc n))))
+            (equal? (nest 5000 '()) (nest 5000 '()))
+            """)
+        self.assertEquals(result, '#t')
+
+    def test_builtin_vector(self):
+        self.assertEquals(self._interpret("(vector 1 'a (list 2))"),
+                          '#(1 a (2))')
+        self.assertEquals(self._interpret('(vector)'), '#()')
+
+    def test_builtin_make_vector(self):
+        self.assertEquals(self._interpret("(make-vector 3 'x)"), '#(x x x)')
+        self.assertEquals(self._interpret('(vector-length (make-vector 2))'),
+                          '2')
+
+    def test_vector_is_self_evaluating(self):
+        self.assertEquals(self._interpret('#(1 (a))'), '#(1 (a))')
+
+    def test_builtin_vector_ref_and_set(self):
+        result = self._interpret(
+            """
+            (define v (make-vector 3 0))
+            (define (fill-squares i)
+              (if (< i (vector-length v))
+                (begin (vector-set! v i (* i i))
+                       (fill-squares (+ i 1)))))
+            (fill-squares 0)
+            (list (vector-ref v 2) v)
+            """)
+        self.assertEquals(result, '(4 #(0 1 4))')
+
+    def test_builtin_vector_ref_out_of_range(self):
+        self.assertRaises(IndexError, self._interpret, "(vector-ref #(1) 1)")
+        self.assertRaises(IndexError, self._interpret, "(vector-ref #(1) -1)")
+
+    def test_builtin_vector_list_conversions(self):
+        self.assertEquals(self._interpret("(vector->list #(1 #(2) 3))"),
+                          '(1 #(2) 3)')
+        self.assertEquals(self._interpret("(list->vector '(1 (2) 3))"),
+                          '#(1 (2) 3)')
+
+    def test_builtin_vector_fill(self):
+        self.assertEquals(
+            self._interpret("(define v (vector 1 2)) (vector-fill! v 'z) v"),
+            '#(z z)')
+
+    def test_builtin_equal_p_vectors(self):
+        self.assertEquals(self._interpret("(equal? #(1 (2)) #(1 (2)))"), '#t')
+        self.assertEquals(self._interpret("(equal? #(1 2) #(1 2 3))"), '#f')
+        self.assertEquals(self._interpret("(eqv? #(1) #(1))"), '#f')
+
+    def test_builtin_hash_table(self):
+        result = self._interpret(
+            """
+            (define table (make-hash-table))
+            (hash-table-set! table 'a 1)
+            (hash-table-set! table '(b c) 2)
+            (hash-table-set! table 'a 3)
+            (list (hash-table-ref table 'a)
+                  (hash-table-ref table (list 'b 'c))
+                  (hash-table-ref table 'd 'none)
+                  (hash-table-count table))
+            """)
+        self.assertEquals(result, '(3 2 none 2)')
+
+    def test_builtin_eq_hash_table(self):
+        result = self._interpret(
+            """
+            (define table (make-hash-table eq?))
+            (define key (list 1))
+            (hash-table-set! table key 'same)
+            (hash-table-set! table 7 'seven)
+            (hash-table-set! table #\\x 'x)
+            (list (hash-table-ref table key)
+                  (hash-table-ref table (list 1) 'other)
+                  (hash-table-ref table 7)
+                  (hash-table-ref table #\\x))
+            """)
+        self.assertEquals(result, '(same other seven x)')
+
+    def test_builtin_hash_table_delete(self):
+        result = self._interpret(
+            """
+            (define table (make-hash-table))
+            (hash-table-set! table 'a 1)
+            (hash-table-delete! table 'a)
+            (hash-table-delete! table 'b)
+            (list (hash-table-count table) (hash-table-ref table 'a #f))
+            """)
+        self.assertEquals(result, '(0 #f)')
+
+    def test_builtin_hash_table_ref_missing_key(self):
+        self.assertRaises(KeyError, self._interpret,
+                          "(hash-table-ref (make-hash-table) 'a)")
+
+    def test_builtin_hash_table_ref_unspecified_value(self):
+        result = self._interpret(
+            """
+            (define table (make-hash-table))
+            (hash-table-set! table 1 (if #f #f))
+            (hash-table-ref table 1)
+            """)
+        self.assertEquals(result, '#!unspecific')
+
+    def test_builtin_hash_table_walk(self):
+        result = self._interpret(
+            """
+            (define table (make-hash-table))
+            (hash-table-set! table 'a 1)
+            (hash-table-set! table 'b 2)
+            (define total 0)
+            (hash-table-walk table
+                             (lambda (key value)
+                               (set! total (+ total value))))
+            total
+            """)
+        self.assertEquals(result, '3')
+
+    def test_builtin_persistent_map(self):
+        result = self._interpret(
+            """
+            (define m1 (persistent-map 'a 1 '(b) 2))
+            (define m2 (persistent-map-set m1 'a 10))
+            (define m3 (persistent-map-delete m2 (list 'b)))
+            (list (persistent-map-ref m1 'a) (persistent-map-ref m2 'a)
+                  (persistent-map-ref m3 '(b) 'gone)
+                  (persistent-map-count m1) (persistent-map-count m3)
+                  (persistent-map->alist m3))
+            """)
+        self.assertEquals(result, '(1 10 gone 2 1 ((a . 10)))')
+
+    def test_builtin_alist_to_persistent_map(self):
+        result = self._interpret(
+            """
+            (persistent-map-ref
+              (alist->persistent-map '((a . 1) (b . 2))) 'b)
+            """)
+        self.assertEquals(result, '2')
+
+    def test_builtin_persistent_map_ref_missing_key(self):
+        self.assertRaises(KeyError, self._interpret,
+                          "(persistent-map-ref (persistent-map) 'a)")
+
+    def test_builtin_persistent_map_ref_unspecified_value(self):
+        result = self._interpret(
+            "(persistent-map-ref (persistent-map 'a (if #f #f)) 'a)")
+        self.assertEquals(result, '#!unspecific')
+
+    def test_builtin_persistent_vector(self):
+        result = self._interpret(
+            """
+            (define v1 (list->persistent-vector '(a b c)))
+            (define v2 (persistent-vector-set v1 1 'x))
+            (define v3 (persistent-vector-push v2 'd))
+            (list (persistent-vector->list v1) (persistent-vector->list v3)
+                  (persistent-vector-ref v2 1) (persistent-vector-length v3)
+                  (persistent-vector-length (persistent-vector)))
+            """)
+        self.assertEquals(result, '((a b c) (a x c d) x 4 0)')
+
+    def test_builtin_numeric_vectors(self):
+        result = self._interpret(
+            """
+            (define a (f64vector 1 2 3))
+            (define b (list->s64vector '(4 5 6)))
+            (s64vector-set! b 0 7)
+            (list a b (f64vector-ref a 2) (s64vector-length b)
+                  (f64vector? a) (f64vector? b) (s64vector->list b)
+                  (f64vector->vector a) (vector->s64vector (vector 1 2))
+                  (make-s64vector 2 9))
+            """)
+        self.assertEquals(
+            result, '(#f64(1.0 2.0 3.0) #s64(7 5 6) 3.0 3 #t #f (7 5 6) '
+            '#(1.0 2.0 3.0) #s64(1 2) #s64(9 9))')
+
+    def test_builtin_numeric_vector_operations(self):
+        result = self._interpret(
+            """
+            (define a (f64vector 1 2 3))
+            (define b (s64vector 4 5 6))
+            (list (vector-add a b) (vector-mul b 2) (vector-sum b)
+                  (vector-dot a b) (vector-map - b) (vector-map * 3 b)
+                  (vector-map abs (vector-map - a)))
+            """)
+        self.assertEquals(
+            result, '(#f64(5.0 7.0 9.0) #s64(8 10 12) 15 32.0 #s64(-4 -5 -6) '
+            '#s64(12 15 18) #f64(1.0 2.0 3.0))')
+
+    def test_builtin_vector_map_needs_vectorized_primitive(self):
+        self.assertRaises(ValueError, self._interpret,
+                          "(vector-map (lambda (x) x) (s64vector 1))")
+        self.assertRaises(ValueError, self._interpret,
+                          "(vector-map car (s64vector 1))")
+
+    def test_builtin_numeric_vector_lengths_must_match(self):
+        self.assertRaises(ValueError, self._interpret,
+                          "(vector-add (s64vector 1) (s64vector 1 2))")
+
+    def test_builtin_length_of_long_list(self):
+        result = self._interpret("(length (vector->list (make-vector 5000)))")
+        self.assertEquals(result, '5000')
+
     def test_builtin_zero_p_zero(self):
         self.assertEquals(self._interpret("(zero? 0)"), '#t')
 
@@ -577,6 +1122,37 @@ class BuiltinTestCase(BaseTestCase):
         self.assertEquals(self._interpret('(even? 1)'), '#f')
 
 
+class SpecialFormRegistryTestCase(BaseTestCase):
+
+    def setUp(self):
+        from serval.interpreter import Interpreter
+        from serval.model import Symbol
+        from serval.expression.sequence import sequence_exp
+        from serval.expression.util import cadr, cddr
+
+        def eval_when(interpreter, expr, env):
+            if interpreter.evaluate(cadr(expr), env):
+                return interpreter.evaluate(sequence_exp(cddr(expr)), env)
+            return Symbol('ok')
+
+        Interpreter.define_special_form('when', eval_when)
+
+    def tearDown(self):
+        from serval.interpreter import Interpreter
+        del Interpreter.special_forms['when']
+
+    def test_define_special_form(self):
+        self.assertEquals(self._interpret("(when (< 1 2) 'a 'b)"), 'b')
+
+    def test_define_special_form_does_not_evaluate_body(self):
+        self.assertEquals(self._interpret("(when (> 1 2) (car '()))"), 'ok')
+
+    def test_special_form_registry_is_keyed_by_name(self):
+        from serval.interpreter import Interpreter
+        self.assertTrue('when' in Interpreter.special_forms)
+        self.assertTrue('lambda' in Interpreter.special_forms)
+
+
 class InterpreterLoadProcedureTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -609,3 +1185,27 @@ class InterpreterLoadProcedureTestCase(unittest.TestCase):
         self.assertEquals(str(result), '(1 2 3)')
 
 
+class EqualHashTestCase(unittest.TestCase):
+
+    def _parse(self, text):
+        from serval.lexer import Lexer
+        from serval.parser import Parser
+        return Parser(Lexer(text)).parse()[0]
+
+    def test_immutable_objects_are_hashable_by_value(self):
+        from serval.model import Number, String
+
+        table = {Number(1): 'one', String('a'): 'a'}
+        self.assertEquals(table[Number(1)], 'one')
+        self.assertEquals(table[1], 'one')
+        self.assertEquals(table[String('a')], 'a')
+
+    def test_equal_lists_hash_the_same(self):
+        from serval.builtin import equal, equal_hash
+
+        first = self._parse('(1 (a "b") #t . 2)')
+        second = self._parse('(1 (a "b") #t . 2)')
+        self.assertTrue(first is not second and equal(first, second))
+        self.assertEquals(equal_hash(first), equal_hash(second))
+        self.assertNotEquals(equal_hash(first),
+                             equal_hash(self._parse('(1 (a "b") #t 2)')))
@@ -0,0 +1,265 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+from serval.tests import test_interpreter, test_the_little_schemer
+
+
+class JITMixin(object):
+    """Compile every procedure on its first call."""
+
+    def _make_interpreter(self):
+        from serval.interpreter import Interpreter
+
+        interpreter = Interpreter(jit=True)
+        interpreter.jit.threshold = 1
+        return interpreter
+
+
+class JITRepresentationTestCase(
+    JITMixin, test_interpreter.InterpreterRepresentationTestCase):
+    pass
+
+
+class JITIFSpecialFormTestCase(
+    JITMixin, test_interpreter.IFSpecialFormTestCase):
+    pass
+
+
+class JITUnspecifiedValueTestCase(
+    JITMixin, test_interpreter.UnspecifiedValueTestCase):
+    pass
+
+
+class JITCONDDerivedFormTestCase(
+    JITMixin, test_interpreter.CONDDerivedFormTestCase):
+    pass
+
+
+class JITANDSpecialFormTestCase(
+    JITMixin, test_interpreter.ANDSpecialFormTestCase):
+    pass
+
+
+class JITORSpecialFormTestCase(
+    JITMixin, test_interpreter.ORSpecialFormTestCase):
+    pass
+
+
+class JITAssignmentTestCase(
+    JITMixin, test_interpreter.AssignmentTestCase):
+    pass
+
+
+class JITBindingTestCase(
+    JITMixin, test_interpreter.BindingTestCase):
+    pass
+
+
+class JITRecordDefinitionTestCase(
+    JITMixin, test_interpreter.RecordDefinitionTestCase):
+    pass
+
+
+class JITSequencingTestCase(
+    JITMixin, test_interpreter.SequencingTestCase):
+    pass
+
+
+class JITDefinitionTestCase(
+    JITMixin, test_interpreter.DefinitionTestCase):
+    pass
+
+
+class JITEnvironmentLookupTestCase(
+    JITMixin, test_interpreter.EnvironmentLookupTestCase):
+    pass
+
+
+class JITProcedureApplicationTestCase(
+    JITMixin, test_interpreter.ProcedureApplicationTestCase):
+    pass
+
+
+class JITProperTailCallTestCase(
+    JITMixin, test_interpreter.ProperTailCallTestCase):
+    pass
+
+
+class JITBuiltinTestCase(
+    JITMixin, test_interpreter.BuiltinTestCase):
+    pass
+
+
+class JITLittleSchemerEvaluatorTestCase(
+    JITMixin, test_the_little_schemer.LittleSchemerEvaluatorTestCase):
+    pass
+
+
+class JITTestCase(JITMixin, test_interpreter.BaseTestCase):
+
+    def setUp(self):
+        self.interpreter = self._make_interpreter()
+
+    def _run(self, text):
+        return self._interpret(text, interpreter=self.interpreter)
+
+    def _source(self, name):
+        from serval.model import Symbol
+
+        return self.interpreter.jit.source(
+            self.interpreter.env.load(Symbol(name)))
+
+    def test_threshold(self):
+        self.interpreter.jit.threshold = 3
+        self._run('(define (add1 n) (+ n 1))')
+        self._run('(add1 1)')
+        self._run('(add1 2)')
+        self.assertTrue(self._source('add1') is None)
+        self.assertEquals(self._run('(add1 3)'), '4')
+        self.assertTrue(self._source('add1') is not None)
+
+    def test_self_tail_call_is_a_loop(self):
+        self._run(
+            """
+            (define (count-down n)
+              (if (= n 0) 'done (count-down (- n 1))))
+            """)
+        self.assertEquals(self._run('(count-down 100000)'), 'done')
+        self.assertTrue('while True:' in self._source('count-down'))
+
+    def test_let_and_cond(self):
+        result = self._run(
+            """
+            (define (classify n)
+              (let ((m (* n 2)))
+                (cond ((< m 0) 'negative)
+                      ((= m 0) 'zero)
+                      (else (list 'positive m)))))
+            (list (classify -1) (classify 0) (classify 2))
+            """)
+        self.assertEquals(result, '(negative zero (positive 4))')
+
+    def test_and_returns_false(self):
+        result = self._run(
+            """
+            (define (f x) (and (if #f #f) (> x 1) x))
+            (f 1)
+            """)
+        self.assertEquals(result, '#f')
+
+    def test_one_armed_if_in_native_code(self):
+        self.interpreter.jit.threshold = 1
+        result = self._run(
+            """
+            (define (g) (if #f #f))
+            (define (h) (list (g)))
+            (g)
+            (define x (g))
+            (list x (h))
+            """)
+        self.assertEquals(result, '(#!unspecific (#!unspecific))')
+
+    def test_fallback_to_interpreter(self):
+        result = self._run(
+            """
+            (define (make-adder n) (lambda (x) (+ x n)))
+            ((make-adder 1) 2)
+            """)
+        self.assertEquals(result, '3')
+        self.assertTrue(self._source('make-adder') is None)
+        self.assertEquals(self.interpreter.jit.fallbacks[0][0], 'make-adder')
+
+    def test_mutual_tail_calls_with_interpreted_procedure(self):
+        result = self._run(
+            """
+            (define (my-even? n) (if (= n 0) #t (my-odd? (- n 1))))
+            (define (my-odd? n)
+              (define (zero) 0)
+              (if (= n (zero)) #f (my-even? (- n 1))))
+            (my-even? 10000)
+            """)
+        self.assertEquals(result, '#t')
+        self.assertTrue(self._source('my-even?') is not None)
+        self.assertTrue(self._source('my-odd?') is None)
+
+    def test_redefined_primitive(self):
+        self._run('(define (f x) (car x))')
+        self.assertEquals(self._run("(f '(1 2))"), '1')
+        self._run('(define car cdr)')
+        self.assertEquals(self._run("(f '(1 2))"), '(2)')
+
+    def test_redefined_procedure_in_self_call(self):
+        self._run(
+            """
+            (define (loop n) (if (= n 0) 'done (loop (- n 1))))
+            (loop 1)
+            (define saved loop)
+            (define (loop n) 'redefined)
+            """)
+        self.assertEquals(self._run('(saved 5)'), 'redefined')
+
+    def test_called_procedures_are_not_kept_alive(self):
+        import gc
+        from serval.model import CompoundProcedure
+
+        def live_procedures():
+            gc.collect()
+            return len([obj for obj in gc.get_objects()
+                        if isinstance(obj, CompoundProcedure)])
+
+        self.interpreter.jit.threshold = 1
+        self._run('((lambda (x) x) 1)')
+        before = live_procedures()
+        for _ in range(200):
+            self._run('((lambda (x) x) 1)')
+        self.assertEquals(live_procedures(), before)
+
+    def test_unbound_variable(self):
+        self._run('(define (f) undefined-variable)')
+        self.assertRaises(NameError, self._run, '(f)')
+
+    def test_dump(self):
+        from StringIO import StringIO
+
+        self.interpreter.jit.dump = StringIO()
+        self._run('(define (add1 n) (+ n 1)) (add1 1)')
+        self.assertTrue(
+            'def scheme_add1(v0_n):' in self.interpreter.jit.dump.getvalue())
+
+    def test_deoptimization_drops_native_code(self):
+        from serval.interpreter import Interpreter
+
+        self.interpreter = Interpreter(optimize=True, jit=True)
+        self.interpreter.jit.threshold = 1
+        self._run(
+            """
+            (define (first p) (car p))
+            (define (head l) (first l))
+            (head '(1 2))
+            """)
+        self.assertTrue(self._source('head') is not None)
+        self._run('(define (first p) (cdr p))')
+        self.assertEquals(self._run("(head '(1 2))"), '(2)')
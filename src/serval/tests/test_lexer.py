@@ -69,6 +69,13 @@ class LexerTestCase(unittest.TestCase):
         self.assertEquals(token.type, tokens.CHARACTER)
         self.assertEquals(token.text, r'#\space')
 
+    def test_vector(self):
+        from serval.lexer import Lexer
+        lexer = Lexer('#(1)')
+        self.assertEquals(lexer.token().type, tokens.VECTOR)
+        self.assertEquals(lexer.token().type, tokens.NUMBER)
+        self.assertEquals(lexer.token().type, tokens.RPAREN)
+
     def test_string(self):
         token = self._get_token(r'"hello\"world"')
         self.assertEquals(token.type, tokens.STRING)
@@ -0,0 +1,104 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import unittest
+
+
+class NumericVectorTestCase(unittest.TestCase):
+
+    def test_make(self):
+        from serval import numeric
+
+        vector = numeric.make('f64', [1, 2.5])
+        self.assertEquals(vector.tolist(), [1.0, 2.5])
+        self.assertEquals(str(vector), '#f64(1.0 2.5)')
+        self.assertEquals(str(numeric.make('s64', [1, -2])), '#s64(1 -2)')
+
+    def test_s64_rejects_floats(self):
+        from serval import numeric
+
+        self.assertRaises(TypeError, numeric.make, 's64', [1, 2.5])
+        vector = numeric.make('s64', [1])
+        self.assertRaises(TypeError, vector.set, 0, 2.5)
+
+    def test_get_and_set(self):
+        from serval import numeric
+
+        vector = numeric.make('s64', [1, 2, 3])
+        vector.set(1, 20)
+        self.assertEquals(vector.get(1), 20)
+        self.assertTrue(vector.get(1).__class__ in (int, long))
+        self.assertRaises(IndexError, vector.get, 3)
+        self.assertRaises(IndexError, vector.set, -1, 0)
+
+    def test_binary(self):
+        from serval import numeric
+
+        ints = numeric.make('s64', [1, 2, 3])
+        floats = numeric.make('f64', [0.5, 0.5, 0.5])
+        result = numeric.binary('add', ints, ints)
+        self.assertEquals((result.kind, result.tolist()), ('s64', [2, 4, 6]))
+        result = numeric.binary('mul', ints, floats)
+        self.assertEquals((result.kind, result.tolist()),
+                          ('f64', [0.5, 1.0, 1.5]))
+        result = numeric.binary('sub', 10, ints)
+        self.assertEquals((result.kind, result.tolist()), ('s64', [9, 8, 7]))
+
+    def test_unary(self):
+        from serval import numeric
+
+        result = numeric.unary('abs', numeric.make('f64', [-1, 2]))
+        self.assertEquals(result.tolist(), [1.0, 2.0])
+
+    def test_lengths_must_match(self):
+        from serval import numeric
+
+        self.assertRaises(ValueError, numeric.binary, 'add',
+                          numeric.make('s64', [1]), numeric.make('s64', []))
+        self.assertRaises(ValueError, numeric.dot,
+                          numeric.make('s64', [1]), numeric.make('s64', []))
+
+    def test_total_and_dot(self):
+        from serval import numeric
+
+        ints = numeric.make('s64', range(10))
+        self.assertEquals(numeric.total(ints), 45)
+        self.assertEquals(numeric.total(numeric.make('f64', [])), 0.0)
+        self.assertEquals(numeric.dot(ints, ints), 285)
+        self.assertEquals(
+            numeric.dot(ints, numeric.make('f64', [0.5] * 10)), 22.5)
+
+
+class ArrayFallbackTestCase(NumericVectorTestCase):
+    """Same tests on the array.array storage used without NumPy."""
+
+    def setUp(self):
+        from serval import numeric
+        self.numpy, numeric.numpy = numeric.numpy, None
+
+    def tearDown(self):
+        from serval import numeric
+        numeric.numpy = self.numpy
@@ -0,0 +1,352 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+from serval.tests import test_interpreter, test_the_little_schemer
+
+OPTIMIZE = dict(optimize=True)
+
+
+class OptimizedIFSpecialFormTestCase(test_interpreter.IFSpecialFormTestCase):
+    interpreter_options = OPTIMIZE
+
+
+class OptimizedUnspecifiedValueTestCase(
+    test_interpreter.UnspecifiedValueTestCase):
+    interpreter_options = OPTIMIZE
+
+
+class OptimizedCONDDerivedFormTestCase(
+    test_interpreter.CONDDerivedFormTestCase):
+    interpreter_options = OPTIMIZE
+
+
+class OptimizedANDSpecialFormTestCase(
+    test_interpreter.ANDSpecialFormTestCase):
+    interpreter_options = OPTIMIZE
+
+
+class OptimizedORSpecialFormTestCase(test_interpreter.ORSpecialFormTestCase):
+    interpreter_options = OPTIMIZE
+
+
+class OptimizedAssignmentTestCase(test_interpreter.AssignmentTestCase):
+    interpreter_options = OPTIMIZE
+
+
+class OptimizedBindingTestCase(test_interpreter.BindingTestCase):
+    interpreter_options = OPTIMIZE
+
+
+class OptimizedRecordDefinitionTestCase(
+    test_interpreter.RecordDefinitionTestCase):
+    interpreter_options = OPTIMIZE
+
+
+class OptimizedSequencingTestCase(test_interpreter.SequencingTestCase):
+    interpreter_options = OPTIMIZE
+
+
+class OptimizedDefinitionTestCase(test_interpreter.DefinitionTestCase):
+    interpreter_options = OPTIMIZE
+
+
+class OptimizedEnvironmentLookupTestCase(
+    test_interpreter.EnvironmentLookupTestCase):
+    interpreter_options = OPTIMIZE
+
+
+class OptimizedProcedureApplicationTestCase(
+    test_interpreter.ProcedureApplicationTestCase):
+    interpreter_options = OPTIMIZE
+
+
+class OptimizedBuiltinTestCase(test_interpreter.BuiltinTestCase):
+    interpreter_options = OPTIMIZE
+
+
+class OptimizedLittleSchemerEvaluatorTestCase(
+    test_the_little_schemer.LittleSchemerEvaluatorTestCase):
+    interpreter_options = OPTIMIZE
+
+
+class OptimizedAnalyzerLittleSchemerEvaluatorTestCase(
+    test_the_little_schemer.LittleSchemerEvaluatorTestCase):
+    interpreter_options = dict(optimize=True, analyze=True)
+
+
+class OptimizerTestCase(test_interpreter.BaseTestCase):
+
+    interpreter_options = OPTIMIZE
+
+    def setUp(self):
+        self.interpreter = self._make_interpreter()
+
+    def _optimize(self, text):
+        from serval.lexer import Lexer
+        from serval.parser import Parser
+
+        optimizer = self.interpreter.optimizer
+        return [str(optimizer.optimize(expr))
+                for expr in Parser(Lexer(text)).parse()][-1]
+
+    def _statistics(self):
+        return self.interpreter.optimizer.statistics()
+
+    def test_fold_constants(self):
+        self.assertEquals(self._optimize('(+ 1 (* 2 3))'), '7')
+        self.assertEquals(self._statistics()['folded'], 2)
+
+    def test_fold_inside_procedure(self):
+        self.assertEquals(self._optimize('(lambda (x) (+ x (- 5 3)))'),
+                          '(lambda (x) (+ x 2))')
+
+    def test_no_folding_of_variables(self):
+        self.assertEquals(self._optimize('(+ a 1)'), '(+ a 1)')
+        self.assertEquals(self._statistics()['folded'], 0)
+
+    def test_no_folding_of_impure_primitive(self):
+        self.assertEquals(self._optimize('(cons 1 2)'), '(cons 1 2)')
+
+    def test_error_is_left_to_run_time(self):
+        self.assertEquals(self._optimize('(/ 1 0)'), '(/ 1 0)')
+
+    def test_no_folding_of_redefined_primitive(self):
+        self._interpret('(define (+ a b) (- a b))',
+                        interpreter=self.interpreter)
+        self.assertEquals(self._optimize('(+ 1 2)'), '(+ 1 2)')
+
+    def test_no_folding_after_set(self):
+        self.assertEquals(
+            self._optimize('(begin (set! + -) (+ 1 2))'),
+            '(begin (set! + -) (+ 1 2))')
+
+    def test_redefined_primitive_is_applied(self):
+        result = self._interpret(
+            """
+            (define (+ a b) (- a b))
+            (+ 5 3)
+            """, interpreter=self.interpreter)
+        self.assertEquals(result, '2')
+
+    def test_redefined_primitive_deoptimizes_folded_procedure(self):
+        result = self._interpret(
+            """
+            (define (f) (+ 1 2))
+            (define (+ a b) 42)
+            (f)
+            """, interpreter=self.interpreter)
+        self.assertEquals(result, '42')
+        self.assertEquals(self._statistics()['deoptimized'], 1)
+
+    def test_no_folding_of_shadowed_primitive(self):
+        self.assertEquals(self._optimize('(lambda (+) (+ 1 2))'),
+                          '(lambda (+) (+ 1 2))')
+        self.assertEquals(
+            self._optimize('(lambda () (define (* a b) a) (* 1 2))'),
+            '(lambda () (define * (lambda (a b) a)) (* 1 2))')
+
+    def test_prune_if(self):
+        self.assertEquals(self._optimize('(if #t a b)'), 'a')
+        self.assertEquals(self._optimize("(if '() a b)"), 'a')
+        self.assertEquals(self._optimize('(if (< 2 1) a b)'), 'b')
+        self.assertEquals(self._statistics()['pruned'], 3)
+
+    def test_one_armed_if_is_kept(self):
+        self.assertEquals(self._optimize('(if #f a)'), '(if #f a)')
+
+    def test_cond_to_if(self):
+        self.assertEquals(self._optimize('(cond ((null? x) 1) (else 2))'),
+                          '(if (null? x) 1 2)')
+        self.assertEquals(self._statistics()['expanded'], 1)
+
+    def test_prune_cond(self):
+        self.assertEquals(
+            self._optimize('(cond ((= 1 2) a) ((= 1 1) b) (else c))'), 'b')
+        self.assertEquals(self._statistics(),
+                          dict(folded=2, pruned=2, expanded=1,
+                               inlined=0, deoptimized=0))
+
+    def test_let_to_lambda(self):
+        self.assertEquals(self._optimize('(let ((x 1)) (+ x 1))'),
+                          '((lambda (x) (+ x 1)) 1)')
+        self.assertEquals(self._statistics()['expanded'], 1)
+
+    def test_quoted_data_is_kept(self):
+        self.assertEquals(self._optimize("'(+ 1 2)"), "(quote (+ 1 2))")
+
+    def test_unknown_special_form_is_kept(self):
+        from serval.interpreter import Interpreter
+
+        Interpreter.define_special_form('when', None)
+        try:
+            self.assertEquals(self._optimize('(when #t (+ 1 2))'),
+                              '(when #t (+ 1 2))')
+        finally:
+            del Interpreter.special_forms['when']
+
+
+class InliningTestCase(test_interpreter.BaseTestCase):
+
+    interpreter_options = OPTIMIZE
+
+    ACCESSORS = """
+        (define first (lambda (p) (car p)))
+        (define second (lambda (p) (car (cdr p))))
+        (define build (lambda (s1 s2) (cons s1 (cons s2 (quote ())))))
+        """
+
+    def setUp(self):
+        self.interpreter = self._make_interpreter()
+        self._interpret(self.ACCESSORS, interpreter=self.interpreter)
+
+    def _run(self, text):
+        return self._interpret(text, interpreter=self.interpreter)
+
+    def _body(self, name):
+        from serval.model import Symbol
+        from serval.expression.procedure import procedure_body
+
+        return str(procedure_body(self.interpreter.env.load(Symbol(name))))
+
+    def _statistics(self):
+        return self.interpreter.optimizer.statistics()
+
+    def test_inline_accessor(self):
+        self._run('(define (swap p) (build (second p) (first p)))')
+        self.assertEquals(self._body('swap'),
+                          '((cons (car (cdr p)) (cons (car p) (quote ()))))')
+        self.assertEquals(self._statistics()['inlined'], 3)
+        self.assertEquals(self._run("(swap '(1 2))"), '(2 1)')
+
+    def test_inline_with_operands_in_order(self):
+        self._run("(define (pair-up a) (build (car a) 'x))")
+        self.assertEquals(self._body('pair-up'),
+                          "((cons (car a) (cons (quote x) (quote ()))))")
+
+    def test_no_inlining_of_operand_evaluated_twice(self):
+        self._run('(define (twice x) (cons x x))')
+        self._run('(define (f l) (twice (car l)))')
+        self.assertEquals(self._body('f'), '((twice (car l)))')
+        self._run('(define (g l) (twice l))')
+        self.assertEquals(self._body('g'), '((cons l l))')
+
+    def test_side_effect_before_operand_is_kept_in_order(self):
+        self._run("""
+            (define v (make-vector 1 0))
+            (define (bump!) (vector-set! v 0 1))
+            (define (after-bump p) (begin (bump!) p))
+            (define (f) (after-bump (vector-ref v 0)))
+            """)
+        self.assertEquals(
+            self._body('f'),
+            '(((lambda (p) (begin (vector-set! v 0 1) p)) (vector-ref v 0)))')
+        self.assertEquals(self._run('(f)'), '0')
+
+    def test_side_effect_before_variable_operand_is_kept_in_order(self):
+        self._run("""
+            (define counter 0)
+            (define (bump!) (set! counter 1))
+            (define (after-bump p) (begin (bump!) p))
+            (define (f) (after-bump counter))
+            """)
+        self.assertEquals(self._run('(f)'), '0')
+
+    def test_no_inlining_of_recursive_procedure(self):
+        self._run('(define (loop n) (if (= n 0) 0 (loop (- n 1))))')
+        self._run('(define (f) (loop 5))')
+        self.assertEquals(self._body('f'), '((loop 5))')
+
+    def test_no_inlining_of_assigned_procedure(self):
+        self._run('(define (reset!) (set! second car))')
+        self._run('(define second (lambda (p) (car (cdr p))))')
+        self._run('(define (f l) (second l))')
+        self.assertEquals(self._body('f'), '((second l))')
+
+    def test_no_inlining_into_escaping_lambda(self):
+        self._run('(define (f) (lambda (l) (first l)))')
+        self.assertEquals(self._body('f'), '((lambda (l) (first l)))')
+
+    def test_no_inlining_when_free_variable_is_captured(self):
+        self._run('(define (f car) (first car))')
+        self.assertEquals(self._body('f'), '((first car))')
+
+    def test_inline_alias(self):
+        self._run('(define table-of first)')
+        self._run('(define (f l) (table-of l))')
+        self.assertEquals(self._body('f'), '((car l))')
+
+    def test_redefinition_deoptimizes_callers(self):
+        self._run('(define (head l) (first l))')
+        self._run('(define saved head)')
+        self.assertEquals(self._run("(head '(1 2))"), '1')
+
+        self._run('(define (first p) (cdr p))')
+        self.assertEquals(self._statistics()['deoptimized'], 1)
+        self.assertEquals(self._body('head'), '((first l))')
+        self.assertEquals(self._run("(head '(1 2))"), '(2)')
+        # the procedure is changed in place
+        self.assertEquals(self._run("(saved '(1 2))"), '(2)')
+
+    def test_set_deoptimizes_callers(self):
+        self._run('(define (head l) (first l))')
+        self._run('(set! first cdr)')
+        self.assertEquals(self._run("(head '(1 2))"), '(2)')
+
+    def test_redefined_primitive_after_deoptimization(self):
+        self._run("""
+            (define (f l) (cons (first l) (+ 1 2)))
+            (define (first p) (* 10 (car p)))
+            """)
+        self.assertEquals(self._run("(f '(1))"), '(10 . 3)')
+
+        self._run("(define (+ a b) 'new)")
+        self.assertEquals(self._run("(f '(1))"), '(10 . new)')
+
+    def test_record_definition_deoptimizes_callers(self):
+        self._run('(define (head l) (first l))')
+        self._run('(define (magnitude) (abs -5))')
+        self.assertEquals(self._body('head'), '((car l))')
+        self.assertEquals(self._body('magnitude'), '(5)')
+
+        self._run("""
+            (define-record-type point (make-point x y) point?
+              (x first) (y abs))
+            """)
+        self.assertEquals(self._statistics()['deoptimized'], 2)
+        self.assertEquals(self._run("(head (make-point 5 6))"), '5')
+        self.assertRaises(TypeError, self._run, '(magnitude)')
+
+    def test_deoptimization_is_transitive(self):
+        self._run('(define (head l) (first l))')
+        self._run('(define (head2 l) (head l))')
+        self.assertEquals(self._body('head2'), '((car l))')
+
+        self._run('(define (first p) (cdr p))')
+        self.assertEquals(self._run("(head2 '(1 2))"), '(2)')
+
+
+class AnalyzerInliningTestCase(InliningTestCase):
+    interpreter_options = dict(optimize=True, analyze=True)
@@ -40,3 +40,39 @@ class ParserTestCase(unittest.TestCase):
         parser = Parser(Lexer("'(1 ))"))
         self.assertRaises(ParserException, parser.parse)
 
+
+    def test_vector(self):
+        from serval.model import Vector
+
+        expr = Parser(Lexer("#(1 #(a) (b c)) '#()")).parse()
+        self.assertTrue(isinstance(expr[0], Vector))
+        self.assertEquals(str(expr[0]), '#(1 #(a) (b c))')
+        self.assertEquals(str(expr[1]), '(quote #())')
+
+    def test_symbols_are_interned(self):
+        from serval.model import Symbol
+
+        expr = Parser(Lexer("(a a b)")).parse()[0]
+        self.assertTrue(expr.head is expr.tail.head)
+        self.assertTrue(expr.head is Symbol('a'))
+        self.assertFalse(expr.head is expr.tail.tail.head)
+
+    def test_parsed_objects_have_no_instance_dict(self):
+        from serval.model import EmptyList
+
+        expr = Parser(Lexer('(1 "a" #t #\\a b)')).parse()[0]
+        objects = [expr]
+        while expr is not EmptyList:
+            objects.append(expr.head)
+            expr = expr.tail
+        for obj in objects + [EmptyList]:
+            self.assertFalse(hasattr(obj, '__dict__'), str(obj))
+
+    def test_booleans_and_characters_are_canonical(self):
+        from serval.model import Boolean, Character, TRUE, FALSE
+
+        expr = Parser(Lexer(r"(#t #f #\a #\a)")).parse()[0]
+        self.assertTrue(expr.head is TRUE and Boolean(1) is TRUE)
+        self.assertTrue(expr.tail.head is FALSE and Boolean(0) is FALSE)
+        self.assertTrue(expr.tail.tail.head is expr.tail.tail.tail.head)
+        self.assertTrue(expr.tail.tail.head is Character('a'))
@@ -0,0 +1,124 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import unittest
+
+
+class PersistentVectorTestCase(unittest.TestCase):
+
+    SIZES = [0, 1, 32, 33, 1024, 1056, 1057, 33000, 33825]
+
+    def test_from_items(self):
+        from serval.persistent import PersistentVector
+
+        for size in self.SIZES:
+            vector = PersistentVector.from_items(range(size))
+            self.assertEquals(len(vector), size)
+            self.assertEquals(list(vector), range(size))
+            if size:
+                self.assertEquals(vector.get(size - 1), size - 1)
+
+    def test_append(self):
+        from serval.persistent import PersistentVector
+
+        vector = PersistentVector()
+        for index in xrange(33825):
+            vector = vector.append(index)
+        self.assertEquals(list(vector), range(33825))
+        self.assertEquals(vector.get(1056), 1056)
+
+    def test_set_keeps_old_version(self):
+        from serval.persistent import PersistentVector
+
+        for size in self.SIZES[1:]:
+            old = PersistentVector.from_items(range(size))
+            for index in (0, size // 2, size - 1):
+                new = old.set(index, 'x')
+                self.assertEquals(new.get(index), 'x')
+                self.assertEquals(old.get(index), index)
+            self.assertEquals(list(old), range(size))
+
+    def test_append_keeps_old_version(self):
+        from serval.persistent import PersistentVector
+
+        old = PersistentVector.from_items(range(1056))
+        first, second = old.append('a'), old.append('b')
+        self.assertEquals((first.get(1056), second.get(1056)), ('a', 'b'))
+        self.assertEquals(len(old), 1056)
+
+    def test_index_out_of_range(self):
+        from serval.persistent import PersistentVector
+
+        vector = PersistentVector.from_items(range(3))
+        self.assertRaises(IndexError, vector.get, 3)
+        self.assertRaises(IndexError, vector.set, -1, 'x')
+
+
+class PersistentMapTestCase(unittest.TestCase):
+
+    def _check(self, hash):
+        import random
+        from serval.persistent import PersistentMap
+
+        generator = random.Random(7)
+        pmap, expected = PersistentMap(hash), {}
+        versions = []
+        for step in xrange(2000):
+            key = generator.randrange(300)
+            if generator.random() < 0.3:
+                pmap = pmap.delete(key)
+                expected.pop(key, None)
+            else:
+                pmap = pmap.set(key, step)
+                expected[key] = step
+            versions.append((pmap, dict(expected)))
+
+        for pmap, expected in versions[::100]:
+            self.assertEquals(len(pmap), len(expected))
+            self.assertEquals(dict(pmap.items()), expected)
+            for key in xrange(300):
+                self.assertEquals(pmap.get(key), expected.get(key))
+
+    def test_updates(self):
+        self._check(hash)
+
+    def test_hash_collisions(self):
+        self._check(lambda key: key % 5)
+
+    def test_stored_none_is_found(self):
+        from serval.persistent import PersistentMap
+
+        missing = object()
+        pmap = PersistentMap().set('a', None)
+        self.assertTrue(pmap.get('a', missing) is None)
+        self.assertTrue(pmap.get('b', missing) is missing)
+
+    def test_set_existing_value_returns_same_map(self):
+        from serval.persistent import PersistentMap
+
+        pmap = PersistentMap().set('a', 1)
+        self.assertTrue(pmap.set('a', 1) is pmap)
+        self.assertTrue(pmap.delete('b') is pmap)
@@ -0,0 +1,112 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import unittest
+
+
+def _parse(text):
+    from serval.lexer import Lexer
+    from serval.parser import Parser
+
+    return Parser(Lexer(text)).parse()[0]
+
+
+class PrinterTestCase(unittest.TestCase):
+
+    def _to_string(self, text, **options):
+        from serval.printer import to_string
+        return to_string(_parse(text), **options)
+
+    def test_atoms(self):
+        self.assertEquals(self._to_string('a'), 'a')
+        self.assertEquals(self._to_string('#t'), '#t')
+        self.assertEquals(self._to_string('"abc"'), '"abc"')
+
+    def test_nested_list(self):
+        self.assertEquals(self._to_string('(1 (2 (3 ())) 4)'),
+                          '(1 (2 (3 ())) 4)')
+
+    def test_improper_list(self):
+        self.assertEquals(self._to_string('(1 (2 . 3) . 4)'),
+                          '(1 (2 . 3) . 4)')
+
+    def test_depth(self):
+        self.assertEquals(self._to_string('(1 (2 (3)) 4)', depth=2),
+                          '(1 (2 ...) 4)')
+        self.assertEquals(self._to_string('(1 (2 (3)) 4)', depth=0), '...')
+
+    def test_length(self):
+        self.assertEquals(self._to_string('(1 2 3 4)', length=2),
+                          '(1 2 ...)')
+        self.assertEquals(self._to_string('(1 (2 3 4) . 5)', length=2),
+                          '(1 (2 3 ...) . 5)')
+        self.assertEquals(self._to_string('(1 2)', length=0), '(...)')
+
+    def test_vector(self):
+        self.assertEquals(self._to_string('#(1 (2 #(3)) #())'),
+                          '#(1 (2 #(3)) #())')
+        self.assertEquals(self._to_string('#(1 #(2) 3)', depth=1),
+                          '#(1 ... 3)')
+        self.assertEquals(self._to_string('#(1 2 3)', length=2),
+                          '#(1 2 ...)')
+
+    def test_long_list(self):
+        from serval.model import Number, Pair, EmptyList
+
+        alist = EmptyList
+        for index in range(100000):
+            alist = Pair(Number(index), alist)
+        output = str(alist)
+        self.assertTrue(output.startswith('(99999 99998 '))
+        self.assertTrue(output.endswith(' 1 0)'))
+
+    def test_deeply_nested_list(self):
+        from serval.model import Symbol, Pair, EmptyList
+
+        alist = EmptyList
+        for _ in range(10000):
+            alist = Pair(alist, Pair(Symbol('a'), EmptyList))
+        output = str(alist)
+        self.assertTrue(output.startswith('(' * 10000 + '() a) a)'))
+
+    def test_writes_in_chunks(self):
+        from serval import printer
+        from serval.model import Number, Pair, EmptyList
+
+        class Output(object):
+            def __init__(self):
+                self.chunks = []
+
+            def write(self, text):
+                self.chunks.append(text)
+
+        alist = EmptyList
+        for index in range(printer.CHUNK_SIZE):
+            alist = Pair(Number(index), alist)
+        out = Output()
+        printer.write(alist, out)
+        self.assertTrue(len(out.chunks) > 1)
+        self.assertEquals(''.join(out.chunks), str(alist))
@@ -0,0 +1,101 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import unittest
+
+
+class CompileTimeEnvironmentTestCase(unittest.TestCase):
+
+    def test_find_variable(self):
+        from serval.scope import CompileTimeEnvironment
+
+        outer = CompileTimeEnvironment(['x', 'y'])
+        inner = CompileTimeEnvironment(['z', 'x'], outer)
+        self.assertEquals(inner.find_variable('x'), (0, 2))
+        self.assertEquals(inner.find_variable('y'), (1, 2))
+        self.assertEquals(inner.find_variable('car'), None)
+
+    def test_add_internal_definition(self):
+        from serval.scope import CompileTimeEnvironment
+
+        cenv = CompileTimeEnvironment(['x'])
+        cenv.add('f')
+        cenv.add('x')
+        self.assertEquals(cenv.find_variable('f'), (0, 2))
+        self.assertEquals(cenv.frame_size, 3)
+
+
+class GlobalEnvironmentTestCase(unittest.TestCase):
+
+    def _env(self):
+        from serval.scope import setup_environment
+        return setup_environment()
+
+    def test_cell_is_shared(self):
+        from serval.model import Symbol
+
+        env = self._env()
+        self.assertTrue(env.cell(Symbol('car')) is env.cell(Symbol('car')))
+
+    def test_cell_of_unbound_variable(self):
+        from serval.model import Symbol
+
+        env = self._env()
+        cell = env.cell(Symbol('x'))
+        self.assertTrue(cell.value is None)
+        env.define_variable(Symbol('x'), 1)
+        self.assertEquals(cell.value, 1)
+
+    def test_set_updates_cell(self):
+        from serval.model import Symbol
+
+        env = self._env()
+        env.define_variable(Symbol('x'), 1)
+        cell = env.cell(Symbol('x'))
+        env.set_variable_value(Symbol('x'), 2)
+        self.assertEquals(cell.value, 2)
+        self.assertEquals(env.load(Symbol('x')), 2)
+
+    def test_set_unbound_variable_exception(self):
+        from serval.model import Symbol
+
+        env = self._env()
+        self.assertRaises(NameError, env.set_variable_value, Symbol('x'), 1)
+
+    def test_bindings_are_keyed_by_symbols(self):
+        from serval.model import Symbol
+
+        env = self._env()
+        env.define_variable(Symbol('x'), 1)
+        self.assertTrue(Symbol('x') in env.bindings)
+        self.assertTrue(Symbol('car') in env.bindings)
+
+    def test_frames_have_no_instance_dict(self):
+        from serval.scope import Environment
+
+        env = self._env()
+        self.assertFalse(hasattr(env, '__dict__'))
+        self.assertFalse(hasattr(Environment(parent=env), '__dict__'))
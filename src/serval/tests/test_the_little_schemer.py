@@ -274,15 +274,20 @@ class LittleSchemerEvaluatorTestCase(unittest.TestCase):
                         (table-of closure)))))
     """
 
+    interpreter_options = {}
+
+    def _make_interpreter(self):
+        from serval.interpreter import Interpreter
+        return Interpreter(**self.interpreter_options)
+
     def _interpret(self, text, interpreter=None):
         from serval.lexer import Lexer
         from serval.parser import Parser
-        from serval.interpreter import Interpreter
         from serval.expression.procedure import (
             is_compound_procedure, get_procedure_repr)
 
         if interpreter is None:
-            interpreter = Interpreter()
+            interpreter = self._make_interpreter()
 
         expressions = Parser(Lexer(text)).parse()
         for expr in expressions:
@@ -295,9 +300,7 @@ class LittleSchemerEvaluatorTestCase(unittest.TestCase):
         return result
 
     def _get_interpreter(self):
-        from serval.interpreter import Interpreter
-
-        interpreter = Interpreter()
+        interpreter = self._make_interpreter()
         self._interpret(self.TEXT, interpreter=interpreter)
 
         return interpreter
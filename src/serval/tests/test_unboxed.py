@@ -0,0 +1,208 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import unittest
+
+from serval.tests import test_interpreter, test_the_little_schemer
+
+UNBOXED = dict(unboxed=True)
+UNBOXED_ANALYZE = dict(unboxed=True, analyze=True)
+UNBOXED_OPTIMIZE = dict(unboxed=True, optimize=True)
+
+
+class UnboxedJITMixin(object):
+    """Compile every procedure on its first call."""
+
+    def _make_interpreter(self):
+        from serval.interpreter import Interpreter
+
+        interpreter = Interpreter(jit=True, unboxed=True)
+        interpreter.jit.threshold = 1
+        return interpreter
+
+
+class UnboxedRepresentationTestCase(
+    test_interpreter.InterpreterRepresentationTestCase):
+    interpreter_options = UNBOXED
+
+
+class UnboxedIFSpecialFormTestCase(test_interpreter.IFSpecialFormTestCase):
+    interpreter_options = UNBOXED
+
+
+class UnboxedUnspecifiedValueTestCase(
+    test_interpreter.UnspecifiedValueTestCase):
+    interpreter_options = UNBOXED
+
+
+class UnboxedCONDDerivedFormTestCase(
+    test_interpreter.CONDDerivedFormTestCase):
+    interpreter_options = UNBOXED
+
+
+class UnboxedANDSpecialFormTestCase(test_interpreter.ANDSpecialFormTestCase):
+    interpreter_options = UNBOXED
+
+
+class UnboxedORSpecialFormTestCase(test_interpreter.ORSpecialFormTestCase):
+    interpreter_options = UNBOXED
+
+
+class UnboxedBindingTestCase(test_interpreter.BindingTestCase):
+    interpreter_options = UNBOXED
+
+
+class UnboxedRecordDefinitionTestCase(
+    test_interpreter.RecordDefinitionTestCase):
+    interpreter_options = UNBOXED
+
+
+class UnboxedProcedureApplicationTestCase(
+    test_interpreter.ProcedureApplicationTestCase):
+    interpreter_options = UNBOXED
+
+
+class UnboxedProperTailCallTestCase(test_interpreter.ProperTailCallTestCase):
+    interpreter_options = UNBOXED
+
+
+class UnboxedBuiltinTestCase(test_interpreter.BuiltinTestCase):
+    interpreter_options = UNBOXED
+
+
+class UnboxedLittleSchemerEvaluatorTestCase(
+    test_the_little_schemer.LittleSchemerEvaluatorTestCase):
+    interpreter_options = UNBOXED
+
+
+class UnboxedAnalyzerBuiltinTestCase(test_interpreter.BuiltinTestCase):
+    interpreter_options = UNBOXED_ANALYZE
+
+
+class UnboxedAnalyzerLittleSchemerEvaluatorTestCase(
+    test_the_little_schemer.LittleSchemerEvaluatorTestCase):
+    interpreter_options = UNBOXED_ANALYZE
+
+
+class UnboxedOptimizerBuiltinTestCase(test_interpreter.BuiltinTestCase):
+    interpreter_options = UNBOXED_OPTIMIZE
+
+
+class UnboxedJITBuiltinTestCase(
+    UnboxedJITMixin, test_interpreter.BuiltinTestCase):
+    pass
+
+
+class UnboxedJITLittleSchemerEvaluatorTestCase(
+    UnboxedJITMixin, test_the_little_schemer.LittleSchemerEvaluatorTestCase):
+    pass
+
+
+class UnboxedNumbersTestCase(test_interpreter.BaseTestCase):
+
+    interpreter_options = UNBOXED
+
+    def _value(self, text):
+        from serval.lexer import Lexer
+        from serval.parser import Parser
+
+        interpreter = self._make_interpreter()
+        result = None
+        for expr in Parser(Lexer(text)).parse():
+            result = interpreter.interpret(expr)
+        return result
+
+    def test_numbers_are_python_numbers(self):
+        result = self._value('(+ 1 2)')
+        self.assertTrue(result.__class__ is int)
+        self.assertEquals(result, 3)
+
+    def test_quoted_numbers_are_python_numbers(self):
+        result = self._value("'(1 (2 3))")
+        self.assertTrue(result.head.__class__ is int)
+        self.assertTrue(result.tail.head.head.__class__ is int)
+
+    def test_zero_is_true(self):
+        self.assertEquals(self._interpret('(if 0 1 2)'), '1')
+        self.assertEquals(self._interpret('(and 0 5)'), '5')
+        self.assertEquals(self._interpret('(or 0 5)'), '0')
+        self.assertEquals(self._interpret('(not 0)'), '#f')
+        self.assertEquals(self._interpret('(cond (0 1) (else 2))'), '1')
+
+    def test_zero_is_true_in_procedures(self):
+        text = """
+        (define (f x) (if (and x (or x 1)) 'yes 'no))
+        (list (f 0) (f 0) (f #f))
+        """
+        self.assertEquals(self._interpret(text), '(yes yes no)')
+
+    def test_number_predicates(self):
+        self.assertEquals(self._interpret('(number? 0)'), '#t')
+        self.assertEquals(self._interpret("(number? 'a)"), '#f')
+        self.assertEquals(self._interpret('(zero? 0)'), '#t')
+        self.assertEquals(self._interpret('(zero? #f)'), '#f')
+
+    def test_boxed_numbers_are_accepted(self):
+        from serval.model import Number, Symbol
+        from serval.expression.util import tolist
+
+        expr = tolist(Symbol('+'), Number(1), Number(2))
+        self.assertEquals(self._make_interpreter().interpret(expr), 3)
+
+
+class UnboxedJITNumbersTestCase(UnboxedJITMixin, UnboxedNumbersTestCase):
+    pass
+
+
+class UnboxedAnalyzerNumbersTestCase(UnboxedNumbersTestCase):
+    interpreter_options = UNBOXED_ANALYZE
+
+
+class NumberShimTestCase(unittest.TestCase):
+
+    def test_number_compares_with_python_numbers(self):
+        from serval.model import Number
+
+        self.assertEquals(Number(3), 3)
+        self.assertEquals(3, Number(3))
+        self.assertTrue(Number(2) < 3)
+        self.assertFalse(Number(2) == 'a')
+
+    def test_box_and_unbox(self):
+        from serval.model import Number, box_number, number_value, is_number
+
+        self.assertEquals(number_value(Number(4)), 4)
+        self.assertEquals(number_value(4), 4)
+        self.assertTrue(isinstance(box_number(4), Number))
+        self.assertEquals(box_number(4).val, 4)
+        self.assertTrue(is_number(4.5) and is_number(Number(4)))
+
+    def test_unbox_numbers_keeps_unchanged_lists(self):
+        from serval.model import Symbol, unbox_numbers
+        from serval.expression.util import tolist
+
+        expr = tolist(Symbol('a'), tolist(Symbol('b')))
+        self.assertTrue(unbox_numbers(expr) is expr)
@@ -0,0 +1,235 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+import unittest
+
+from serval.tests import test_interpreter, test_the_little_schemer
+
+
+class VirtualMachineMixin(object):
+
+    def _make_interpreter(self):
+        from serval.vm import VirtualMachine
+        return VirtualMachine()
+
+
+class VMRepresentationTestCase(
+    VirtualMachineMixin, test_interpreter.InterpreterRepresentationTestCase):
+    pass
+
+
+class VMIFSpecialFormTestCase(
+    VirtualMachineMixin, test_interpreter.IFSpecialFormTestCase):
+    pass
+
+
+class VMUnspecifiedValueTestCase(
+    VirtualMachineMixin, test_interpreter.UnspecifiedValueTestCase):
+    pass
+
+
+class VMCONDDerivedFormTestCase(
+    VirtualMachineMixin, test_interpreter.CONDDerivedFormTestCase):
+    pass
+
+
+class VMANDSpecialFormTestCase(
+    VirtualMachineMixin, test_interpreter.ANDSpecialFormTestCase):
+    pass
+
+
+class VMORSpecialFormTestCase(
+    VirtualMachineMixin, test_interpreter.ORSpecialFormTestCase):
+    pass
+
+
+class VMAssignmentTestCase(
+    VirtualMachineMixin, test_interpreter.AssignmentTestCase):
+    pass
+
+
+class VMBindingTestCase(
+    VirtualMachineMixin, test_interpreter.BindingTestCase):
+    pass
+
+
+class VMRecordDefinitionTestCase(
+    VirtualMachineMixin, test_interpreter.RecordDefinitionTestCase):
+    pass
+
+
+class VMSequencingTestCase(
+    VirtualMachineMixin, test_interpreter.SequencingTestCase):
+    pass
+
+
+class VMDefinitionTestCase(
+    VirtualMachineMixin, test_interpreter.DefinitionTestCase):
+    pass
+
+
+class VMEnvironmentLookupTestCase(
+    VirtualMachineMixin, test_interpreter.EnvironmentLookupTestCase):
+    pass
+
+
+class VMProcedureApplicationTestCase(
+    VirtualMachineMixin, test_interpreter.ProcedureApplicationTestCase):
+    pass
+
+
+class VMProperTailCallTestCase(
+    VirtualMachineMixin, test_interpreter.ProperTailCallTestCase):
+    pass
+
+
+class VMBuiltinTestCase(
+    VirtualMachineMixin, test_interpreter.BuiltinTestCase):
+    pass
+
+
+class VMLittleSchemerEvaluatorTestCase(
+    VirtualMachineMixin,
+    test_the_little_schemer.LittleSchemerEvaluatorTestCase):
+    pass
+
+
+class CompilerTestCase(unittest.TestCase):
+
+    def _compile(self, text):
+        from serval.lexer import Lexer
+        from serval.parser import Parser
+        from serval.compiler import Compiler
+
+        from serval.scope import setup_environment
+
+        return Compiler(setup_environment()).compile(
+            Parser(Lexer(text)).parse()[0])
+
+    def _opcodes(self, code):
+        return code.instructions[::2]
+
+    def test_constant_pool(self):
+        from serval.compiler import LOAD_CONST, RETURN
+
+        code = self._compile('5')
+        self.assertEquals(self._opcodes(code), [LOAD_CONST, RETURN])
+        self.assertEquals(str(code.constants[0]), '5')
+
+    def test_global_and_local_references(self):
+        from serval.compiler import GLOBAL_REF, LOCAL_REF
+
+        code = self._compile('(lambda (x) (car x))').constants[0]
+        self.assertEquals(self._opcodes(code)[:2], [GLOBAL_REF, LOCAL_REF])
+
+    def test_names_are_shared_in_constant_pool(self):
+        code = self._compile('(lambda (x) (cons x x))').constants[0]
+        self.assertEquals(code.constants[1:], [(0, 1, 'x')])
+        self.assertEquals(str(code.constants[0]), 'cons')
+
+    def test_lexical_addresses(self):
+        code = self._compile('(lambda (x y) (lambda (z) (x y z)))')
+        inner = code.constants[0].constants[0]
+        self.assertEquals(inner.constants,
+                          [(1, 1, 'x'), (1, 2, 'y'), (0, 1, 'z')])
+
+    def test_internal_definition_is_local(self):
+        from serval.compiler import LOCAL_REF
+
+        code = self._compile(
+            '(lambda () (define (f) (g)) (define (g) 1) (f))').constants[0]
+        self.assertEquals(code.frame_size, 3)
+        inner = code.constants[0]
+        self.assertEquals(inner.constants, [(1, 2, 'g')])
+        self.assertTrue(LOCAL_REF in self._opcodes(inner))
+
+    def test_tail_call(self):
+        from serval.compiler import CALL, TAIL_CALL
+
+        code = self._compile('(lambda (f x) (f (f x)))').constants[0]
+        self.assertEquals(self._opcodes(code)[-2:], [CALL, TAIL_CALL])
+
+    def test_tail_call_in_if_branches(self):
+        from serval.compiler import TAIL_CALL
+
+        code = self._compile('(lambda (f) (if (f) (f) (f)))').constants[0]
+        self.assertEquals(self._opcodes(code).count(TAIL_CALL), 2)
+
+    def test_disassemble(self):
+        from serval.compiler import disassemble
+
+        listing = disassemble(self._compile("(define x 'a)"))
+        self.assertEquals(
+            listing.split(),
+            ['0', 'LOAD_CONST', '0', '(a)',
+             '2', 'DEFINE_GLOBAL', '1', '(x)',
+             '4', 'RETURN', '0'])
+
+
+class VirtualMachineTestCase(VirtualMachineMixin,
+                             test_interpreter.BaseTestCase):
+
+    def test_closure_repr(self):
+        self.assertEquals(self._interpret('(lambda (x) x)'),
+                          '#<procedure (x) (x) <procedure-env>')
+
+    def test_closure_captures_environment(self):
+        result = self._interpret(
+            """
+            (define (make-counter)
+              (let ((n 0))
+                (lambda () (set! n (+ n 1)) n)))
+            (define c1 (make-counter))
+            (define c2 (make-counter))
+            (c1) (c1) (c2)
+            (list (c1) (c2))
+            """)
+        self.assertEquals(result, '(3 2)')
+
+    def test_primitive_as_value(self):
+        result = self._interpret(
+            """
+            (define (apply-to f a b) (f a b))
+            (apply-to cons 1 2)
+            """)
+        self.assertEquals(result, '(1 . 2)')
+
+    def test_wrong_number_of_arguments(self):
+        self.assertRaises(ValueError, self._interpret, '((lambda (x) x))')
+
+    def test_unassigned_internal_definition(self):
+        self.assertRaises(
+            NameError, self._interpret,
+            '((lambda () (define a b) (define b 1) a))')
+
+    def test_primitive_in_tail_position(self):
+        self.assertEquals(self._interpret('((lambda (x) (+ x 1)) 41)'), '42')
+
+    def test_unbound_global(self):
+        self.assertRaises(NameError, self._interpret, '(car undefined)')
+
+    def test_apply_non_procedure(self):
+        self.assertRaises(ValueError, self._interpret, '(1 2)')
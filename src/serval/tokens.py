@@ -30,6 +30,7 @@ BOOLEAN = 'BOOLEAN'
 CHARACTER = 'CHARACTER'
 STRING = 'STRING'
 LPAREN = 'LPAREN'
+VECTOR = 'VECTOR'
 RPAREN = 'RPAREN'
 QUOTE = 'QUOTE'
 DOT = 'DOT'
@@ -0,0 +1,206 @@
+###############################################################################
+#
+# Copyright (c) 2010 Ruslan Spivak
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+###############################################################################
+
+__author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
+
+from serval.model import Symbol, PrimitiveProcedure, FALSE
+from serval.scope import setup_environment
+from serval.builtin import BUILTIN_DEFINITIONS
+from serval.expression.util import tolist, evaluate_text
+from serval.compiler import (
+    Compiler, LOAD_CONST, LOCAL_REF, GLOBAL_REF, LOCAL_SET, GLOBAL_SET,
+    DEFINE_LOCAL, DEFINE_GLOBAL, JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE_OR_POP,
+    CALL, TAIL_CALL, RETURN, MAKE_CLOSURE, POP
+    )
+
+FIXED_ARITIES = PrimitiveProcedure.FIXED_ARITIES
+
+
+class Closure(object):
+    """Compiled compound procedure."""
+
+    __slots__ = ('code', 'env')
+
+    def __init__(self, code, env):
+        self.code = code
+        self.env = env
+
+    def __str__(self):
+        return '#<procedure %s %s <procedure-env>' % (
+            self.code.source_params, self.code.source_body)
+
+
+class VirtualMachine(object):
+    """Stack based virtual machine running code from serval.compiler
+
+    Compiled procedures are `Closure` objects; primitive procedures
+    from serval.builtin are called directly with the arguments taken
+    off the value stack.
+    """
+
+    def __init__(self):
+        self.env = setup_environment()
+        self.compiler = Compiler(self.env)
+        evaluate_text(self, BUILTIN_DEFINITIONS)
+
+    def interpret(self, expr):
+        return self.run(self.compiler.compile(expr))
+
+    def run(self, code):
+        global_bindings = self.env.bindings
+        ok = Symbol('ok')
+
+        instructions, constants = code.instructions, code.constants
+        # frame of the running procedure call, None at the top level
+        env = None
+        pc = 0
+        stack = []
+        push, pop = stack.append, stack.pop
+        # saved (instructions, constants, pc, env) of the callers
+        frames = []
+
+        while True:
+            opcode = instructions[pc]
+            arg = instructions[pc + 1]
+            pc += 2
+
+            if opcode == LOCAL_REF:
+                depth, index, name = constants[arg]
+                frame = env
+                while depth:
+                    frame = frame[0]
+                    depth -= 1
+                value = frame[index]
+                if value is None:
+                    raise NameError('Unbound variable: %s' % name)
+                push(value)
+
+            elif opcode == GLOBAL_REF:
+                value = constants[arg].value
+                if value is None:
+                    raise NameError('Unbound variable: %s' % constants[arg])
+                push(value)
+
+            elif opcode == LOAD_CONST:
+                push(constants[arg])
+
+            elif opcode == CALL or opcode == TAIL_CALL:
+                base = len(stack) - arg - 1
+                proc = stack[base]
+
+                if proc.__class__ is Closure:
+                    # the procedure's slot becomes the link to the
+                    # enclosing frame, the arguments stay in place
+                    frame = stack[base:]
+                    del stack[base:]
+                    proc_code = proc.code
+                    if proc_code.rest is not None and arg >= proc_code.arity:
+                        # the extra arguments become the rest list
+                        rest = proc_code.arity + 1
+                        frame[rest:] = [tolist(*frame[rest:])]
+                        arg = rest
+                    elif arg != len(proc_code.params):
+                        raise ValueError(
+                            'Wrong number of arguments - APPLY %s' % proc)
+                    frame[0] = proc.env
+                    if proc_code.frame_size != arg + 1:
+                        frame.extend(
+                            [None] * (proc_code.frame_size - arg - 1))
+
+                    if opcode == CALL:
+                        frames.append((instructions, constants, pc, env))
+                    env = frame
+                    instructions = proc_code.instructions
+                    constants = proc_code.constants
+                    pc = 0
+                    continue
+
+                args = stack[base + 1:]
+                del stack[base:]
+                if proc.__class__ is not PrimitiveProcedure:
+                    raise ValueError('Unknown procedure type - APPLY %s'
+                                     % proc)
+                if arg < FIXED_ARITIES:
+                    push(proc.fixed[arg](*args))
+                else:
+                    push(proc.apply(args))
+
+                if opcode == TAIL_CALL:
+                    if not frames:
+                        return pop()
+                    instructions, constants, pc, env = frames.pop()
+
+            elif opcode == JUMP_IF_FALSE:
+                value = pop()
+                if value is FALSE or value is None:
+                    pc = arg
+
+            elif opcode == RETURN:
+                if not frames:
+                    return pop()
+                instructions, constants, pc, env = frames.pop()
+
+            elif opcode == JUMP:
+                pc = arg
+
+            elif opcode == JUMP_IF_TRUE_OR_POP:
+                value = stack[-1]
+                if value is not FALSE and value is not None:
+                    pc = arg
+                else:
+                    pop()
+
+            elif opcode == MAKE_CLOSURE:
+                push(Closure(constants[arg], env))
+
+            elif opcode == POP:
+                pop()
+
+            elif opcode == DEFINE_GLOBAL:
+                cell = constants[arg]
+                global_bindings[cell.symbol] = cell.value = pop()
+                push(ok)
+
+            elif opcode == DEFINE_LOCAL:
+                env[arg] = pop()
+                push(ok)
+
+            elif opcode == LOCAL_SET:
+                depth, index, name = constants[arg]
+                frame = env
+                while depth:
+                    frame = frame[0]
+                    depth -= 1
+                frame[index] = pop()
+                push(ok)
+
+            elif opcode == GLOBAL_SET:
+                cell = constants[arg]
+                if cell.symbol not in global_bindings:
+                    raise NameError('Unbound variable - SET! %s' % cell)
+                global_bindings[cell.symbol] = cell.value = pop()
+                push(ok)
+
+            else:
+                raise ValueError('Unknown opcode - VM %s' % opcode)